@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Fleet-scale publisher load benchmark.
+
+Drives N simulated edge nodes through the real ``main.build_payload`` and
+``network.mqtt.MQTTPublisher`` code paths against the in-process
+LoopbackBroker, then reports throughput, p50/p99 latency and memory per
+node. Everything runs in-process, so it works offline in CI:
+
+    python benchmarks/fleet.py --nodes 50 --rounds 200
+    python benchmarks/fleet.py --max-p99-ms 2 --min-throughput 5000
+
+Exits with status 1 when a threshold is violated.
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import sys
+import time
+import tracemalloc
+import types
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_SRC = BENCH_DIR.parent / "greenscale-edge"
+
+for path in (str(PROJECT_SRC), str(BENCH_DIR)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from loopback import LoopbackBroker, LoopbackClient, Sink, hardware_stubs  # noqa: E402
+
+
+def _ensure_paho():
+    """The loopback client replaces paho's Client, so paho is optional."""
+    try:
+        import paho.mqtt.client  # noqa: F401
+    except ImportError:
+        client_mod = types.ModuleType("paho.mqtt.client")
+        client_mod.Client = None
+        client_mod.CallbackAPIVersion = types.SimpleNamespace(VERSION2=2)
+        client_mod.MQTT_ERR_SUCCESS = 0
+        sys.modules.setdefault("paho", types.ModuleType("paho"))
+        sys.modules.setdefault("paho.mqtt", types.ModuleType("paho.mqtt"))
+        sys.modules["paho.mqtt.client"] = client_mod
+
+
+def load_main():
+    """Import a private copy of main.py backed by synthetic hardware."""
+    _ensure_paho()
+    spec = importlib.util.spec_from_file_location(
+        "greenscale_edge_bench_main", PROJECT_SRC / "main.py")
+    module = importlib.util.module_from_spec(spec)
+    with hardware_stubs():
+        spec.loader.exec_module(module)
+    return module
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1,
+                int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+@contextlib.contextmanager
+def _loopback_clients(publisher_cls, broker):
+    """Make MQTTPublisher create loopback clients instead of paho ones."""
+    paho_client = publisher_cls.__init__.__globals__["mqtt"]
+    original = paho_client.Client
+    paho_client.Client = lambda *a, **kw: LoopbackClient(broker, *a, **kw)
+    try:
+        yield
+    finally:
+        paho_client.Client = original
+
+
+def run(nodes=10, rounds=100, layout="single", quiet=True):
+    """Run the fleet benchmark and return a report dict."""
+    main = load_main()
+    broker = LoopbackBroker()
+    sink = Sink(time.perf_counter)
+    for pattern in ("greenscale/+/telemetry", "greenscale/+/sensors/#",
+                    "greenscale/+/camera/#"):
+        broker.subscribe(sink, pattern)
+    devnull = open(os.devnull, "w")
+    out = contextlib.redirect_stdout(devnull) if quiet else contextlib.nullcontext()
+
+    publishers = []
+    latencies = []
+    build_times = []
+    try:
+        with out, _loopback_clients(main.MQTTPublisher, broker):
+            tracemalloc.start()
+            base_mem, _ = tracemalloc.get_traced_memory()
+            for n in range(nodes):
+                device = f"bench-{n:04d}"
+                publisher = main.MQTTPublisher(
+                    "loopback",
+                    f"greenscale/{device}/telemetry",
+                    status_topic=f"greenscale/{device}/status",
+                )
+                publisher.connect()
+                publishers.append((device, publisher))
+            idle_mem, _ = tracemalloc.get_traced_memory()
+
+            started = time.perf_counter()
+            for _ in range(rounds):
+                for device, publisher in publishers:
+                    t0 = time.perf_counter()
+                    main.DEVICE_ID = device
+                    main.BASE_TOPIC = f"greenscale/{device}"
+                    payload = main.build_payload(
+                        main.collect_sensor_data(), main.collect_camera_data())
+                    t1 = time.perf_counter()
+                    main.publish_payload(publisher, payload, layout)
+                    t2 = time.perf_counter()
+                    build_times.append(t1 - t0)
+                    latencies.append(t2 - t1)
+            elapsed = time.perf_counter() - started
+            _, peak_mem = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    finally:
+        with contextlib.redirect_stdout(devnull):
+            for _device, publisher in publishers:
+                publisher.close()
+        devnull.close()
+
+    messages = nodes * rounds
+    latencies.sort()
+    build_times.sort()
+    return {
+        "nodes": nodes,
+        "rounds": rounds,
+        "layout": layout,
+        "messages": messages,
+        "delivered": sink.count,
+        "broker_messages_in": broker.messages_in,
+        "elapsed_sec": round(elapsed, 4),
+        "throughput_msg_per_sec": round(messages / elapsed, 1) if elapsed else 0.0,
+        "publish_p50_ms": round(percentile(latencies, 50) * 1000, 4),
+        "publish_p99_ms": round(percentile(latencies, 99) * 1000, 4),
+        "build_p50_ms": round(percentile(build_times, 50) * 1000, 4),
+        "build_p99_ms": round(percentile(build_times, 99) * 1000, 4),
+        "memory_per_node_kib": round(
+            (idle_mem - base_mem) / nodes / 1024, 2) if nodes else 0.0,
+        "peak_memory_kib": round((peak_mem - base_mem) / 1024, 1),
+    }
+
+
+def check_thresholds(report, max_p99_ms=None, min_throughput=None,
+                     max_node_kib=None):
+    """Return a list of human-readable threshold violations."""
+    failures = []
+    if max_p99_ms is not None and report["publish_p99_ms"] > max_p99_ms:
+        failures.append(
+            f"publish p99 {report['publish_p99_ms']} ms > {max_p99_ms} ms")
+    if (min_throughput is not None
+            and report["throughput_msg_per_sec"] < min_throughput):
+        failures.append(
+            f"throughput {report['throughput_msg_per_sec']} msg/s "
+            f"< {min_throughput} msg/s")
+    if max_node_kib is not None and report["memory_per_node_kib"] > max_node_kib:
+        failures.append(
+            f"memory per node {report['memory_per_node_kib']} KiB "
+            f"> {max_node_kib} KiB")
+    if report["delivered"] < report["messages"]:
+        failures.append(
+            f"only {report['delivered']} of {report['messages']} "
+            "messages were delivered")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nodes", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--layout", default="single",
+                        choices=("single", "per_metric", "both"))
+    parser.add_argument("--json", action="store_true",
+                        help="print the report as JSON")
+    parser.add_argument("--max-p99-ms", type=float)
+    parser.add_argument("--min-throughput", type=float)
+    parser.add_argument("--max-node-kib", type=float)
+    args = parser.parse_args(argv)
+
+    report = run(args.nodes, args.rounds, args.layout)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            print(f"{key:>24}: {value}")
+
+    failures = check_thresholds(
+        report, args.max_p99_ms, args.min_throughput, args.max_node_kib)
+    for failure in failures:
+        print(f"[FAIL] {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""
+In-process MQTT broker stand-in for offline benchmarks.
+
+LoopbackBroker routes messages between LoopbackClient instances in the same
+process. LoopbackClient implements the part of the paho ``Client`` API that
+``network.mqtt.MQTTPublisher`` uses, so the real publisher code (state
+machine, spool, JSON encoding, worker thread) runs unchanged while the
+broker side costs almost nothing and needs no network.
+"""
+
+import contextlib
+import random
+import sys
+import threading
+import types
+from collections import deque
+
+
+def topic_matches(pattern, topic):
+    """MQTT wildcard match for ``+`` and ``#``."""
+    pattern_parts = pattern.split("/")
+    topic_parts = topic.split("/")
+    for i, part in enumerate(pattern_parts):
+        if part == "#":
+            return True
+        if i >= len(topic_parts):
+            return False
+        if part != "+" and part != topic_parts[i]:
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+
+class Message:
+    __slots__ = ("topic", "payload", "qos", "retain")
+
+    def __init__(self, topic, payload, qos=0, retain=False):
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+        self.retain = retain
+
+
+class PublishInfo:
+    """Mimics paho's MQTTMessageInfo for a message delivered in-process."""
+
+    rc = 0
+
+    def __init__(self, mid):
+        self.mid = mid
+
+    def is_published(self):
+        return True
+
+    def wait_for_publish(self, timeout=None):
+        return True
+
+
+class LoopbackBroker:
+    """Routes publishes to matching subscribers and keeps retained values."""
+
+    def __init__(self):
+        self.subscriptions = []  # (pattern, subscriber)
+        self.retained = {}
+        self.clients = set()
+        self.messages_in = 0
+        self.messages_out = 0
+        self.bytes_in = 0
+        self._lock = threading.Lock()
+
+    def attach(self, client):
+        with self._lock:
+            self.clients.add(client)
+
+    def detach(self, client):
+        with self._lock:
+            self.clients.discard(client)
+            self.subscriptions = [
+                (p, s) for p, s in self.subscriptions if s is not client]
+
+    def subscribe(self, subscriber, pattern):
+        """Register ``subscriber.deliver(message)`` for a topic filter."""
+        with self._lock:
+            self.subscriptions.append((pattern, subscriber))
+            retained = [m for t, m in self.retained.items()
+                        if topic_matches(pattern, t)]
+        for message in retained:
+            subscriber.deliver(message)
+
+    def route(self, message):
+        with self._lock:
+            self.messages_in += 1
+            self.bytes_in += len(message.payload)
+            if message.retain:
+                self.retained[message.topic] = message
+            targets = [s for p, s in self.subscriptions
+                       if topic_matches(p, message.topic)]
+            self.messages_out += len(targets)
+        for subscriber in targets:
+            subscriber.deliver(message)
+
+
+class LoopbackClient:
+    """paho-compatible client bound to a LoopbackBroker."""
+
+    def __init__(self, broker, *_args, **_kwargs):
+        self.broker = broker
+        self.on_connect = None
+        self.on_disconnect = None
+        self.on_message = None
+        self.will = None
+        self._inbox = deque()
+        self._wake = threading.Event()
+        self._connack_pending = False
+        self._mid = 0
+
+    # --- Configuration ---------------------------------------------------
+
+    def username_pw_set(self, username, password=None):
+        pass
+
+    def tls_set(self, *_args, **_kwargs):
+        pass
+
+    def tls_insecure_set(self, value):
+        pass
+
+    def will_set(self, topic, payload=None, qos=0, retain=False):
+        self.will = Message(topic, payload, qos, retain)
+
+    # --- Connection ------------------------------------------------------
+
+    def connect(self, host, port=1883, keepalive=60, *_args, **_kwargs):
+        self.broker.attach(self)
+        # Like paho, the CONNACK is delivered by the next loop() call.
+        self._connack_pending = True
+        self._wake.set()
+        return 0
+
+    def disconnect(self, *_args, **_kwargs):
+        self.broker.detach(self)
+        self._wake.set()
+        return 0
+
+    def loop(self, timeout=1.0):
+        """Dispatch the CONNACK and queued inbound messages.
+
+        Waits up to ``timeout`` when there is nothing to dispatch.
+        """
+        if self._connack_pending:
+            self._connack_pending = False
+            if self.on_connect is not None:
+                self.on_connect(self, None, {}, 0, None)
+        if not self._inbox:
+            self._wake.wait(timeout)
+            self._wake.clear()
+        while self._inbox:
+            message = self._inbox.popleft()
+            if self.on_message is not None:
+                self.on_message(self, None, message)
+        return 0
+
+    # --- Messaging -------------------------------------------------------
+
+    def publish(self, topic, payload=None, qos=0, retain=False, **_kwargs):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        self._mid += 1
+        self.broker.route(Message(topic, payload, qos, retain))
+        return PublishInfo(self._mid)
+
+    def subscribe(self, topic, qos=0, **_kwargs):
+        self.broker.subscribe(self, topic)
+        return (0, self._mid)
+
+    def deliver(self, message):
+        self._inbox.append(message)
+        self._wake.set()
+
+
+class Sink:
+    """Fleet-side subscriber that counts deliveries without queueing them."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.count = 0
+        self.bytes = 0
+        self.last_delivery = None
+
+    def deliver(self, message):
+        self.count += 1
+        self.bytes += len(message.payload)
+        self.last_delivery = self.clock()
+
+
+def _hardware_modules():
+    """Synthetic sensor/camera modules so main.py imports off-device."""
+    rng = random.Random(42)
+
+    def reading(sensor, low, high, units):
+        def read(*_args, **_kwargs):
+            return {
+                "sensor": sensor,
+                "value": round(rng.uniform(low, high), 2),
+                "units": units,
+                "status": "ok",
+            }
+        return read
+
+    sensors_pkg = types.ModuleType("sensors")
+    sensors_pkg.__path__ = []
+    modules = {"sensors": sensors_pkg}
+    for name, args in {
+        "temp_sensor": ("temperature", 18.0, 24.0, "degC"),
+        "ph_sensor": ("ph", 6.5, 7.5, "pH"),
+        "do_sensor": ("dissolved_oxygen", 6.0, 9.0, "mg/L"),
+        "turbidity_sensor": ("turbidity", 1.0, 5.0, "NTU"),
+    }.items():
+        module = types.ModuleType(f"sensors.{name}")
+        module.read = reading(*args)
+        setattr(sensors_pkg, name, module)
+        modules[f"sensors.{name}"] = module
+
+    camera_pkg = types.ModuleType("camera")
+    camera_pkg.__path__ = []
+    camera_mod = types.ModuleType("camera.camera")
+    camera_mod.compute_camera_metrics = lambda: {
+        "turbidity_index": round(rng.random(), 3),
+        "avg_color_hex": "#4a7f52",
+    }
+    camera_mod.capture_snapshot = lambda: None
+    camera_pkg.camera = camera_mod
+    modules["camera"] = camera_pkg
+    modules["camera.camera"] = camera_mod
+    return modules
+
+
+@contextlib.contextmanager
+def hardware_stubs():
+    """Temporarily replace sensor and camera modules in sys.modules."""
+    replacements = _hardware_modules()
+    saved = {name: sys.modules.get(name) for name in replacements}
+    sys.modules.update(replacements)
+    try:
+        yield
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Per-message CPU cost of telemetry payload assembly and serialisation.
+
+Compares the previous path (a strftime timestamp per sensor reading, dict
+copies, a nested payload dict and ``json.dumps``) with
+``telemetry.payload.PayloadTemplate`` on each available serialiser
+backend. Runs offline, with no hardware:
+
+    python benchmarks/payload.py --iterations 20000
+    python benchmarks/payload.py --json --min-speedup 1.2
+
+Exits with status 1 when a backend is slower than ``--min-speedup``.
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, UTC
+from pathlib import Path
+
+PROJECT_SRC = Path(__file__).resolve().parent.parent / "greenscale-edge"
+if str(PROJECT_SRC) not in sys.path:
+    sys.path.insert(0, str(PROJECT_SRC))
+
+from telemetry.payload import (  # noqa: E402
+    SERIALIZERS, PayloadTemplate, get_serializer, utc_timestamp)
+
+SENSORS = {"temperature_c": 19.8, "ph": 6.9, "do_mg_per_l": 7.7,
+           "turbidity_sensor_v": 2.5}
+CAMERA = {"turbidity_index": 0.42, "avg_color_hex": "#123456"}
+STATUS = {
+    "online": True,
+    "uptime_sec": 86400,
+    "overruns": {"temperature": 0, "adc": 2, "camera": 0, "publish": 0},
+    "sensors": {name: {"state": "ok"} for name in
+                ("temperature", "ph", "dissolved_oxygen", "turbidity", "camera")},
+}
+STATS = {name: {"min": value - 0.1, "max": value + 0.1, "mean": value,
+                "std": 0.05, "last": value, "count": 10}
+         for name, value in SENSORS.items()}
+
+
+def legacy_cycle():
+    """The pre-template path: per-reading timestamps and a fresh dict tree."""
+    readings = [
+        {"sensor": name, "value": value, "units": "", "status": "ok",
+         "timestamp": datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")}
+        for name, value in SENSORS.items()
+    ]
+    sensors = {name: r["value"] for name, r in zip(SENSORS, readings)}
+    payload = {
+        "version": 1,
+        "device_id": "bench-node",
+        "timestamp": datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "status": dict(STATUS),
+        "sensors": dict(sensors),
+        "camera": dict(CAMERA),
+        "stats": STATS,
+    }
+    return json.dumps(payload)
+
+
+def template_cycle(template):
+    """The agent's path: one cycle timestamp, encoded through the template."""
+    return template.encode(utc_timestamp(), STATUS, SENSORS, CAMERA, STATS)
+
+
+def time_per_call(func, iterations):
+    func()  # warm up
+    started = time.process_time()
+    for _ in range(iterations):
+        func()
+    return (time.process_time() - started) / iterations
+
+
+def run(iterations=20000):
+    """Return a report with microseconds per message for each path."""
+    backends = {}
+    baseline = time_per_call(legacy_cycle, iterations)
+    for name in SERIALIZERS[1:]:
+        resolved, dumps = get_serializer(name)
+        if resolved != name:
+            continue  # backend not installed
+        template = PayloadTemplate("bench-node", dumps=dumps)
+        assert json.loads(template_cycle(template)) == json.loads(legacy_cycle())
+        per_call = time_per_call(lambda: template_cycle(template), iterations)
+        backends[name] = {
+            "us_per_msg": round(per_call * 1e6, 2),
+            "speedup": round(baseline / per_call, 2),
+            "saved_us_per_msg": round((baseline - per_call) * 1e6, 2),
+        }
+    return {
+        "iterations": iterations,
+        "message_bytes": len(legacy_cycle()),
+        "baseline_us_per_msg": round(baseline * 1e6, 2),
+        "backends": backends,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--json", action="store_true",
+                        help="print the report as JSON")
+    parser.add_argument("--min-speedup", type=float)
+    args = parser.parse_args(argv)
+
+    report = run(args.iterations)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"baseline: {report['baseline_us_per_msg']} us/msg "
+              f"({report['message_bytes']} bytes)")
+        for name, result in report["backends"].items():
+            print(f"{name:>8}: {result['us_per_msg']} us/msg, "
+                  f"{result['speedup']}x, saves "
+                  f"{result['saved_us_per_msg']} us/msg")
+
+    failed = [name for name, result in report["backends"].items()
+              if args.min_speedup is not None
+              and result["speedup"] < args.min_speedup]
+    for name in failed:
+        print(f"[FAIL] {name} speedup below {args.min_speedup}x",
+              file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Adaptive publish/sample interval driven by how much the signals move.
+
+Every recorded sample updates, per metric, an exponentially weighted mean
+and variance plus a noise estimate taken from consecutive differences
+(white noise and quantisation show up there, slow real changes do not).
+Two measures count as activity, both with the noise taken out:
+
+- the rate of change (units per minute) of the smoothed mean over a fixed
+  ``HORIZON_SEC`` to twice that, ignoring ``NOISE_K`` noise deviations, so
+  sampling faster does not magnify noise into activity;
+- the spread beyond ``NOISE_K`` times the noise.
+
+Each is divided by the metric's ``scale`` (the change that counts as
+"something is happening"), and the largest ratio over all metrics is the
+activity score.
+
+The interval moves in factors of two between ``min_interval`` and
+``max_interval``:
+
+- activity above ``speedup_at`` halves it at once, so an event is caught
+  on the next sample;
+- activity below ``slowdown_below`` for ``hold_sec`` doubles it, one step
+  per hold period, down to a slow heartbeat;
+- anything in between keeps the current interval.
+
+The gap between the two thresholds plus the hold time is the hysteresis
+that stops the rate flapping on a noisy signal.
+"""
+
+import math
+import time
+
+HORIZON_SEC = 60.0
+NOISE_K = 2.0
+
+
+class _Channel:
+    __slots__ = ("mean", "var", "noise_var", "rate", "last_value",
+                 "anchors")
+
+    def __init__(self, value, now):
+        self.mean = value
+        self.var = 0.0
+        self.noise_var = 0.0
+        self.rate = 0.0
+        self.last_value = value
+        # (time, mean) at the start of the previous and current horizon.
+        self.anchors = [(now, value)]
+
+    def update(self, value, now, alpha):
+        step = value - self.last_value
+        self.noise_var += alpha * (step * step / 2 - self.noise_var)
+        diff = value - self.mean
+        incr = alpha * diff
+        self.mean += incr
+        self.var = (1 - alpha) * (self.var + diff * incr)
+        self.last_value = value
+
+        start, start_mean = self.anchors[0]
+        noise = NOISE_K * math.sqrt(self.noise_var)
+        change = max(0.0, abs(self.mean - start_mean) - noise)
+        self.rate = change / max(now - start, HORIZON_SEC) * 60
+        if now - self.anchors[-1][0] >= HORIZON_SEC:
+            self.anchors = [self.anchors[-1], (now, self.mean)]
+
+    def spread(self):
+        return math.sqrt(max(0.0, self.var - NOISE_K ** 2 * self.noise_var))
+
+
+class AdaptiveRate:
+    """Chooses the publish interval from recent signal activity."""
+
+    def __init__(self, interval, min_interval=2.0, max_interval=300.0,
+                 speedup_at=1.0, slowdown_below=0.3, hold_sec=120.0,
+                 scales=None, alpha=0.3, clock=time.monotonic):
+        self.alpha = alpha
+        self.clock = clock
+        self.channels = {}
+        self.activity = 0.0
+        self.interval = interval
+        self._calm_since = None
+        self.configure(min_interval, max_interval, speedup_at,
+                       slowdown_below, hold_sec, scales)
+
+    def configure(self, min_interval, max_interval, speedup_at,
+                  slowdown_below, hold_sec, scales=None):
+        """Apply new bounds/thresholds; the current interval is re-clamped."""
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.speedup_at = speedup_at
+        self.slowdown_below = slowdown_below
+        self.hold_sec = hold_sec
+        self.scales = scales or {}
+        self.interval = self._clamp(self.interval)
+
+    def _clamp(self, interval):
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def update(self, values, now=None):
+        """Fold in a ``{metric: value}`` reading; return the new interval."""
+        now = self.clock() if now is None else now
+        for metric, value in values.items():
+            if metric not in self.scales:
+                continue
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                continue
+            channel = self.channels.get(metric)
+            if channel is None:
+                self.channels[metric] = _Channel(value, now)
+                continue
+            channel.update(value, now, self.alpha)
+        self.activity = max(
+            (max(c.rate, c.spread()) / self.scales[m]
+             for m, c in self.channels.items() if self.scales.get(m)),
+            default=0.0,
+        )
+        self._adjust(now)
+        return self.interval
+
+    def _adjust(self, now):
+        if self.activity > self.speedup_at:
+            self._calm_since = None
+            if self.interval > self.min_interval:
+                self._set(self.interval / 2, "activity")
+        elif self.activity < self.slowdown_below:
+            if self._calm_since is None:
+                self._calm_since = now
+            elif now - self._calm_since >= self.hold_sec:
+                self._calm_since = now
+                if self.interval < self.max_interval:
+                    self._set(self.interval * 2, "calm")
+        else:
+            self._calm_since = None
+
+    def _set(self, interval, reason):
+        interval = self._clamp(interval)
+        print(f"[SAMPLING] Interval {self.interval:g}s -> {interval:g}s "
+              f"({reason}, activity {self.activity:.2f})")
+        self.interval = interval
+
+    def status(self):
+        """Summary for the payload's ``status.sampling`` block."""
+        return {
+            "mode": "adaptive",
+            "interval_s": self.interval,
+            "activity": round(self.activity, 2),
+        }
@@ -0,0 +1,77 @@
+"""
+Per-device circuit breakers.
+
+After ``failure_threshold`` consecutive failures a breaker opens and the
+device is left alone for ``reset_timeout`` seconds. Then one trial read is
+let through (half-open): success closes the breaker, failure re-opens it
+with the wait doubled, up to ``max_reset_timeout``. A dead probe therefore
+costs one timed-out read every few minutes instead of one per cycle.
+"""
+
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Tracks the health of one device."""
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=30.0,
+                 max_reset_timeout=600.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.last_error = None
+        self.reset_timeout = reset_timeout
+        self.opened_until = 0.0
+
+    def allow(self):
+        """True if the device should be read now."""
+        if self.state == OPEN:
+            if self.clock() < self.opened_until:
+                return False
+            self.state = HALF_OPEN
+        return True
+
+    def record_success(self):
+        if self.state != CLOSED:
+            print(f"[SENSOR] {self.name} recovered")
+        self.state = CLOSED
+        self.failures = 0
+        self.last_error = None
+        self.reset_timeout = self.base_reset_timeout
+
+    def record_failure(self, error):
+        self.failures += 1
+        self.last_error = str(error) or type(error).__name__
+        if self.state == HALF_OPEN:
+            self.reset_timeout = min(self.reset_timeout * 2,
+                                     self.max_reset_timeout)
+            self._open()
+        elif self.state == CLOSED:
+            if self.failures >= self.failure_threshold:
+                self._open()
+            else:
+                print(f"[WARN] {self.name} read failed: {self.last_error}")
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_until = self.clock() + self.reset_timeout
+        print(f"[SENSOR] {self.name} disabled for {self.reset_timeout:.0f}s "
+              f"after {self.failures} failure(s): {self.last_error}")
+
+    def status(self):
+        """Summary for the payload's ``status.sensors`` block."""
+        if self.state == CLOSED and not self.failures:
+            return {"state": "ok"}
+        return {
+            "state": "failing" if self.state == CLOSED else self.state,
+            "failures": self.failures,
+            "error": self.last_error,
+        }
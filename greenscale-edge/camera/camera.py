@@ -37,6 +37,10 @@ FULL_RESOLUTION = (4608, 2592)
 # Single shared Picamera2 instance (avoid "device busy" on repeated use)
 _picam2 = None
 
+# When set, the camera is stopped and closed after every capture instead of
+# streaming between captures (low-power profile).
+POWER_SAVING = False
+
 
 def _shutdown_camera():
     """Stop the global Picamera2 instance when the process exits."""
@@ -49,6 +53,43 @@ def _shutdown_camera():
         _picam2 = None
 
 
+def _release_camera():
+    """Stop and close the camera so it draws no power until next use."""
+    cam = _picam2
+    _shutdown_camera()
+    if cam is not None:
+        try:
+            cam.close()  # release the device for the next Picamera2()
+        except Exception:
+            pass
+
+
+def close():
+    """Release the camera now, e.g. when a worker process exits."""
+    _release_camera()
+
+
+def set_power_saving(enabled):
+    """Stop the camera between captures (True) or keep it streaming."""
+    global POWER_SAVING
+    POWER_SAVING = bool(enabled)
+    if POWER_SAVING:
+        _release_camera()
+
+
+def configure(resolution=None):
+    """Change the still resolution; the camera re-initialises on next use."""
+    global FULL_RESOLUTION
+    if resolution is None:
+        return
+    resolution = tuple(int(v) for v in resolution)
+    if resolution == FULL_RESOLUTION:
+        return
+    FULL_RESOLUTION = resolution
+    _release_camera()
+    print(f"[CAMERA] Resolution set to {resolution[0]}x{resolution[1]}")
+
+
 def _init_camera():
     """Initialise the global Picamera2 instance if needed."""
     global _picam2
@@ -78,7 +119,11 @@ def _capture_raw_frame():
         numpy.ndarray with shape (H, W, 3) in **RGB** order.
     """
     cam = _init_camera()
-    frame = cam.capture_array()
+    try:
+        frame = cam.capture_array()
+    finally:
+        if POWER_SAVING:
+            _release_camera()
 
     if frame is None:
         raise RuntimeError("Failed to capture image from camera")
@@ -0,0 +1,143 @@
+"""
+Event-driven config file watcher.
+
+Uses Linux inotify (through ctypes, no extra dependency) on the directory
+holding the config file, so both in-place writes (the portal) and atomic
+renames (the command channel) are seen. Bursts of events are debounced,
+then the file is loaded and validated in one step; an invalid file is
+reported and ignored, leaving the running config untouched. On systems
+without inotify it falls back to polling the file's mtime.
+
+The watcher never applies changes itself: it stores the validated config
+and sets ``wake`` so the main loop can swap it in on its own thread.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+from pathlib import Path
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def _inotify_fd(directory):
+    """Return an inotify fd watching ``directory``, or None if unsupported."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6",
+                           use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, str(directory).encode(), WATCH_MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _event_names(data):
+    """Yield the file names from a buffer of raw inotify events."""
+    offset = 0
+    while offset + _EVENT_HEADER.size <= len(data):
+        _wd, _mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+        offset += _EVENT_HEADER.size
+        name = data[offset:offset + length].rstrip(b"\0")
+        offset += length
+        yield name.decode(errors="replace")
+
+
+class ConfigWatcher:
+    """Watches one config file and hands validated reloads to the caller."""
+
+    def __init__(self, path, load, wake=None, debounce=0.25,
+                 poll_interval=2.0, use_inotify=True):
+        self.path = Path(path)
+        self.load = load
+        self.wake = wake
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.mode = None
+        self._pending = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        fd = _inotify_fd(self.path.parent) if self.use_inotify else None
+        self.mode = "inotify" if fd is not None else "poll"
+        target = self._watch_inotify if fd is not None else self._watch_poll
+        self._thread = threading.Thread(
+            target=target, args=(fd,), name="config-watch", daemon=True)
+        self._thread.start()
+        print(f"[CONFIG] Watching {self.path} ({self.mode})")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def take(self):
+        """Return the newest validated config once, or None."""
+        with self._lock:
+            pending, self._pending = self._pending, None
+        return pending
+
+    def _reload(self):
+        try:
+            config = self.load()
+        except Exception as e:
+            print(f"[WARN] Ignoring invalid config {self.path}: {e}")
+            return
+        with self._lock:
+            self._pending = config
+        if self.wake is not None:
+            self.wake.set()
+
+    def _watch_inotify(self, fd):
+        try:
+            while not self._stop.is_set():
+                if not self._wait_for_event(fd, 1.0):
+                    continue
+                # Debounce: keep draining until the writer has gone quiet.
+                while self._wait_for_event(fd, self.debounce):
+                    pass
+                self._reload()
+        finally:
+            os.close(fd)
+
+    def _wait_for_event(self, fd, timeout):
+        """True if an event for our file arrives within ``timeout``."""
+        ready, _, _ = select.select([fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            data = os.read(fd, 4096)
+        except BlockingIOError:
+            return False
+        return self.path.name in _event_names(data)
+
+    def _mtime(self):
+        try:
+            return self.path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _watch_poll(self, _fd=None):
+        last = self._mtime()
+        while not self._stop.wait(self.poll_interval):
+            mtime = self._mtime()
+            if mtime != last and mtime is not None:
+                last = mtime
+                self._stop.wait(self.debounce)
+                self._reload()
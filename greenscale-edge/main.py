@@ -1,12 +1,31 @@
 import os
 import socket
 import time
-from datetime import datetime, UTC
 from network.mqtt import MQTTPublisher
+from network.commands import CommandChannel, CommandError
+from network.upload import SnapshotUploader
+from config_watcher import ConfigWatcher
+from scheduler import Scheduler
+from adaptive import AdaptiveRate
+from sd_watchdog import Deadlines, SystemdWatchdog
+from breaker import CircuitBreaker
+from power import PROFILES, EnergyMeter
+from pump_control import DEFAULT_SETTINGS as PUMP_DEFAULTS, validate_settings as validate_pump
+from pipeline import Pipeline, Worker
+from telemetry.aggregate import WindowAggregator
+from telemetry.anomaly import AnomalyDetector
+from telemetry.board import DEFAULT_PATH as BOARD_PATH, StateBoard
+from telemetry.metrics import MetricsRegistry, MetricsServer
+from telemetry.pump_state import (
+    AERATION_POLICIES, DEFAULT_EVENTS_PATH as PUMP_EVENTS_PATH,
+    DEFAULT_STATE_PATH as PUMP_STATE_PATH, AerationGate, PumpMonitor)
+from telemetry.payload import PayloadTemplate, get_serializer, utc_timestamp
+from telemetry.store import HistoryStore
 from camera import camera
 from sensors import temp_sensor, ph_sensor, do_sensor, turbidity_sensor
 import json
 import pathlib
+import sqlite3
 
 
 CFG_PATH = pathlib.Path(os.environ.get(
@@ -25,6 +44,75 @@ DEFAULT_CONFIG = {
     "tls_client_cert": None,
     "tls_client_key": None,
     "tls_insecure": False,
+    "topic_layout": "single",
+    "snapshot_upload": False,
+    "upload_chunk_size": 16384,
+    "upload_rate_bps": 32768,
+    # Per-source sampling intervals in seconds; null follows publish_interval.
+    "sample_intervals": {"adc": 1, "temperature": None, "camera": None},
+    "camera_resolution": [4608, 2592],
+    # Local Prometheus endpoint (127.0.0.1 only); null disables it.
+    "metrics_port": 9108,
+    "metrics_in_status": False,
+    # Local sample history; null history_path keeps history.db next to
+    # config.json.
+    "history_enable": True,
+    "history_path": None,
+    "history_raw_days": 7,
+    "history_rollup_days": 365,
+    # Seconds before a hardware read is abandoned; null disables the deadline.
+    "stage_timeouts": {
+        "temperature": 5,
+        "ph": 2,
+        "dissolved_oxygen": 2,
+        "turbidity": 2,
+        "camera": 20,
+    },
+    # Stop pinging the systemd watchdog (forcing a restart) once a stage has
+    # been stuck this long; null means 3x the longest stage timeout.
+    "watchdog_max_hang_sec": None,
+    # JSON backend: "auto" uses orjson when installed, else the json module.
+    "serializer": "auto",
+    # Edge anomaly detection; alarms go to <base>/alarm as soon as a sample
+    # trips a check. rate limits are in units per minute.
+    "anomaly_enable": True,
+    "anomaly_z_threshold": 4.0,
+    "anomaly_stuck_sec": 900,
+    "anomaly_rate_limits": {"temperature_c": 0.5, "ph": 0.5, "do_mg_per_l": 1.0},
+    # Adaptive sampling: publish (and sample) faster while readings move and
+    # back off to a heartbeat while they are flat. Scales are the change per
+    # minute, or spread, that counts as activity for each metric.
+    "adaptive_sampling": False,
+    "adaptive_min_interval": 2,
+    "adaptive_max_interval": 300,
+    "adaptive_speedup_at": 1.0,
+    "adaptive_slowdown_below": 0.3,
+    "adaptive_hold_sec": 120,
+    "adaptive_scales": {
+        "temperature_c": 0.2,
+        "ph": 0.05,
+        "do_mg_per_l": 0.2,
+        "turbidity_sensor_v": 0.05,
+    },
+    # "low" powers the camera and ADC down between reads (battery sites).
+    # power_model_w overrides the watts used for the status.power estimate.
+    "power_profile": "normal",
+    "power_model_w": {},
+    # "multiprocess" reads sensors and the camera in worker processes that
+    # feed the publisher through shared-memory rings; needs a restart.
+    "pipeline": "single",
+    # Latest readings and device health for other local processes (portal,
+    # pump); null disables it.
+    "state_board_path": BOARD_PATH,
+    # Written by the pump service: its current state (reported under
+    # status.pump) and its event log (batched to the pump/events topic).
+    "pump_state_path": PUMP_STATE_PATH,
+    "pump_events_path": PUMP_EVENTS_PATH,
+    # Turbidity samples taken while the pump runs, or within
+    # pump_settle_sec after it stops: "tag" keeps them out of stats and
+    # history, "skip" also skips the camera; "off" ignores the pump.
+    "pump_artifacts": "tag",
+    "pump_settle_sec": 30,
 }
 
 
@@ -36,68 +124,673 @@ def load_config():
     return config
 
 
-cfg = load_config()
-BROKER_HOST = cfg.get("broker_host", "192.168.1.100")
-BROKER_USERNAME = cfg.get("broker_username")
-BROKER_PASSWORD = cfg.get("broker_password")
-BROKER_PORT = cfg.get("broker_port", 1883)
-TLS_ENABLE = cfg.get("tls_enable", False)
-TLS_CA_CERT = cfg.get("tls_ca_cert")
-TLS_CLIENT_CERT = cfg.get("tls_client_cert")
-TLS_CLIENT_KEY = cfg.get("tls_client_key")
-TLS_INSECURE = cfg.get("tls_insecure", False)
-PUBLISH_INTERVAL = cfg.get("publish_interval", 10)
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_config(config):
+    """Raise ValueError if a loaded config is unusable."""
+    if not isinstance(config.get("broker_host"), str) or not config["broker_host"]:
+        raise ValueError("broker_host must be a non-empty string")
+    port = config.get("broker_port")
+    if not isinstance(port, int) or isinstance(port, bool) or not 0 < port < 65536:
+        raise ValueError("broker_port must be an integer between 1 and 65535")
+    if not _is_number(config.get("publish_interval")) or config["publish_interval"] <= 0:
+        raise ValueError("publish_interval must be a positive number")
+    if config.get("topic_layout") not in TOPIC_LAYOUTS:
+        raise ValueError(f"topic_layout must be one of {', '.join(TOPIC_LAYOUTS)}")
+    for key in ("upload_chunk_size", "upload_rate_bps"):
+        value = config.get(key)
+        if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+            raise ValueError(f"{key} must be a positive integer")
+    intervals = config.get("sample_intervals") or {}
+    if not isinstance(intervals, dict):
+        raise ValueError("sample_intervals must be an object")
+    for source, interval in intervals.items():
+        if interval is not None and (not _is_number(interval) or interval <= 0):
+            raise ValueError(f"sample_intervals.{source} must be positive or null")
+    metrics_port = config.get("metrics_port")
+    if metrics_port is not None and (
+            not isinstance(metrics_port, int) or isinstance(metrics_port, bool)
+            or not 0 < metrics_port < 65536):
+        raise ValueError("metrics_port must be a port number or null")
+    for key in ("history_raw_days", "history_rollup_days"):
+        if not _is_number(config.get(key)) or config[key] <= 0:
+            raise ValueError(f"{key} must be a positive number")
+    timeouts = config.get("stage_timeouts") or {}
+    if not isinstance(timeouts, dict):
+        raise ValueError("stage_timeouts must be an object")
+    for stage, timeout in timeouts.items():
+        if timeout is not None and (not _is_number(timeout) or timeout <= 0):
+            raise ValueError(f"stage_timeouts.{stage} must be positive or null")
+    max_hang = config.get("watchdog_max_hang_sec")
+    if max_hang is not None and (not _is_number(max_hang) or max_hang <= 0):
+        raise ValueError("watchdog_max_hang_sec must be a positive number or null")
+    if config.get("serializer") not in ("auto", "orjson", "json"):
+        raise ValueError("serializer must be auto, orjson or json")
+    for key in ("anomaly_z_threshold", "anomaly_stuck_sec"):
+        if not _is_number(config.get(key)) or config[key] <= 0:
+            raise ValueError(f"{key} must be a positive number")
+    limits = config.get("anomaly_rate_limits") or {}
+    if not isinstance(limits, dict):
+        raise ValueError("anomaly_rate_limits must be an object")
+    for metric, limit in limits.items():
+        if limit is not None and (not _is_number(limit) or limit <= 0):
+            raise ValueError(f"anomaly_rate_limits.{metric} must be positive or null")
+    for key in ("adaptive_min_interval", "adaptive_max_interval",
+                "adaptive_speedup_at", "adaptive_hold_sec"):
+        if not _is_number(config.get(key)) or config[key] <= 0:
+            raise ValueError(f"{key} must be a positive number")
+    if config["adaptive_min_interval"] > config["adaptive_max_interval"]:
+        raise ValueError("adaptive_min_interval must not exceed adaptive_max_interval")
+    low = config.get("adaptive_slowdown_below")
+    if not _is_number(low) or not 0 <= low < config["adaptive_speedup_at"]:
+        raise ValueError("adaptive_slowdown_below must be between 0 and adaptive_speedup_at")
+    scales = config.get("adaptive_scales") or {}
+    if not isinstance(scales, dict):
+        raise ValueError("adaptive_scales must be an object")
+    for metric, scale in scales.items():
+        if not _is_number(scale) or scale <= 0:
+            raise ValueError(f"adaptive_scales.{metric} must be a positive number")
+    if config.get("power_profile") not in PROFILES:
+        raise ValueError(f"power_profile must be one of {', '.join(PROFILES)}")
+    model = config.get("power_model_w") or {}
+    if not isinstance(model, dict) or not all(
+            _is_number(watts) and watts >= 0 for watts in model.values()):
+        raise ValueError("power_model_w must map rails to watts")
+    if config.get("pipeline") not in PIPELINES:
+        raise ValueError(f"pipeline must be one of {', '.join(PIPELINES)}")
+    pump = config.get("pump")
+    if pump is not None:
+        if not isinstance(pump, dict):
+            raise ValueError("pump must be an object")
+        validate_pump({**PUMP_DEFAULTS, **pump})
+    if config.get("pump_artifacts") not in AERATION_POLICIES:
+        raise ValueError(
+            f"pump_artifacts must be one of {', '.join(AERATION_POLICIES)}")
+    if not _is_number(config.get("pump_settle_sec")) or config["pump_settle_sec"] < 0:
+        raise ValueError("pump_settle_sec must be a non-negative number")
+    for key in ("state_board_path", "pump_state_path", "pump_events_path"):
+        path = config.get(key)
+        if path is not None and (not isinstance(path, str) or not path):
+            raise ValueError(f"{key} must be a path or null")
+    resolution = config.get("camera_resolution")
+    if (not isinstance(resolution, (list, tuple)) or len(resolution) != 2
+            or not all(isinstance(v, int) and not isinstance(v, bool) and v > 0
+                       for v in resolution)):
+        raise ValueError("camera_resolution must be [width, height]")
+    return config
+
+
+def load_valid_config():
+    return validate_config(load_config())
+
+
+def load_boot_config():
+    """Validated config for startup, or the defaults if the file is unusable.
+
+    The config watcher applies the file once it has been fixed.
+    """
+    try:
+        return load_valid_config()
+    except (OSError, TypeError, ValueError) as e:
+        print(f"[ERROR] Unusable config {CFG_PATH}, starting with defaults: {e}")
+        return DEFAULT_CONFIG.copy()
+
+
+def history_path():
+    return pathlib.Path(cfg.get("history_path") or CFG_PATH.with_name("history.db"))
+
+
+def open_history():
+    """Open the sample history store, or return None if disabled/unusable."""
+    if not cfg.get("history_enable"):
+        return None
+    try:
+        return HistoryStore(
+            history_path(),
+            raw_days=cfg["history_raw_days"],
+            rollup_days=cfg["history_rollup_days"],
+        )
+    except (OSError, sqlite3.Error) as e:
+        print(f"[WARN] Sample history disabled: {e}")
+        return None
+
+
+def open_board():
+    """Create the latest-values board, or return None if disabled/unusable."""
+    path = cfg.get("state_board_path")
+    if not path:
+        return None
+    try:
+        return StateBoard(path, METRIC_DEVICES, DEVICES)
+    except OSError as e:
+        print(f"[WARN] Latest-values board disabled: {e}")
+        return None
+
+
+def open_pump_monitor():
+    """Follow the pump service's state and events, or return None if disabled."""
+    if not cfg.get("pump_state_path") and not cfg.get("pump_events_path"):
+        return None
+    return PumpMonitor(cfg.get("pump_state_path"), cfg.get("pump_events_path"))
+
+
+def update_config_file(**changes):
+    """Merge changes into the config file, replacing it atomically."""
+    current = {}
+    if CFG_PATH.exists():
+        current = json.loads(CFG_PATH.read_text())
+    current.update(changes)
+    tmp_path = CFG_PATH.with_name(CFG_PATH.name + ".tmp")
+    tmp_path.write_text(json.dumps(current, indent=2))
+    os.replace(tmp_path, CFG_PATH)
+
+
 DEVICE_ID = os.getenv("DEVICE_ID", socket.gethostname())
-TOPIC = f"greenscale/{DEVICE_ID}/telemetry"
+BASE_TOPIC = f"greenscale/{DEVICE_ID}"
+TOPIC = f"{BASE_TOPIC}/telemetry"
+STATUS_TOPIC = f"{BASE_TOPIC}/status"
+CMD_TOPIC = f"{BASE_TOPIC}/cmd"
+CMD_REPLY_TOPIC = f"{BASE_TOPIC}/cmd/reply"
+SNAPSHOT_TOPIC = f"{BASE_TOPIC}/snapshot"
+ALARM_TOPIC = f"{BASE_TOPIC}/alarm"
+PUMP_EVENTS_TOPIC = f"{BASE_TOPIC}/pump/events"
+MAX_PUMP_EVENTS = 100
+TOPIC_LAYOUTS = ("single", "per_metric", "both")
+SOURCES = ("temperature", "adc", "camera")
+DEVICES = ("temperature", "ph", "dissolved_oxygen", "turbidity", "camera")
+METRIC_DEVICES = {
+    "temperature_c": "temperature",
+    "ph": "ph",
+    "do_mg_per_l": "dissolved_oxygen",
+    "turbidity_sensor_v": "turbidity",
+    "turbidity_index": "camera",
+    "avg_color_hex": "camera",
+}
+CAMERA_METRICS = ("turbidity_index", "avg_color_hex")
+PIPELINES = ("single", "multiprocess")
+cfg = load_boot_config()
 
+# Stage timings and counters, served on /metrics.
+metrics = MetricsRegistry()
+SERIALIZER, _dumps = get_serializer(cfg.get("serializer", "auto"))
+# Each device is read under its own deadline and circuit breaker, so one
+# failing or hung device never holds back the others.
+deadlines = Deadlines(cfg.get("stage_timeouts"))
+breakers = {name: CircuitBreaker(name) for name in DEVICES}
+# Read time per device feeds the per-cycle energy estimate.
+energy = EnergyMeter(cfg["power_profile"], cfg["power_model_w"])
+# Duration of each device's last read, handed to the publisher by pipeline
+# workers; and the device health they report, keyed by device.
+read_times = {}
+worker_status = {}
 
-# === Data Collection ===
-def collect_sensor_data():
-    """Gather current readings from available sensors."""
+
+def adaptive_settings(config):
+    """AdaptiveRate.configure() arguments from a config dict."""
     return {
-        "temperature_c": temp_sensor.read()["value"],
-        "ph": ph_sensor.read()["value"],
-        "do_mg_per_l": do_sensor.read()["value"],
-        "turbidity_sensor_v": turbidity_sensor.read()["value"],
+        "min_interval": config["adaptive_min_interval"],
+        "max_interval": config["adaptive_max_interval"],
+        "speedup_at": config["adaptive_speedup_at"],
+        "slowdown_below": config["adaptive_slowdown_below"],
+        "hold_sec": config["adaptive_hold_sec"],
+        "scales": config["adaptive_scales"],
     }
 
 
-def collect_camera_data():
-    """Capture camera frame and compute turbidity + average color."""
+# Used only while adaptive_sampling is on; starts at publish_interval.
+sampling = AdaptiveRate(cfg["publish_interval"], **adaptive_settings(cfg))
+# The monitor is attached in main(), before any worker is forked.
+aeration = AerationGate(policy=cfg["pump_artifacts"],
+                        settle_sec=cfg["pump_settle_sec"])
+
+
+def guarded_read(device, read, *args, **kwargs):
+    """Return ``read(*args, **kwargs)``, or None if the device is failing."""
+    breaker = breakers[device]
+    if not breaker.allow():
+        return None
+    started = time.monotonic()
     try:
-        metrics = camera.compute_camera_metrics()
-        # Make sure keys exist and types are sane
-        return {
-            "turbidity_index": float(metrics.get("turbidity_index", 0.0)),
-            "avg_color_hex": str(metrics.get("avg_color_hex", "#000000")),
-        }
+        with metrics.time(device):
+            result = deadlines.call(device, read, *args, **kwargs)
     except Exception as e:
-        # If the camera fails, log and fall back to defaults
-        print(f"[WARN] collect_camera_data failed: {e}")
-        return {
-            "turbidity_index": 0.0,
-            "avg_color_hex": "#000000",
-        }
+        breaker.record_failure(e)
+        return None
+    finally:
+        read_times[device] = time.monotonic() - started
+        energy.add(device, read_times[device])
+    breaker.record_success()
+    return result
 
 
-def build_payload(sensor_data, camera_data):
-    """Build a full MQTT payload matching team schema."""
+def _value(reading):
+    return reading["value"] if reading is not None else None
+
+
+def apply_power_profile(profile):
+    """Power the camera and ADC down between reads ("low") or not."""
+    low = profile == "low"
+    camera.set_power_saving(low)
+    try:
+        from sensors import adc
+    except ImportError as e:
+        print(f"[WARN] ADC conversion mode unchanged: {e}")
+    else:
+        try:
+            adc.set_single_shot(low)
+        except OSError as e:
+            print(f"[WARN] ADC conversion mode unchanged: {e}")
+    energy.profile = profile
+    print(f"[POWER] Using the {profile} power profile")
+
+
+def configure_hardware():
+    """Apply the boot config to the camera and ADC in the reading process."""
+    if tuple(cfg["camera_resolution"]) != tuple(DEFAULT_CONFIG["camera_resolution"]):
+        camera.configure(resolution=cfg["camera_resolution"])
+    if cfg["power_profile"] != "normal":
+        apply_power_profile(cfg["power_profile"])
+
+
+def device_status():
+    """Per-device health for the payload's ``status.sensors`` block."""
+    return {name: worker_status.get(name) or breaker.status()
+            for name, breaker in breakers.items()}
+
+
+# === Multi-process pipeline ===
+def _report(metric):
+    """A worker's ``(status, busy)`` for a metric it just read."""
+    device = METRIC_DEVICES[metric]
+    return breakers[device].status(), read_times.pop(device, 0.0)
+
+
+def reload_worker_config():
+    """Pick up config.json changes inside a pipeline worker."""
+    try:
+        new_cfg = load_valid_config()
+    except (OSError, TypeError, ValueError) as e:
+        print(f"[WARN] Worker kept its config: {e}")
+        return
+    apply_config(new_cfg)
+    deadlines.timeouts = cfg["stage_timeouts"] or {}
+    aeration.configure(cfg["pump_artifacts"], cfg["pump_settle_sec"])
+
+
+def build_pipeline():
+    """Acquisition and camera workers; start() before any thread exists."""
+    latest = {}
+
+    def sample_temperature():
+        reading = read_temperature()
+        latest.update(reading)
+        return reading
+
+    def sample_adc():
+        return read_adc(latest.get("temperature_c"))
+
+    def sample_camera():
+        return {} if aeration.skipping() else collect_camera_data()
+
+    acquisition = Worker(
+        "acquisition",
+        {"temperature": sample_temperature, "adc": sample_adc},
+        _report, on_reload=reload_worker_config, on_start=configure_hardware,
+    )
+    # Frames are captured and analysed in this process; only the results
+    # are passed on.
+    camera_worker = Worker(
+        "camera", {"camera": sample_camera}, _report,
+        handlers={"snapshot": lambda: str(camera.capture_snapshot())},
+        on_reload=reload_worker_config, on_exit=camera.close,
+        on_start=configure_hardware,
+    )
+    return Pipeline([acquisition, camera_worker], task_intervals())
+
+
+def consume_pipeline(pipeline, record, sensors, camera_data):
+    """Feed worker records into the publisher's state; return the count."""
+    records = pipeline.drain()
+    readings = {}
+    for metric, value, status, busy, mono, wall in records:
+        device = METRIC_DEVICES[metric]
+        worker_status[device] = status
+        if busy:
+            energy.add(device, busy)
+            metrics.observe(device, busy)
+        # Metrics read together share a timestamp; keep them together.
+        readings.setdefault((mono, wall), {})[metric] = value
+    for (mono, wall), reading in readings.items():
+        clean, latest = aeration.split(reading)
+        if clean:
+            record(clean, ts_ms=wall * 1000, now=mono)
+        for metric, value in latest.items():
+            target = camera_data if metric in CAMERA_METRICS else sensors
+            target[metric] = value
+    return len(records)
+
+
+# === Data Collection ===
+def read_temperature():
+    """Read the 1-Wire temperature probe."""
+    return {"temperature_c": _value(guarded_read("temperature", temp_sensor.read))}
+
+
+def read_adc(temp_c=None):
+    """Read the ADS1115 channels (pH, dissolved oxygen, turbidity).
+
+    DO compensation reuses ``temp_c`` when given instead of reading the
+    slow 1-Wire probe again. A failed channel reads as None.
+    """
+    return {
+        "ph": _value(guarded_read("ph", ph_sensor.read)),
+        "do_mg_per_l": _value(
+            guarded_read("dissolved_oxygen", do_sensor.read, temp_c=temp_c)),
+        "turbidity_sensor_v": _value(
+            guarded_read("turbidity", turbidity_sensor.read)),
+    }
+
+
+def collect_sensor_data():
+    """Gather current readings from available sensors."""
+    data = read_temperature()
+    data.update(read_adc(data["temperature_c"]))
+    return data
+
+
+def collect_camera_data():
+    """Capture camera frame and compute turbidity + average color.
+
+    Returns None values while the camera is failing; the reason is in
+    device_status().
+    """
+    result = guarded_read("camera", camera.compute_camera_metrics)
+    if result is None:
+        return {"turbidity_index": None, "avg_color_hex": None}
+    # Make sure keys exist and types are sane
     return {
+        "turbidity_index": float(result.get("turbidity_index", 0.0)),
+        "avg_color_hex": str(result.get("avg_color_hex", "#000000")),
+    }
+
+
+def build_status(extra_status=None):
+    status = {
+        "online": True,
+        "uptime_sec": int(time.monotonic()),
+    }
+    if extra_status:
+        status.update(extra_status)
+    return status
+
+
+def build_payload(sensor_data, camera_data, extra_status=None, stats=None,
+                  timestamp=None):
+    """Build a full MQTT payload matching team schema.
+
+    ``sensors``/``camera`` carry the latest value of each metric; ``stats``
+    (when given) holds min/max/mean/std/last/count per metric for the
+    samples taken since the previous publish.
+    """
+    payload = {
         "version": 1,
         "device_id": DEVICE_ID,
-        "timestamp": datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ"),
-        "status": {
-            "online": True,
-            "uptime_sec": int(time.monotonic()),
-        },
+        "timestamp": timestamp or utc_timestamp(),
+        "status": build_status(extra_status),
         "sensors": sensor_data,
         "camera": camera_data,
     }
+    if stats is not None:
+        payload["stats"] = stats
+    return payload
+
+
+def publish_payload(publisher, payload, layout="single", encoded=None):
+    """Publish a payload using the configured topic layout.
+
+    "single" sends the full document to TOPIC, "per_metric" sends one
+    retained message per metric under BASE_TOPIC, and "both" does both.
+    ``encoded`` is the document already encoded by a PayloadTemplate; it
+    is sent as is instead of serialising ``payload`` again.
+    """
+    if layout not in TOPIC_LAYOUTS:
+        print(f"[WARN] Unknown topic_layout '{layout}', using 'single'")
+        layout = "single"
+    ok = True
+    if layout in ("single", "both"):
+        ok = publisher.publish(encoded if encoded is not None else payload) and ok
+    if layout in ("per_metric", "both"):
+        ok = publisher.publish_metrics(payload, BASE_TOPIC) and ok
+    return ok
+
+
+def publish_alarm(publisher, event):
+    """Send one anomaly alarm/clear event to ALARM_TOPIC right away.
+
+    Alarms skip the publish cycle and are spooled ahead of telemetry while
+    the broker is down, so they are the first thing delivered on reconnect.
+    """
+    message = {"device_id": DEVICE_ID, "timestamp": utc_timestamp(), **event}
+    print(f"[ALARM] {event['metric']} {event['kind']} {event['state']} "
+          f"(value {event['value']})")
+    metrics.inc("alarms", kind=event["kind"], state=event["state"])
+    return publisher.publish_to(ALARM_TOPIC, message, qos=1, priority=True)
+
+
+def publish_pump_events(publisher, events):
+    """Send the pump events logged since the last cycle, in batches."""
+    ok = True
+    for start in range(0, len(events), MAX_PUMP_EVENTS):
+        batch = events[start:start + MAX_PUMP_EVENTS]
+        message = {"device_id": DEVICE_ID, "timestamp": utc_timestamp(),
+                   "events": batch}
+        ok = publisher.publish_to(PUMP_EVENTS_TOPIC, message, qos=1) and ok
+    metrics.inc("pump_events", len(events))
+    return ok
+
+
+# === Remote Commands ===
+MIN_INTERVAL_SEC = 0.5
+MAX_INTERVAL_SEC = 86400
+MAX_BURST_SEC = 3600
+SECRET_KEYS = ("broker_password",)
+
+# High-rate sampling requested over the command channel.
+_burst = {"interval": None, "until": 0.0}
+
+
+def _burst_interval():
+    if _burst["interval"] is not None and time.monotonic() < _burst["until"]:
+        return _burst["interval"]
+    return None
+
+
+def base_interval():
+    """publish_interval, or the adaptive interval when that is enabled."""
+    if cfg.get("adaptive_sampling"):
+        return sampling.interval
+    return cfg["publish_interval"]
+
+
+def current_interval():
+    """Return the publish interval, honouring an active sampling burst."""
+    burst = _burst_interval()
+    return burst if burst is not None else base_interval()
+
+
+def task_intervals():
+    """Interval for each scheduled task from config and any active burst.
+
+    With adaptive sampling, source intervals scale with the publish
+    interval (keeping their ratio to publish_interval) but are never slower
+    than it.
+    """
+    burst = _burst_interval()
+    intervals = {"publish": current_interval()}
+    configured = cfg.get("sample_intervals") or {}
+    adaptive = cfg.get("adaptive_sampling") and cfg["publish_interval"] > 0
+    for source in SOURCES:
+        interval = configured.get(source) or cfg["publish_interval"]
+        if adaptive:
+            interval = min(interval * sampling.interval / cfg["publish_interval"],
+                           sampling.interval)
+        if burst is not None:
+            interval = min(interval, burst)
+        intervals[source] = interval
+    # A zero or negative interval would spin the loop; clamp it.
+    return {name: max(MIN_INTERVAL_SEC, interval)
+            for name, interval in intervals.items()}
+
+
+def _check_interval(value, name):
+    if not _is_number(value):
+        raise CommandError(f"{name} must be a number")
+    if not MIN_INTERVAL_SEC <= value <= MAX_INTERVAL_SEC:
+        raise CommandError(
+            f"{name} must be between {MIN_INTERVAL_SEC} and "
+            f"{MAX_INTERVAL_SEC} seconds")
+
+
+def cmd_set_publish_interval(seconds):
+    """Change publish_interval now and persist it for restarts."""
+    _check_interval(seconds, "seconds")
+    cfg["publish_interval"] = seconds
+    update_config_file(publish_interval=seconds)
+    return {"publish_interval": seconds}
+
+
+def cmd_burst(interval=1, duration=60):
+    """Sample every ``interval`` seconds for the next ``duration`` seconds."""
+    _check_interval(interval, "interval")
+    if not _is_number(duration) or not 0 < duration <= MAX_BURST_SEC:
+        raise CommandError(
+            f"duration must be between 0 and {MAX_BURST_SEC} seconds")
+    _burst["interval"] = interval
+    _burst["until"] = time.monotonic() + duration
+    return {"interval": interval, "duration": duration}
+
+
+def cmd_snapshot(uploader=None, upload=None, capture=None):
+    """Capture a still image, optionally queueing it for upload."""
+    path = pathlib.Path((capture or camera.capture_snapshot)())
+    if upload is None:
+        upload = cfg["snapshot_upload"]
+    queued = bool(upload and uploader is not None)
+    if queued:
+        uploader.enqueue(path)
+    return {"path": str(path), "upload": queued}
+
+
+def cmd_set_pump(**changes):
+    """Merge pump settings into config.json; the pump service reloads them."""
+    block = {**(cfg.get("pump") or {}), **changes}
+    try:
+        validate_pump({**PUMP_DEFAULTS, **block})
+    except ValueError as e:
+        raise CommandError(str(e)) from None
+    cfg["pump"] = block
+    update_config_file(pump=block)
+    return {"pump": block}
+
+
+def cmd_get_config():
+    """Return the active configuration with secrets redacted."""
+    return {
+        key: ("***" if key in SECRET_KEYS and value else value)
+        for key, value in cfg.items()
+    }
+
+
+# === Config Hot Reload ===
+# Config keys mapped to MQTTPublisher.reconfigure() arguments.
+BROKER_SETTINGS = {
+    "broker_host": "host",
+    "broker_port": "port",
+    "broker_username": "username",
+    "broker_password": "password",
+    "tls_enable": "tls_enable",
+    "tls_ca_cert": "ca_cert",
+    "tls_client_cert": "client_cert",
+    "tls_client_key": "client_key",
+    "tls_insecure": "tls_insecure",
+}
+
+
+# Read once at startup; a change is stored but takes effect on restart.
+RESTART_KEYS = ("serializer", "history_enable", "history_path", "history_raw_days",
+                "history_rollup_days", "state_board_path", "metrics_port", "pipeline")
+
+
+def apply_config(new_cfg, publisher=None, uploader=None):
+    """Swap in a reloaded config and push the changes to live components.
+
+    Intervals and the topic layout are read from ``cfg`` on every loop, so
+    replacing it is enough for them; the broker connection, uploader and
+    camera are reconfigured only when their own settings changed. Returns
+    the sorted list of changed keys.
+    """
+    changed = sorted(
+        key for key in set(cfg) | set(new_cfg)
+        if cfg.get(key) != new_cfg.get(key)
+    )
+    if not changed:
+        return changed
+    cfg.clear()
+    cfg.update(new_cfg)
+
+    if publisher is not None and any(key in BROKER_SETTINGS for key in changed):
+        publisher.reconfigure(**{
+            arg: cfg.get(key) for key, arg in BROKER_SETTINGS.items()})
+    if uploader is not None and (
+            "upload_chunk_size" in changed or "upload_rate_bps" in changed):
+        uploader.configure(cfg["upload_chunk_size"], cfg["upload_rate_bps"])
+    if "camera_resolution" in changed:
+        camera.configure(resolution=cfg["camera_resolution"])
+    if "power_profile" in changed:
+        apply_power_profile(cfg["power_profile"])
+    if "power_model_w" in changed:
+        energy.configure(cfg["power_model_w"])
+    if "pump_state_path" in changed or "pump_events_path" in changed:
+        if aeration.monitor is not None:
+            aeration.monitor.close()
+        aeration.monitor = open_pump_monitor()
+
+    shown = ["broker_password" if key in SECRET_KEYS else key
+             for key in changed if key not in RESTART_KEYS]
+    if shown:
+        print(f"[CONFIG] Applied changes: {', '.join(shown)}")
+    pending = [key for key in changed if key in RESTART_KEYS]
+    if pending:
+        print(f"[CONFIG] Needs restart: {', '.join(pending)}")
+    return changed
+
+
+def register_commands(channel, uploader=None, capture=None):
+    # cfg is replaced by apply_config() on the main loop, so handlers that
+    # read or write it run there too, never alongside a reload.
+    channel.register("set_publish_interval", cmd_set_publish_interval, defer=True)
+    channel.register("burst", cmd_burst, defer=True)
+    channel.register("get_config", cmd_get_config, defer=True)
+    channel.register("set_pump", cmd_set_pump, defer=True)
+    # The camera is driven from the main loop, so snapshots are deferred.
+    channel.register(
+        "snapshot",
+        lambda upload=None: cmd_snapshot(uploader, upload, capture),
+        defer=True,
+    )
 
 
 # === Main Loop ===
 def main():
-    global cfg
+    # One monitor serves status.pump, the pump events and the aeration gate.
+    aeration.monitor = open_pump_monitor()
+    pipeline = None
+    if cfg["pipeline"] == "multiprocess":
+        # Fork the workers first: nothing below has started a thread yet.
+        pipeline = build_pipeline()
+        pipeline.start()
     publisher = MQTTPublisher(
         cfg["broker_host"],
         TOPIC,
@@ -109,28 +802,213 @@ def main():
         tls_insecure=cfg["tls_insecure"],
         username=cfg.get("broker_username"),
         password=cfg.get("broker_password"),
+        status_topic=STATUS_TOPIC,
+    )
+    publisher.metrics = metrics
+    publisher.dumps = _dumps
+    template = PayloadTemplate(DEVICE_ID, dumps=_dumps)
+    metrics_server = None
+    if cfg.get("metrics_port"):
+        metrics_server = MetricsServer(metrics, port=cfg["metrics_port"])
+        try:
+            metrics_server.start()
+        except OSError as e:
+            print(f"[WARN] Metrics endpoint unavailable: {e}")
+            metrics_server = None
+    uploader = SnapshotUploader(
+        publisher,
+        SNAPSHOT_TOPIC,
+        chunk_size=cfg["upload_chunk_size"],
+        rate_bytes_per_sec=cfg["upload_rate_bps"],
     )
+    uploader.start()
+    commands = CommandChannel(publisher, CMD_TOPIC, CMD_REPLY_TOPIC)
+    capture = None
+    if pipeline is not None:
+        def capture():
+            # The camera worker owns the camera device.
+            timeout = (cfg["stage_timeouts"] or {}).get("camera") or 30
+            return pipeline.request("camera", "snapshot", timeout=timeout)
+    register_commands(commands, uploader, capture)
+    commands.start()
     publisher.connect()
+    if pipeline is None:
+        configure_hardware()
+    # Reloads are validated on the watcher thread and applied here, between
+    # scheduler runs; the shared wake event cuts the loop's sleep short.
+    watcher = ConfigWatcher(CFG_PATH, load=load_valid_config, wake=commands.wake)
+    watcher.start()
 
     print(f"[INFO] Starting Greenscale Edge node '{DEVICE_ID}'")
-    last_mtime = 0
-    while True:
-        try:
-            mtime = CFG_PATH.stat().st_mtime
-            if mtime != last_mtime:
-                cfg = load_config()
-                last_mtime = mtime
-            sensors = collect_sensor_data()
-            camera = collect_camera_data()
-            payload = build_payload(sensors, camera)
-            publisher.publish(payload)
-            time.sleep(cfg["publish_interval"])
-        except KeyboardInterrupt:
-            print("[INFO] Exiting...")
-            break
-        except Exception as e:
-            print(f"[ERROR] Main loop exception: {e}")
-            time.sleep(5)
+    # Latest value from each source; the publish task sends whatever is
+    # current, so slow sources (camera) don't hold back fast ones (ADC).
+    sensors = {}
+    camera_data = {}
+    windows = WindowAggregator()
+    history = open_history()
+    board = open_board()
+    scheduler = Scheduler()
+    systemd = SystemdWatchdog(deadlines, max_hang=cfg["watchdog_max_hang_sec"])
+    detector = AnomalyDetector(
+        z_threshold=cfg["anomaly_z_threshold"],
+        rate_limits=cfg["anomaly_rate_limits"] or {},
+        stuck_sec=cfg["anomaly_stuck_sec"],
+    )
+
+    def record(reading, ts_ms=None, now=None):
+        windows.update(reading)
+        if history is not None:
+            history.record(reading, ts_ms)
+        if cfg.get("anomaly_enable"):
+            for event in detector.update(reading, now):
+                publish_alarm(publisher, event)
+        if cfg.get("adaptive_sampling"):
+            sampling.update(reading, now)
+        if board is not None:
+            board.update(reading, None if ts_ms is None else ts_ms / 1000)
+            board.set_health(device_status())
+            board.commit()
+
+    def sample_temperature():
+        reading = read_temperature()
+        record(reading)
+        sensors.update(reading)
+
+    def sample_adc():
+        clean, latest = aeration.split(read_adc(sensors.get("temperature_c")))
+        record(clean)
+        sensors.update(latest)
+
+    def sample_camera():
+        if aeration.skipping():
+            metrics.inc("aeration_skips")
+            return
+        clean, latest = aeration.split(collect_camera_data())
+        record(clean)
+        camera_data.update(latest)
+
+    def drain_pipeline():
+        consume_pipeline(pipeline, record, sensors, camera_data)
+
+    def publish():
+        if pipeline is not None:
+            drain_pipeline()  # the freshest readings, whatever the phase
+        status = {"overruns": scheduler.overruns(), "sensors": device_status(),
+                  "power": energy.cycle()}
+        if cfg.get("anomaly_enable"):
+            status["alarms"] = detector.active()
+        if cfg.get("adaptive_sampling"):
+            status["sampling"] = sampling.status()
+        if cfg.get("metrics_in_status"):
+            status["timings"] = metrics.summary()
+        if cfg["pump_artifacts"] != "off":
+            status["aeration"] = aeration.status()
+        pump = aeration.monitor  # replaced by apply_config on a path change
+        if pump is not None:
+            status["pump"] = pump.status()
+            events = pump.events()
+            if events:
+                publish_pump_events(publisher, events)
+        layout = cfg["topic_layout"]
+        # One timestamp per cycle. The single-document layout is encoded
+        # straight from the live dicts; nothing holds on to them afterwards
+        # because the publisher spools encoded bytes.
+        timestamp = utc_timestamp()
+        status = build_status(status)
+        stats = windows.drain()
+        payload = encoded = None
+        if layout != "per_metric":
+            # Building and encoding are one step here; count it as the
+            # serialize stage, as the publisher does for a dict payload.
+            with metrics.time("serialize"):
+                encoded = template.encode(
+                    timestamp, status, sensors, camera_data, stats)
+        if layout != "single":
+            with metrics.time("build_payload"):
+                payload = template.build(
+                    timestamp, status, sensors, camera_data, stats)
+        # Never blocks: while the broker is down the publisher spools
+        # and reconnects in the background.
+        publish_payload(publisher, payload, layout, encoded=encoded)
+        if history is not None:
+            # One write transaction per publish rather than per sample.
+            with metrics.time("history"):
+                history.flush()
+
+    def local_intervals():
+        intervals = task_intervals()
+        if pipeline is None:
+            return intervals
+        # Workers sample on their own; the loop drains their rings at the
+        # fastest source rate.
+        pipeline.set_intervals(intervals)
+        return {"pipeline": min(intervals[source] for source in SOURCES),
+                "publish": intervals["publish"]}
+
+    intervals = local_intervals()
+    # Registration order is run order when deadlines coincide: sources
+    # first, so the very first publish already carries fresh readings.
+    if pipeline is None:
+        scheduler.add("temperature", intervals["temperature"], sample_temperature)
+        scheduler.add("adc", intervals["adc"], sample_adc)
+        scheduler.add("camera", intervals["camera"], sample_camera)
+    else:
+        scheduler.add("pipeline", intervals["pipeline"], drain_pipeline)
+    scheduler.add("publish", intervals["publish"], publish)
+
+    systemd.ready(f"publishing to {TOPIC}")
+    try:
+        while True:
+            try:
+                reloaded = watcher.take()
+                if reloaded is not None:
+                    apply_config(reloaded, publisher, uploader)
+                    if pipeline is not None:
+                        pipeline.reload()
+                if pipeline is not None and pipeline.dead():
+                    # Let systemd restart the whole service.
+                    raise SystemExit(
+                        f"[ERROR] Pipeline worker(s) exited: {', '.join(pipeline.dead())}")
+                deadlines.timeouts = cfg["stage_timeouts"] or {}
+                systemd.max_hang = cfg["watchdog_max_hang_sec"]
+                detector.configure(
+                    z_threshold=cfg["anomaly_z_threshold"],
+                    rate_limits=cfg["anomaly_rate_limits"] or {},
+                    stuck_sec=cfg["anomaly_stuck_sec"],
+                )
+                sampling.configure(**adaptive_settings(cfg))
+                aeration.configure(cfg["pump_artifacts"], cfg["pump_settle_sec"])
+                for name, interval in local_intervals().items():
+                    scheduler.set_interval(name, interval)
+                scheduler.run_pending()
+                systemd.alive()
+                timeout = scheduler.time_until_next()
+                if systemd.interval is not None:
+                    timeout = min(timeout, systemd.interval)
+                # Returns early when a command arrives.
+                if commands.wait(timeout):
+                    commands.run_pending()
+            except KeyboardInterrupt:
+                print("[INFO] Exiting...")
+                break
+            except Exception as e:
+                print(f"[ERROR] Main loop exception: {e}")
+                time.sleep(5)
+    finally:
+        systemd.stopping()
+        watcher.stop()
+        if pipeline is not None:
+            pipeline.stop()
+        if history is not None:
+            history.close()
+        if board is not None:
+            board.close()
+        if aeration.monitor is not None:
+            aeration.monitor.close()
+        if metrics_server is not None:
+            metrics_server.stop()
+        uploader.stop()
+        publisher.close()
 
 
 if __name__ == "__main__":
@@ -1,10 +1,20 @@
 #!/usr/bin/env python3
 from pathlib import Path
+import sys
 
-from flask import Flask, request, render_template, redirect
+from flask import Flask, Response, jsonify, request, render_template, redirect
 import subprocess
 import json
 
+# Run as a script from network/, so make the project packages importable.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from telemetry.history_api import (  # noqa: E402
+    HistoryQueryError, etag_matches, parse_query, query_etag, stream_json)
+from telemetry.store import HistoryStore  # noqa: E402
+from telemetry.board import (  # noqa: E402
+    DEFAULT_PATH as BOARD_PATH, BoardReader, BoardUnavailable)
+
 
 def _run_nmcli(args):
     """Run an nmcli command and return the completed process."""
@@ -51,6 +61,89 @@ def config_page():
     return render_template("config.html", config=current, ok=request.args.get("ok"))
 
 
+def _open_history():
+    """Open the agent's history database read-only, or return None."""
+    history_path = None
+    if CONFIG_PATH.exists():
+        try:
+            history_path = json.loads(CONFIG_PATH.read_text()).get("history_path")
+        except Exception:
+            pass
+    path = Path(history_path) if history_path else CONFIG_PATH.with_name("history.db")
+    if not path.exists():
+        return None
+    return HistoryStore(path, readonly=True)
+
+
+def _board_path():
+    if CONFIG_PATH.exists():
+        try:
+            config = json.loads(CONFIG_PATH.read_text())
+        except Exception:
+            config = {}
+        if "state_board_path" in config:
+            return config["state_board_path"]
+    return BOARD_PATH
+
+
+# Kept open between requests; it re-maps the file if the agent restarts.
+_board = None
+
+
+@app.route("/api/latest")
+def latest_values():
+    """Latest readings and device health straight from the agent's board."""
+    global _board
+    path = _board_path()
+    if not path:
+        return jsonify(error="the latest-values board is disabled"), 404
+    if _board is None or _board.path != path:
+        _board = BoardReader(path)
+    try:
+        return jsonify(_board.read())
+    except BoardUnavailable as e:
+        return jsonify(error=str(e)), 503
+
+
+@app.route("/api/history")
+def history_metrics():
+    store = _open_history()
+    if store is None:
+        return jsonify(metrics=[])
+    try:
+        return jsonify(metrics=[
+            {"name": name, "latest": store.latest(name)}
+            for name in store.metrics()
+        ])
+    finally:
+        store.close()
+
+
+@app.route("/api/history/<metric>")
+def history_query(metric):
+    try:
+        query = parse_query(request.args, metric)
+    except HistoryQueryError as e:
+        return jsonify(error=str(e)), 400
+    store = _open_history()
+    if store is None:
+        return jsonify(error="no history recorded yet"), 404
+
+    etag = query_etag(store, query)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        store.close()
+        return Response(status=304, headers=headers)
+
+    def generate():
+        try:
+            yield from stream_json(store, query)
+        finally:
+            store.close()
+
+    return Response(generate(), mimetype="application/json", headers=headers)
+
+
 @app.route("/", methods=["GET", "POST"])
 def wifi_setup():
     form_data = {
@@ -0,0 +1,125 @@
+"""
+Remote command channel over MQTT.
+
+Commands arrive as JSON on ``greenscale/<device>/cmd``:
+
+    {"id": "42", "cmd": "set_publish_interval", "args": {"seconds": 5}}
+
+and every command is answered on ``greenscale/<device>/cmd/reply``:
+
+    {"id": "42", "cmd": "set_publish_interval", "ok": true,
+     "result": {...}, "latency_ms": 0.4}
+
+Handlers that touch nothing shared run straight away on the MQTT worker
+thread. Handlers that need the hardware (e.g. the camera) or state the main
+loop replaces (the live config) are registered with ``defer=True`` and run
+from the main loop, which is woken immediately so they are not held back
+until the next publish interval.
+"""
+
+import inspect
+import json
+import queue
+import threading
+import time
+
+
+class CommandError(Exception):
+    """Raised by a handler to reject a command with a readable reason."""
+
+
+class CommandChannel:
+    """Dispatches MQTT commands to handlers and publishes replies."""
+
+    def __init__(self, publisher, cmd_topic, reply_topic):
+        self.publisher = publisher
+        self.cmd_topic = cmd_topic
+        self.reply_topic = reply_topic
+        self.wake = threading.Event()
+        self._handlers = {}
+        self._pending = queue.SimpleQueue()
+
+    def register(self, name, handler, defer=False):
+        """Register ``handler(**args)`` for the command ``name``."""
+        self._handlers[name] = (handler, defer)
+
+    def start(self):
+        """Subscribe to the command topic."""
+        self.publisher.subscribe(self.cmd_topic, self.handle)
+
+    def handle(self, raw):
+        """Parse one incoming command and run or queue its handler."""
+        received = time.perf_counter()
+        try:
+            request = json.loads(raw)
+            if not isinstance(request, dict):
+                raise ValueError("command must be a JSON object")
+        except ValueError as e:
+            self._reply(None, None, received, error=f"invalid command: {e}")
+            return
+
+        cmd_id = request.get("id")
+        name = request.get("cmd")
+        args = request.get("args") or {}
+        if name not in self._handlers:
+            self._reply(cmd_id, name, received,
+                        error=f"unknown command: {name}")
+            return
+        if not isinstance(args, dict):
+            self._reply(cmd_id, name, received,
+                        error="args must be a JSON object")
+            return
+
+        handler, defer = self._handlers[name]
+        if defer:
+            self._pending.put((cmd_id, name, handler, args, received))
+            self.wake.set()
+            return
+        self._execute(cmd_id, name, handler, args, received)
+        # Let the main loop pick up changed settings right away.
+        self.wake.set()
+
+    def run_pending(self):
+        """Run deferred commands; call this from the main loop."""
+        while True:
+            try:
+                item = self._pending.get_nowait()
+            except queue.Empty:
+                return
+            self._execute(*item)
+
+    def wait(self, timeout):
+        """Sleep up to ``timeout`` seconds, returning early on a command."""
+        woken = self.wake.wait(max(0.0, timeout))
+        self.wake.clear()
+        return woken
+
+    def _execute(self, cmd_id, name, handler, args, received):
+        try:
+            inspect.signature(handler).bind(**args)
+        except TypeError as e:
+            self._reply(cmd_id, name, received, error=f"bad arguments: {e}")
+            return
+        try:
+            result = handler(**args)
+        except CommandError as e:
+            self._reply(cmd_id, name, received, error=str(e))
+        except Exception as e:
+            print(f"[ERROR] Command '{name}' failed: {e}")
+            self._reply(cmd_id, name, received, error=str(e))
+        else:
+            self._reply(cmd_id, name, received, result=result)
+
+    def _reply(self, cmd_id, name, received, result=None, error=None):
+        reply = {
+            "id": cmd_id,
+            "cmd": name,
+            "ok": error is None,
+            "latency_ms": round((time.perf_counter() - received) * 1000, 3),
+        }
+        if error is None:
+            reply["result"] = result
+        else:
+            reply["error"] = error
+        print(f"[CMD] {name} -> {'ok' if error is None else error}")
+        self.publisher.publish_to(self.reply_topic, reply)
@@ -1,12 +1,63 @@
+import contextlib
 import json
+import random
+import threading
 import time
+from collections import deque
 from pathlib import Path
 
 import paho.mqtt.client as mqtt
 
+# Connection states. The background worker is the only thing that moves the
+# publisher out of DISCONNECTED/BACKOFF, so callers never wait on the broker.
+STATE_DISCONNECTED = "disconnected"
+STATE_CONNECTING = "connecting"
+STATE_CONNECTED = "connected"
+STATE_BACKOFF = "backoff"
+STATE_STOPPED = "stopped"
+
+# Seconds to wait for the broker's CONNACK before treating an attempt as
+# failed.
+CONNACK_TIMEOUT = 10.0
+
+
+def metric_messages(base_topic, payload):
+    """Yield (topic, body) pairs, one per sensor/camera metric."""
+    timestamp = payload.get("timestamp")
+    for group in ("sensors", "camera"):
+        for name, value in (payload.get(group) or {}).items():
+            yield (f"{base_topic}/{group}/{name}",
+                   {"value": value, "timestamp": timestamp})
+
+
+class Backoff:
+    """Exponential backoff with jitter for reconnect attempts."""
+
+    def __init__(self, base=1.0, cap=60.0, rng=None):
+        self.base = base
+        self.cap = cap
+        self.attempts = 0
+        self._rng = rng or random.Random()
+
+    def next_delay(self):
+        """Return the next delay, drawn from [ceiling/2, ceiling]."""
+        ceiling = min(self.cap, self.base * (2 ** self.attempts))
+        self.attempts += 1
+        return self._rng.uniform(ceiling / 2, ceiling)
+
+    def reset(self):
+        self.attempts = 0
+
 
 class MQTTPublisher:
-    """Handles MQTT connection and message publishing."""
+    """Handles MQTT connection and message publishing.
+
+    The connection is owned by a background worker thread which runs the
+    paho network loop and reconnects with exponential backoff. While the
+    broker is unreachable, publish() spools messages in a bounded queue and
+    returns immediately; the spool is flushed once the link comes back.
+    The link only counts as up once the broker has acknowledged it.
+    """
 
     def __init__(
         self,
@@ -21,6 +72,10 @@ class MQTTPublisher:
         tls_insecure=False,
         username=None,
         password=None,
+        spool_size=500,
+        backoff_base=1.0,
+        backoff_max=60.0,
+        status_topic=None,
     ):
         self.host = host
         self.port = port
@@ -33,9 +88,46 @@ class MQTTPublisher:
         self.tls_insecure = tls_insecure
         self.username = username
         self.password = password
-        self.client = mqtt.Client(
+        self.status_topic = status_topic
+        self.client = self._new_client()
+        self.subscriptions = {}
+        self.state = STATE_DISCONNECTED
+        self.spool = deque(maxlen=spool_size)
+        # Alarms and other urgent messages; flushed before the normal spool.
+        self.priority_spool = deque(maxlen=spool_size)
+        self.retained_pending = {}
+        # publish() spools from the caller's thread while the worker flushes.
+        self._spool_lock = threading.Lock()
+        self.dropped = 0
+        self._backoff = Backoff(backoff_base, backoff_max)
+        self._configured = False
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._connack = threading.Event()
+        self._connect_started = 0.0
+        self._worker = None
+        # Optional telemetry.metrics.MetricsRegistry; when set, serialisation
+        # and sends of the telemetry payload are timed and counted.
+        self.metrics = None
+        # JSON encoder for dict payloads (str or bytes out); main swaps in
+        # the fastest available backend.
+        self.dumps = json.dumps
+
+    def _new_client(self):
+        client = mqtt.Client(
             callback_api_version=mqtt.CallbackAPIVersion.VERSION2)
-        self.connected = False
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+        client.on_message = self._on_message
+        return client
+
+    @property
+    def connected(self):
+        return self.state == STATE_CONNECTED
+
+    @connected.setter
+    def connected(self, value):
+        self.state = STATE_CONNECTED if value else STATE_DISCONNECTED
 
     def _configure_auth(self):
         """Configure username/password if provided."""
@@ -67,39 +159,372 @@ class MQTTPublisher:
         if self.tls_insecure:
             self.client.tls_insecure_set(True)
 
-    def connect(self, retries=3, delay=2):
-        """Connect to the MQTT broker, retrying a few times if needed."""
-        for attempt in range(retries):
-            try:
+    def _configure_will(self):
+        """Register the retained death message sent if the link drops."""
+        if not self.status_topic:
+            return
+        self.client.will_set(self.status_topic,
+                             json.dumps({"online": False}),
+                             qos=1, retain=True)
+
+    def _attempt_connect(self):
+        """Send a single connection request without sleeping.
+
+        Returns True once the request is sent; ``_on_connect`` moves the
+        publisher to CONNECTED when the broker acknowledges it.
+        """
+        self.state = STATE_CONNECTING
+        self._connack.clear()
+        self._connect_started = time.monotonic()
+        try:
+            # paho refuses a second tls_set(), so only configure once.
+            if not self._configured:
                 self._configure_auth()
                 self._configure_tls()
-                self.client.connect(self.host, self.port, self.keepalive)
-                self.client.loop_start()
-                self.connected = True
-                tls_status = " with TLS" if self.tls_enable else ""
-                message = (
-                    f"[MQTT] Connected to {self.host}:{self.port}{tls_status}")
-                print(message)
-                return True
-            except Exception as e:
-                print(
-                    f"[WARN] MQTT connect failed ({attempt+1}/{retries}): {e}")
+                self._configure_will()
+                self._configured = True
+            self.client.connect(self.host, self.port, self.keepalive)
+        except Exception as e:
+            self.state = STATE_BACKOFF
+            print(f"[WARN] MQTT connect failed: {e}")
+            return False
+        return True
+
+    def connect(self, retries=1, delay=0):
+        """Connect to the MQTT broker and start the background worker.
+
+        Makes up to ``retries`` immediate attempts and waits up to
+        ``CONNACK_TIMEOUT`` for the broker to acknowledge one. If the broker
+        is still unreachable, the worker keeps reconnecting with backoff, so
+        callers are never blocked for longer than the attempts themselves.
+        """
+        sent = False
+        for attempt in range(retries):
+            if self._attempt_connect():
+                sent = True
+                break
+            if attempt + 1 < retries:
                 time.sleep(delay)
-        print("[ERROR] MQTT: could not connect.")
-        return False
+        # The worker runs the network loop that delivers the CONNACK.
+        self._start_worker()
+        ok = sent and self._connack.wait(CONNACK_TIMEOUT)
+        if not ok:
+            print("[ERROR] MQTT: could not connect, retrying in background.")
+        return ok
 
-    def publish(self, payload, qos=1):
-        """Publish a JSON payload to the configured topic."""
-        if not self.connected and not self.connect():
-            print("[ERROR] MQTT publish skipped (no connection).")
+    def _start_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(
+            target=self._run, name="mqtt-worker", daemon=True)
+        self._worker.start()
+
+    def _run(self):
+        """Run the network loop while connected, reconnect otherwise."""
+        while not self._stop.is_set():
+            try:
+                self._step()
+            except Exception as e:
+                # Keep the worker alive; the next pass reconnects.
+                print(f"[ERROR] MQTT worker error: {e}")
+                if self.state != STATE_STOPPED:
+                    self.state = STATE_DISCONNECTED
+
+    def _step(self):
+        if self.state in (STATE_CONNECTED, STATE_CONNECTING):
+            if self.state == STATE_CONNECTED and (
+                    self.spool or self.priority_spool or self.retained_pending):
+                self._flush_spool()
+            rc = self.client.loop(timeout=1.0)
+            if rc and self.state in (STATE_CONNECTED, STATE_CONNECTING):
+                print(f"[WARN] MQTT network loop error (rc={rc})")
+                self.state = STATE_DISCONNECTED
+            elif (self.state == STATE_CONNECTING and time.monotonic()
+                    - self._connect_started > CONNACK_TIMEOUT):
+                print("[WARN] MQTT broker did not acknowledge the connection")
+                self.state = STATE_DISCONNECTED
+            return
+
+        self.state = STATE_BACKOFF
+        wait = self._backoff.next_delay()
+        print(f"[MQTT] Reconnecting in {wait:.1f}s")
+        # reconfigure() and close() cut the wait short.
+        self._wake.wait(wait)
+        self._wake.clear()
+        if not self._stop.is_set():
+            self._attempt_connect()
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties=None):
+        if client is not self.client:
+            return  # late callback from a client replaced by reconfigure()
+        if self.state == STATE_STOPPED:
+            return
+        if reason_code != 0:
+            print(f"[WARN] MQTT connection refused: {reason_code}")
+            self.state = STATE_DISCONNECTED
+            return
+        self.state = STATE_CONNECTED
+        self._backoff.reset()
+        tls_status = " with TLS" if self.tls_enable else ""
+        print(f"[MQTT] Connected to {self.host}:{self.port}{tls_status}")
+        self._resubscribe()
+        self._send_birth()
+        self._connack.set()
+
+    def _on_disconnect(
+        self, client, userdata, flags, reason_code, properties=None
+    ):
+        if self.state == STATE_STOPPED or client is not self.client:
+            return
+        print(f"[WARN] MQTT disconnected: {reason_code}")
+        self.state = STATE_DISCONNECTED
+
+    def _on_message(self, client, userdata, message):
+        entry = self.subscriptions.get(message.topic)
+        if entry is None:
+            return
+        callback, _qos = entry
+        try:
+            callback(message.payload)
+        except Exception as e:
+            print(f"[ERROR] MQTT handler for {message.topic} failed: {e}")
+
+    def _resubscribe(self):
+        """Restore subscriptions, which a clean session drops on reconnect."""
+        for topic, (_callback, qos) in self.subscriptions.items():
+            try:
+                self.client.subscribe(topic, qos=qos)
+            except Exception as e:
+                print(f"[WARN] MQTT subscribe to {topic} failed: {e}")
+
+    def subscribe(self, topic, callback, qos=1):
+        """Call ``callback(payload_bytes)`` for messages on ``topic``.
+
+        The subscription survives reconnects. Callbacks run on the worker
+        thread, so they should hand slow work off rather than block it.
+        """
+        self.subscriptions[topic] = (callback, qos)
+        if self.connected:
+            self.client.subscribe(topic, qos=qos)
+
+    def _spool(self, topic, message, qos, retain=False, priority=False):
+        with self._spool_lock:
+            if priority:
+                if len(self.priority_spool) == self.priority_spool.maxlen:
+                    self.dropped += 1
+                self.priority_spool.append((topic, message, qos))
+                return
+            if retain:
+                # Retained topics only ever expose their latest value, so
+                # keep one pending message per topic instead of history.
+                self.retained_pending.pop(topic, None)
+                self.retained_pending[topic] = (message, qos)
+                return
+            if len(self.spool) == self.spool.maxlen:
+                self.dropped += 1
+            self.spool.append((topic, message, qos))
+
+    def _publish(self, topic, message, qos, retain=False):
+        """Hand a message to paho, raising if it was not queued.
+
+        paho reports a link that dropped since the last state check in the
+        return code, not with an exception.
+        """
+        info = self.client.publish(topic, message, qos=qos, retain=retain)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            raise OSError(f"publish not queued (rc={info.rc})")
+
+    def _flush_spool(self):
+        """Send spooled messages in order, stopping at the first failure.
+
+        Runs on the worker thread. The lock is only held to take entries
+        off the spools, never across a send.
+        """
+        sent = 0
+        for spool in (self.priority_spool, self.spool):
+            while self.state == STATE_CONNECTED:
+                with self._spool_lock:
+                    if not spool:
+                        break
+                    topic, message, qos = spool.popleft()
+                try:
+                    self._publish(topic, message, qos)
+                except Exception as e:
+                    with self._spool_lock:
+                        spool.appendleft((topic, message, qos))
+                    print(f"[ERROR] MQTT spool flush failed: {e}")
+                    self.state = STATE_DISCONNECTED
+                    break
+                sent += 1
+        while self.state == STATE_CONNECTED:
+            with self._spool_lock:
+                if not self.retained_pending:
+                    break
+                topic, entry = next(iter(self.retained_pending.items()))
+            message, qos = entry
+            try:
+                self._publish(topic, message, qos, retain=True)
+            except Exception as e:
+                print(f"[ERROR] MQTT spool flush failed: {e}")
+                self.state = STATE_DISCONNECTED
+                break
+            with self._spool_lock:
+                # A newer value spooled during the send stays pending.
+                if self.retained_pending.get(topic) is entry:
+                    del self.retained_pending[topic]
+            sent += 1
+        if sent:
+            print(f"[MQTT] Flushed {sent} spooled message(s)")
+
+    def _send(self, topic, message, qos=1, retain=False, spool=True,
+              priority=False):
+        """Publish an encoded message now, or spool it while offline."""
+        if not self.connected:
+            if spool:
+                self._spool(topic, message, qos, retain, priority)
             return False
 
         try:
-            message = json.dumps(payload)
-            self.client.publish(self.topic, message, qos=qos)
-            print(f"[MQTT] Published to {self.topic}")
+            self._publish(topic, message, qos, retain)
             return True
         except Exception as e:
             print(f"[ERROR] MQTT publish failed: {e}")
+            if spool:
+                self._spool(topic, message, qos, retain, priority)
             self.connected = False
             return False
+
+    def _ensure_started(self):
+        if self._worker is None and not self.connected:
+            self.connect()
+
+    def _report_offline(self):
+        queued = (len(self.spool) + len(self.priority_spool)
+                  + len(self.retained_pending))
+        print(f"[MQTT] Offline ({self.state}), spooled message "
+              f"({queued} queued)")
+
+    def _send_birth(self):
+        """Announce the device as online on the retained status topic."""
+        if self.status_topic:
+            self._send(self.status_topic, json.dumps({"online": True}),
+                       qos=1, retain=True)
+
+    def publish(self, payload, qos=1):
+        """Publish a JSON payload (or pre-encoded bytes) to the topic.
+
+        Returns False (after spooling the message) when the broker is not
+        reachable; the first call starts the connection if connect() was
+        never called.
+        """
+        if isinstance(payload, (bytes, bytearray)):
+            message = payload  # already encoded, e.g. by PayloadTemplate
+        else:
+            with self._timed("serialize"):
+                message = self.dumps(payload)
+        self._ensure_started()
+
+        with self._timed("publish"):
+            sent = self._send(self.topic, message, qos)
+        if self.metrics is not None:
+            self.metrics.inc("mqtt_messages", result="sent" if sent else "spooled")
+        if not sent:
+            self._report_offline()
+            return False
+        print(f"[MQTT] Published to {self.topic}")
+        return True
+
+    def _timed(self, stage):
+        if self.metrics is None:
+            return contextlib.nullcontext()
+        return self.metrics.time(stage)
+
+    def publish_to(self, topic, payload, qos=1, retain=False, priority=False):
+        """Publish a JSON payload to an arbitrary topic.
+
+        ``priority`` messages are spooled separately while offline and sent
+        ahead of everything else on reconnect.
+        """
+        self._ensure_started()
+        return self._send(topic, self.dumps(payload), qos, retain,
+                          priority=priority)
+
+    def publish_raw(self, topic, data, qos=1, spool=False):
+        """Publish pre-encoded bytes; by default nothing is spooled offline.
+
+        Bulk transfers use this so they cannot crowd telemetry out of the
+        spool; they are expected to resume on their own after a reconnect.
+        """
+        return self._send(topic, data, qos, spool=spool)
+
+    def publish_metrics(self, payload, base_topic, qos=1):
+        """Publish each metric of a payload to its own retained topic.
+
+        Subscribers get the last value of e.g. ``<base>/sensors/ph`` as soon
+        as they subscribe, without parsing the full telemetry document.
+        """
+        self._ensure_started()
+        messages = list(metric_messages(base_topic, payload))
+        ok = True
+        for topic, body in messages:
+            ok = self._send(topic, self.dumps(body), qos, retain=True) and ok
+        if not ok:
+            self._report_offline()
+            return False
+        print(f"[MQTT] Published {len(messages)} metrics under {base_topic}")
+        return True
+
+    def reconfigure(self, **settings):
+        """Apply new broker settings and reconnect with them right away.
+
+        Accepts the connection keyword arguments of __init__ (host, port,
+        TLS and credentials). Spooled messages and subscriptions are kept,
+        so nothing published during the switch is lost. Returns True if
+        anything changed.
+        """
+        changed = {
+            key: value for key, value in settings.items()
+            if getattr(self, key) != value
+        }
+        if not changed:
+            return False
+        for key, value in changed.items():
+            setattr(self, key, value)
+
+        old_client = self.client
+        # paho only accepts tls_set() once per client, so start afresh.
+        self.client = self._new_client()
+        self._configured = False
+        self._backoff.reset()
+        if self.state != STATE_STOPPED:
+            self.state = STATE_DISCONNECTED
+        try:
+            old_client.disconnect()
+        except Exception:
+            pass
+        print(f"[MQTT] Reconfigured ({', '.join(sorted(changed))}), "
+              "reconnecting")
+        if self._worker is not None:
+            self._wake.set()
+        return True
+
+    def close(self):
+        """Disconnect from the broker and stop the background worker."""
+        self._stop.set()
+        self._wake.set()
+        was_connected = self.connected
+        self.state = STATE_STOPPED
+        try:
+            if self.status_topic and was_connected:
+                # A clean disconnect suppresses the Last Will, so send the
+                # death message ourselves.
+                self.client.publish(self.status_topic,
+                                    json.dumps({"online": False}),
+                                    qos=1, retain=True)
+            self.client.disconnect()
+        except Exception:
+            pass
+        if self._worker is not None:
+            self._worker.join(timeout=2)
+            self._worker = None
@@ -0,0 +1,284 @@
+"""
+Chunked, resumable snapshot upload over the existing MQTT connection.
+
+Wire format (``<base>`` is ``greenscale/<device>/snapshot``):
+
+- ``<base>/<upload_id>/meta``  JSON: name, size, chunk_size, chunks, sha256
+- ``<base>/<upload_id>/chunk`` bytes: 8-byte header (seq, crc32 as two
+  big-endian uint32) followed by at most ``chunk_size`` bytes of the file
+- ``<base>/<upload_id>/done``  JSON: name, chunks, sha256
+- ``<base>/ack``               JSON from the receiver:
+  ``{"upload_id": ..., "seq": <highest contiguous chunk received>}``
+
+The uploader keeps at most ``window`` unacknowledged chunks in flight and
+goes back to the last acknowledged chunk after a disconnect or an ack
+timeout. After ``max_retries`` ack timeouts in a row without progress it
+gives up on the file (keeping its resume state) and moves on to the next
+one. Files are read one chunk at a time, so memory use does not depend
+on the image size. ``upload_id`` is derived from the file contents, and the
+last acknowledged chunk is kept in a ``.upload`` sidecar, so an upload also
+resumes after a restart.
+"""
+
+import hashlib
+import json
+import math
+import queue
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+
+CHUNK_HEADER = struct.Struct(">II")
+
+
+class TokenBucket:
+    """Byte-rate limiter so uploads never starve telemetry."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else rate)
+        self.tokens = self.capacity
+        self._last = time.monotonic()
+
+    def consume(self, amount, stop_event=None):
+        """Block until ``amount`` tokens are available; False if stopped."""
+        amount = min(amount, self.capacity)
+        while True:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return True
+            wait = (amount - self.tokens) / self.rate
+            if stop_event is not None:
+                if stop_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+
+def file_sha256(path, chunk_size=65536):
+    """Hash a file without loading it into memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def encode_chunk(seq, data):
+    return CHUNK_HEADER.pack(seq, zlib.crc32(data)) + data
+
+
+def decode_chunk(message):
+    """Split a chunk message into (seq, data), verifying its CRC."""
+    seq, crc = CHUNK_HEADER.unpack_from(message)
+    data = message[CHUNK_HEADER.size:]
+    if zlib.crc32(data) != crc:
+        raise ValueError(f"chunk {seq} failed CRC check")
+    return seq, data
+
+
+class SnapshotUploader:
+    """Streams snapshot files to the broker in the background."""
+
+    def __init__(
+        self,
+        publisher,
+        base_topic,
+        chunk_size=16384,
+        rate_bytes_per_sec=32768,
+        window=8,
+        ack_timeout=10.0,
+        max_retries=5,
+    ):
+        self.publisher = publisher
+        self.base_topic = base_topic
+        self.ack_topic = f"{base_topic}/ack"
+        self.chunk_size = chunk_size
+        self.window = window
+        self.ack_timeout = ack_timeout
+        self.max_retries = max_retries
+        self.bucket = TokenBucket(
+            rate_bytes_per_sec, burst=max(rate_bytes_per_sec, chunk_size))
+        self._queue = queue.Queue()
+        self._acked = {}
+        self._ack_event = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Subscribe to acks and start the upload thread."""
+        self.publisher.subscribe(self.ack_topic, self.handle_ack)
+        self._thread = threading.Thread(
+            target=self._run, name="snapshot-upload", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._ack_event.set()
+        self._queue.put(None)  # wake the idle thread
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def configure(self, chunk_size=None, rate_bytes_per_sec=None):
+        """Change chunking or rate limits; an upload in progress keeps its
+        chunk size and picks the new size up with the next file."""
+        if chunk_size is not None:
+            self.chunk_size = chunk_size
+        if rate_bytes_per_sec is not None or chunk_size is not None:
+            rate = (rate_bytes_per_sec if rate_bytes_per_sec is not None
+                    else self.bucket.rate)
+            self.bucket.rate = float(rate)
+            self.bucket.capacity = float(max(rate, self.chunk_size))
+
+    def enqueue(self, path):
+        """Queue a file for upload."""
+        self._queue.put(Path(path))
+
+    def handle_ack(self, raw):
+        """Record a cumulative ack published by the receiver."""
+        try:
+            ack = json.loads(raw)
+            upload_id, seq = ack["upload_id"], int(ack["seq"])
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"[WARN] Ignoring malformed upload ack: {e}")
+            return
+        if seq > self._acked.get(upload_id, -1):
+            self._acked[upload_id] = seq
+            self._ack_event.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            path = self._queue.get()
+            if path is None:
+                continue
+            try:
+                self.upload(path)
+            except Exception as e:
+                print(f"[ERROR] Snapshot upload of {path} failed: {e}")
+
+    # --- Resume state ---------------------------------------------------
+
+    @staticmethod
+    def _state_path(path):
+        return path.with_name(path.name + ".upload")
+
+    def _load_acked(self, path, upload_id):
+        state_path = self._state_path(path)
+        try:
+            state = json.loads(state_path.read_text())
+        except (OSError, ValueError):
+            return -1
+        if state.get("upload_id") != upload_id:
+            return -1
+        return int(state.get("acked", -1))
+
+    def _save_acked(self, path, upload_id, acked):
+        self._state_path(path).write_text(
+            json.dumps({"upload_id": upload_id, "acked": acked}))
+
+    # --- Transfer -------------------------------------------------------
+
+    def upload(self, path):
+        """Upload one file, blocking until every chunk is acknowledged.
+
+        Returns False if the uploader was stopped first or the receiver
+        stopped acknowledging; the sidecar state lets a later call pick up
+        where this one left off.
+        """
+        path = Path(path)
+        size = path.stat().st_size
+        sha256 = file_sha256(path)
+        upload_id = sha256[:16]
+        chunk_size = self.chunk_size
+        chunks = max(1, math.ceil(size / chunk_size))
+        topic = f"{self.base_topic}/{upload_id}"
+        meta = {
+            "upload_id": upload_id,
+            "name": path.name,
+            "size": size,
+            "chunk_size": chunk_size,
+            "chunks": chunks,
+            "sha256": sha256,
+        }
+
+        acked = max(self._acked.get(upload_id, -1),
+                    self._load_acked(path, upload_id))
+        self._acked[upload_id] = acked
+        saved = acked
+        if acked >= 0:
+            print(f"[UPLOAD] Resuming {path.name} at chunk {acked + 1}/{chunks}")
+
+        next_seq = acked + 1
+        announced = False
+        retries = 0
+        last_progress = time.monotonic()
+        with path.open("rb") as f:
+            while acked < chunks - 1:
+                if self._stop.is_set():
+                    if acked > saved:
+                        self._save_acked(path, upload_id, acked)
+                    return False
+
+                if not self.publisher.connected:
+                    # Chunks sent before the drop may be lost; go back.
+                    announced = False
+                    next_seq = acked + 1
+                    self._stop.wait(1.0)
+                    continue
+
+                if not announced:
+                    self.publisher.publish_to(f"{topic}/meta", meta)
+                    announced = True
+                    last_progress = time.monotonic()
+
+                if next_seq < chunks and next_seq - acked <= self.window:
+                    f.seek(next_seq * chunk_size)
+                    data = f.read(chunk_size)
+                    if not self.bucket.consume(len(data), self._stop):
+                        return False
+                    if self.publisher.publish_raw(
+                            f"{topic}/chunk", encode_chunk(next_seq, data)):
+                        next_seq += 1
+                else:
+                    self._ack_event.wait(0.5)
+                    self._ack_event.clear()
+
+                new_acked = self._acked.get(upload_id, -1)
+                if new_acked > acked:
+                    acked = new_acked
+                    retries = 0
+                    last_progress = time.monotonic()
+                    if acked - saved >= self.window:
+                        self._save_acked(path, upload_id, acked)
+                        saved = acked
+                elif time.monotonic() - last_progress > self.ack_timeout:
+                    retries += 1
+                    if retries > self.max_retries:
+                        if acked > saved:
+                            self._save_acked(path, upload_id, acked)
+                        print(f"[UPLOAD] Giving up on {path.name} after "
+                              f"{self.max_retries} retries at chunk "
+                              f"{acked + 1}/{chunks}; it can be resumed later")
+                        return False
+                    print(f"[UPLOAD] Ack timeout for {path.name}, "
+                          f"resending from chunk {acked + 1}")
+                    next_seq = acked + 1
+                    last_progress = time.monotonic()
+
+        self.publisher.publish_to(f"{topic}/done", {
+            "upload_id": upload_id,
+            "name": path.name,
+            "chunks": chunks,
+            "sha256": sha256,
+        })
+        self._state_path(path).unlink(missing_ok=True)
+        self._acked.pop(upload_id, None)
+        print(f"[UPLOAD] Uploaded {path.name} ({size} bytes, {chunks} chunks)")
+        return True
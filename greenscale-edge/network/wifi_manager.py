@@ -2,12 +2,18 @@
 """
 Greenscale Wi-Fi Manager
 ------------------------
-- Connects to known Wi-Fi profiles on boot.
+- Connects to known Wi-Fi profiles on boot, strongest visible network
+  first; saved networks that a scan does not see are skipped.
 - Starts access point + setup portal if none are available.
+- Follows the interface state through `nmcli device monitor` instead of
+  polling, so a connection (or a failed attempt) is seen the moment
+  NetworkManager reports it.
 """
 
 import logging
 import os
+import queue
+import threading
 import time
 import subprocess
 import sys
@@ -17,6 +23,10 @@ from pathlib import Path
 # --- Configuration ---
 INTERFACE = os.getenv("WIFI_IFACE", "wlan0")
 WAIT_TIME = int(os.getenv("WIFI_WAIT_SEC", "40"))
+AP_WAIT_TIME = 15
+SCAN_CACHE_SEC = int(os.getenv("WIFI_SCAN_CACHE_SEC", "30"))
+# Device states that end an activation attempt that had started.
+FAILED_STATES = ("disconnected", "unavailable", "unmanaged", "failed")
 AP_BASE_SSID = os.getenv("AP_BASE_SSID", "Greenscale")
 
 logging.basicConfig(
@@ -25,6 +35,8 @@ logging.basicConfig(
 )
 log = logging.getLogger("wifi_manager")
 
+_scan_cache = {"at": None, "networks": None}
+
 # --- Helpers ---------------------------------------------------------------
 
 
@@ -50,6 +62,107 @@ def wifi_connected() -> bool:
         return False
 
 
+def split_terse(line: str):
+    """Split an `nmcli -t` line on unescaped colons."""
+    fields, current, escaped = [], [], False
+    for ch in line:
+        if escaped:
+            current.append(ch)
+            escaped = False
+        elif ch == "\\":
+            escaped = True
+        elif ch == ":":
+            fields.append("".join(current))
+            current = []
+        else:
+            current.append(ch)
+    fields.append("".join(current))
+    return fields
+
+
+def scan_networks(max_age: float = SCAN_CACHE_SEC):
+    """Visible SSIDs mapped to their best signal (0-100).
+
+    One scan serves every caller for ``max_age`` seconds. Returns None if
+    the scan failed, so the caller can fall back to trying every profile.
+    """
+    now = time.monotonic()
+    if _scan_cache["at"] is not None and now - _scan_cache["at"] < max_age:
+        return _scan_cache["networks"]
+    try:
+        res = subprocess.run(
+            ["nmcli", "-t", "-f", "SSID,SIGNAL", "device", "wifi", "list",
+             "ifname", INTERFACE, "--rescan", "yes"],
+            capture_output=True, text=True, check=False,
+        )
+    except OSError as e:
+        log.warning("Wi-Fi scan failed: %s", e)
+        return None
+    if res.returncode != 0:
+        log.warning("Wi-Fi scan failed: %s", res.stderr.strip())
+        return None
+    networks = {}
+    for line in res.stdout.splitlines():
+        fields = split_terse(line)
+        if len(fields) < 2 or not fields[0]:
+            continue  # hidden networks have no SSID in a scan
+        try:
+            signal = int(fields[1])
+        except ValueError:
+            continue
+        networks[fields[0]] = max(networks.get(fields[0], 0), signal)
+    _scan_cache.update(at=now, networks=networks)
+    log.info("Scan found %d networks", len(networks))
+    return networks
+
+
+def profile_ssid(name: str):
+    """``(ssid, hidden)`` of a saved profile; ssid is None if unknown."""
+    try:
+        res = subprocess.run(
+            ["nmcli", "-t", "-g", "802-11-wireless.ssid,802-11-wireless.hidden",
+             "connection", "show", name],
+            capture_output=True, text=True, check=False,
+        )
+    except OSError as e:
+        log.warning("Unable to read profile '%s': %s", name, e)
+        return None, False
+    fields = split_terse(res.stdout.strip()) if res.returncode == 0 else []
+    if not fields or not fields[0]:
+        return None, False
+    return fields[0], len(fields) > 1 and fields[1] == "yes"
+
+
+def rank_profiles(profiles, networks):
+    """Order ``(name, ssid, hidden)`` profiles strongest signal first.
+
+    Profiles whose network is not in the scan are dropped, except hidden
+    networks and profiles without a known SSID: a scan cannot see those,
+    so they are kept and tried last.
+    """
+    visible = [(networks[ssid], index, name)
+               for index, (name, ssid, _hidden) in enumerate(profiles)
+               if ssid in networks]
+    visible.sort(key=lambda item: (-item[0], item[1]))
+    unseen = [name for name, ssid, hidden in profiles
+              if ssid not in networks and (hidden or ssid is None)]
+    return [name for _signal, _index, name in visible] + unseen
+
+
+def choose_profiles(profiles):
+    """Saved profiles worth trying, best first."""
+    networks = scan_networks()
+    if networks is None:
+        log.info("No scan results, trying every saved profile in order.")
+        return profiles
+    details = [(name, *profile_ssid(name)) for name in profiles]
+    ranked = rank_profiles(details, networks)
+    skipped = [name for name in profiles if name not in ranked]
+    if skipped:
+        log.info("Out of range, skipping: %s", ", ".join(skipped))
+    return ranked
+
+
 def list_wifi_profiles():
     """List saved Wi-Fi client profiles (exclude AP-mode connections)."""
     try:
@@ -73,22 +186,124 @@ def list_wifi_profiles():
         return []
 
 
-def activate_profile(name: str) -> bool:
-    """Try to bring up a known Wi-Fi connection."""
-    log.info("Activating Wi-Fi profile '%s'...", name)
-    subprocess.run(["nmcli", "connection", "up", name], check=False)
-    for _ in range(WAIT_TIME):
+def parse_state(line: str, interface: str = INTERFACE):
+    """Device state from an `nmcli device monitor` line, or None."""
+    device, sep, state = line.strip().partition(": ")
+    if not sep or device != interface:
+        return None
+    return state.strip()
+
+
+class DeviceMonitor:
+    """Streams state changes of one interface from `nmcli device monitor`."""
+
+    def __init__(self, interface: str = INTERFACE, command=None):
+        self.interface = interface
+        self.command = command or ["nmcli", "device", "monitor", interface]
+        self.events = queue.Queue()
+        self.proc = None
+        self.dead = False
+
+    def start(self) -> bool:
+        """Start the monitor process; False if nmcli cannot be run."""
+        try:
+            self.proc = subprocess.Popen(
+                self.command, stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL, text=True, bufsize=1)
+        except OSError as e:
+            log.warning("nmcli monitor unavailable, polling instead: %s", e)
+            return False
+        threading.Thread(target=self._read, name="nmcli-monitor",
+                         daemon=True).start()
+        return True
+
+    def _read(self):
+        for line in self.proc.stdout:
+            state = parse_state(line, self.interface)
+            if state is not None:
+                self.events.put(state)
+        self.dead = True
+        self.events.put(None)  # wake a waiter
+
+    def clear(self):
+        """Drop events from before the next attempt."""
+        while True:
+            try:
+                self.events.get_nowait()
+            except queue.Empty:
+                return
+
+    def stop(self):
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+
+def poll_connected(timeout: float) -> bool:
+    """Fallback: check the device state once a second."""
+    deadline = time.monotonic() + timeout
+    while True:
         if wifi_connected():
-            log.info("Connected using profile '%s'", name)
             return True
+        if time.monotonic() >= deadline:
+            return False
         time.sleep(1)
+
+
+def wait_for_connection(monitor, timeout: float) -> bool:
+    """Wait for the activation just started to connect or fail.
+
+    Returns as soon as the device reports "connected", or a failure state
+    after it had started connecting; falls back to polling if the monitor
+    is missing or exits.
+    """
+    if monitor is None or monitor.dead:
+        return poll_connected(timeout)
+    deadline = time.monotonic() + timeout
+    activating = False
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        try:
+            state = monitor.events.get(timeout=remaining)
+        except queue.Empty:
+            return False
+        if state is None:
+            return poll_connected(deadline - time.monotonic())
+        log.debug("%s: %s", monitor.interface, state)
+        if state.startswith("connected"):  # also "connected (externally)"
+            return True
+        if state.startswith("connecting"):
+            activating = True
+        elif activating and state.startswith(FAILED_STATES):
+            return False
+
+
+def activate_profile(name: str, monitor=None) -> bool:
+    """Try to bring up a known Wi-Fi connection."""
+    log.info("Activating Wi-Fi profile '%s'...", name)
+    if monitor is not None:
+        monitor.clear()
+    # --wait 0: hand the activation to NetworkManager and follow its events.
+    res = subprocess.run(
+        ["nmcli", "--wait", "0", "connection", "up", name], check=False)
+    if res.returncode != 0:
+        log.warning("NetworkManager refused profile '%s'", name)
+        return False
+    if wait_for_connection(monitor, WAIT_TIME):
+        log.info("Connected using profile '%s'", name)
+        return True
     log.warning("Failed to connect using '%s'", name)
     return False
 
 # --- Access Point ----------------------------------------------------------
 
 
-def start_access_point():
+def start_access_point(monitor=None):
     """Create and start the fallback access point + config portal."""
     dev_id = get_device_id()
     ssid = f"{AP_BASE_SSID}-{dev_id}"
@@ -109,8 +324,13 @@ def start_access_point():
         "ipv6.method", "ignore"
     ], check=False)
 
-    subprocess.run(["nmcli", "connection", "up", ssid], check=False)
-    time.sleep(3)
+    if monitor is not None:
+        monitor.clear()
+    subprocess.run(["nmcli", "--wait", "0", "connection", "up", ssid], check=False)
+    if not wait_for_connection(monitor, AP_WAIT_TIME):
+        log.warning("Access point '%s' did not report up yet", ssid)
+    if monitor is not None:
+        monitor.stop()
 
     log.info("Access point '%s' active. Launching config portal...", ssid)
     portal = Path(__file__).resolve().parent / "app.py"
@@ -131,21 +351,29 @@ def main():
         log.info("Wi-Fi already connected.")
         return
 
+    monitor = DeviceMonitor()
+    if not monitor.start():
+        monitor = None
+
     profiles = list_wifi_profiles()
     if profiles:
         log.info("Found saved profiles: %s", ", ".join(profiles))
-        for p in profiles:
-            if activate_profile(p):
+        for p in choose_profiles(profiles):
+            if activate_profile(p, monitor):
+                if monitor is not None:
+                    monitor.stop()
                 return
     else:
         log.info("No saved profiles found.")
 
     if wifi_connected():
         log.info("Wi-Fi connection established.")
+        if monitor is not None:
+            monitor.stop()
         return
 
     log.warning("No active Wi-Fi. Starting fallback access point...")
-    start_access_point()
+    start_access_point(monitor)
 
 # ---------------------------------------------------------------------------
 
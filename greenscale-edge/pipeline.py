@@ -0,0 +1,231 @@
+"""
+Multi-process acquisition pipeline.
+
+With ``pipeline: "multiprocess"`` the sensors and the camera are read in
+their own forked worker processes, so a slow camera frame never holds up a
+sensor read and the NumPy/OpenCV analysis gets a core of its own. Frames
+never leave the camera worker; what crosses the process boundary is one
+fixed-layout record per metric in a shared-memory ``RingBuffer``::
+
+    mono   f64  time.monotonic() when the read finished
+    wall   f64  time.time() at the same moment
+    value  f64  the reading (NaN for a failed read)
+    busy   f32  seconds the device read took (0 for follow-up metrics)
+    metric u8   index into METRICS
+    state  u8   index into STATES (the device's circuit breaker)
+    fails  u16  consecutive failures
+    text   32s  string value (avg_color_hex) or the last error
+
+The main process drains the rings, publishes and talks to the broker.
+Sampling intervals and a config generation counter are shared through a
+small control block; workers re-read config.json when the generation
+changes. Small out-of-band requests (a snapshot) go over a pipe.
+"""
+
+import math
+import multiprocessing
+import signal
+import time
+
+from scheduler import Scheduler
+from shm_ring import RingBuffer
+
+RECORD_FORMAT = "<dddfBBH32s"
+METRICS = ("temperature_c", "ph", "do_mg_per_l", "turbidity_sensor_v",
+           "turbidity_index", "avg_color_hex")
+STRING_METRICS = ("avg_color_hex",)
+STATES = ("ok", "failing", "open", "half_open")
+TASKS = ("temperature", "adc", "camera")
+
+_METRIC_IDS = {name: index for index, name in enumerate(METRICS)}
+_STATE_IDS = {name: index for index, name in enumerate(STATES)}
+
+
+def encode(metric, value, status, busy=0.0, mono=None, wall=None):
+    """Pack one reading into RingBuffer fields."""
+    text = ""
+    if metric in STRING_METRICS:
+        text, value = value or "", math.nan
+    elif status.get("state") != "ok":
+        text = status.get("error") or ""
+    return (
+        time.monotonic() if mono is None else mono,
+        time.time() if wall is None else wall,
+        math.nan if value is None else float(value),
+        busy,
+        _METRIC_IDS[metric],
+        _STATE_IDS.get(status.get("state"), 0),
+        min(status.get("failures", 0), 0xFFFF),
+        text.encode()[:32],
+    )
+
+
+def decode(fields):
+    """Unpack RingBuffer fields into ``(metric, value, status, busy, mono, wall)``."""
+    mono, wall, value, busy, metric_id, state_id, failures, text = fields
+    metric = METRICS[metric_id]
+    text = text.rstrip(b"\0").decode(errors="replace")
+    if metric in STRING_METRICS:
+        value = text or None
+        text = ""
+    elif math.isnan(value):
+        value = None
+    state = STATES[state_id]
+    status = {"state": state}
+    if state != "ok" or failures:
+        status.update(failures=failures, error=text or None)
+    return metric, value, status, busy, mono, wall
+
+
+class Worker:
+    """A forked process running scheduler tasks that push into a ring.
+
+    ``tasks`` maps a task name (one of TASKS) to a function returning a
+    ``{metric: value}`` reading; ``report(metric)`` returns the device's
+    ``(status, busy_seconds)`` for that metric. ``handlers`` serve requests
+    sent with ``Pipeline.request()``. ``on_start`` runs in the child before
+    the first task, to set up the hardware it owns.
+    """
+
+    def __init__(self, name, tasks, report, handlers=None, on_reload=None,
+                 on_exit=None, capacity=1024, on_start=None):
+        self.name = name
+        self.tasks = tasks
+        self.report = report
+        self.handlers = handlers or {}
+        self.on_reload = on_reload
+        self.on_exit = on_exit
+        self.on_start = on_start
+        self.ring = RingBuffer(RECORD_FORMAT, capacity)
+        self.process = None
+        self.conn = None
+
+    def start(self, ctx, control):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=self._main, args=(control, child_conn),
+            name=f"greenscale-{self.name}", daemon=True)
+        self.process.start()
+
+    def _main(self, control, conn):
+        # Ctrl-C goes to the whole process group; the parent stops us.
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        try:
+            if self.on_start is not None:
+                self.on_start()
+            self._run(control, conn)
+        finally:
+            if self.on_exit is not None:
+                self.on_exit()
+
+    def _run(self, control, conn):
+        scheduler = Scheduler()
+        for name, func in self.tasks.items():
+            scheduler.add(name, control.interval(name),
+                          lambda func=func: self._push(func()))
+        generation = control.generation.value
+        while not control.stop.is_set():
+            if control.generation.value != generation:
+                generation = control.generation.value
+                if self.on_reload is not None:
+                    self.on_reload()
+            for name in self.tasks:
+                scheduler.set_interval(name, control.interval(name))
+            scheduler.run_pending()
+            if conn.poll(min(scheduler.time_until_next(), 0.5)):
+                self._serve(conn)
+
+    def _serve(self, conn):
+        try:
+            name = conn.recv()
+        except EOFError:
+            return
+        try:
+            reply = ("ok", self.handlers[name]())
+        except Exception as e:
+            reply = ("error", f"{type(e).__name__}: {e}")
+        conn.send(reply)
+
+    def _push(self, reading):
+        mono, wall = time.monotonic(), time.time()
+        for metric, value in reading.items():
+            status, busy = self.report(metric)
+            self.ring.push(*encode(metric, value, status, busy, mono, wall))
+
+
+class Control:
+    """Shared sampling intervals, config generation and stop flag."""
+
+    def __init__(self, ctx, intervals):
+        self.intervals = ctx.Array("d", [intervals[name] for name in TASKS])
+        self.generation = ctx.Value("L", 0)
+        self.stop = ctx.Event()
+
+    def interval(self, name):
+        return self.intervals[TASKS.index(name)]
+
+    def set_intervals(self, intervals):
+        for index, name in enumerate(TASKS):
+            if self.intervals[index] != intervals[name]:
+                self.intervals[index] = intervals[name]
+
+
+class Pipeline:
+    """Starts the workers and drains their rings in the main process.
+
+    Workers are forked, so start the pipeline before any other thread
+    (MQTT, metrics server, config watcher) exists.
+    """
+
+    def __init__(self, workers, intervals):
+        self.ctx = multiprocessing.get_context("fork")
+        self.workers = {worker.name: worker for worker in workers}
+        self.control = Control(self.ctx, intervals)
+
+    def start(self):
+        for worker in self.workers.values():
+            worker.start(self.ctx, self.control)
+        print(f"[PIPELINE] Started workers: {', '.join(self.workers)}")
+
+    def set_intervals(self, intervals):
+        self.control.set_intervals(intervals)
+
+    def reload(self):
+        """Tell every worker to re-read config.json."""
+        with self.control.generation.get_lock():
+            self.control.generation.value += 1
+
+    def drain(self):
+        """Decoded records from every worker, oldest first per worker."""
+        return [decode(fields) for worker in self.workers.values()
+                for fields in worker.ring.pop_all()]
+
+    def request(self, worker, name, timeout=30.0):
+        """Run handler ``name`` in ``worker`` and return its result."""
+        conn = self.workers[worker].conn
+        while conn.poll(0):
+            conn.recv()  # a late reply to a request that timed out
+        conn.send(name)
+        if not conn.poll(timeout):
+            raise TimeoutError(f"{worker} worker did not answer '{name}'")
+        status, result = conn.recv()
+        if status != "ok":
+            raise RuntimeError(result)
+        return result
+
+    def dead(self):
+        """Names of workers whose process has exited."""
+        return [name for name, worker in self.workers.items()
+                if worker.process is not None and not worker.process.is_alive()]
+
+    def dropped(self):
+        return sum(worker.ring.dropped for worker in self.workers.values())
+
+    def stop(self, timeout=5.0):
+        self.control.stop.set()
+        for worker in self.workers.values():
+            if worker.process is not None:
+                worker.process.join(timeout)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+            worker.ring.close()
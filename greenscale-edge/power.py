@@ -0,0 +1,70 @@
+"""
+Power profiles and a per-cycle energy estimate.
+
+``normal`` keeps the camera streaming and the ADS1115 converting
+continuously between reads, so both are ready instantly. ``low`` powers
+them down between cycles: the ADC runs single-shot conversions and the
+camera is stopped and closed after every capture, which costs a camera
+start-up (about 0.5 s) on each capture.
+
+``EnergyMeter`` turns measured read times into an energy estimate from a
+simple power model (watts per rail). In ``normal`` a streaming device is
+billed for the whole cycle; in ``low`` only for the time it was being
+read. The result is an estimate for comparing profiles, not a measurement.
+"""
+
+import time
+
+PROFILES = ("normal", "low")
+
+# Approximate draw in watts: the board itself, the camera module plus ISP
+# while streaming, the ADS1115 while converting and a DS18B20 conversion.
+DEFAULT_MODEL = {"base": 2.0, "camera": 1.0, "adc": 0.001, "temperature": 0.005}
+
+# Devices that share a power rail in the model.
+RAILS = {"ph": "adc", "dissolved_oxygen": "adc", "turbidity": "adc"}
+
+# Rails that stay powered between reads in the normal profile.
+ALWAYS_ON = ("camera", "adc")
+
+
+class EnergyMeter:
+    """Accumulates device active time and reports energy per publish cycle."""
+
+    def __init__(self, profile="normal", model=None, clock=time.monotonic):
+        self.clock = clock
+        self.profile = profile
+        self.configure(model)
+        self._active = {}
+        self._started = clock()
+
+    def configure(self, model=None):
+        """Replace the power model; missing rails keep their defaults."""
+        self.model = {**DEFAULT_MODEL, **(model or {})}
+
+    def add(self, device, seconds):
+        """Record ``seconds`` spent reading ``device``."""
+        rail = RAILS.get(device, device)
+        self._active[rail] = self._active.get(rail, 0.0) + seconds
+
+    def cycle(self):
+        """Close the current cycle and return its energy estimate."""
+        now = self.clock()
+        elapsed = max(now - self._started, 1e-9)
+        joules = self.model["base"] * elapsed
+        for rail, watts in self.model.items():
+            if rail == "base":
+                continue
+            if self.profile == "normal" and rail in ALWAYS_ON:
+                on_time = elapsed
+            else:
+                on_time = min(self._active.get(rail, 0.0), elapsed)
+            joules += watts * on_time
+        self._active = {}
+        self._started = now
+        return {
+            "profile": self.profile,
+            "cycle_s": round(elapsed, 2),
+            "energy_j": round(joules, 3),
+            "avg_power_w": round(joules / elapsed, 3),
+        }
@@ -1,40 +1,288 @@
 #!/usr/bin/env python3
+import json
+import os
+import pathlib
+import signal
+import threading
 import time
 import RPi.GPIO as GPIO
 
+from config_watcher import ConfigWatcher
+from pump_control import (
+    DEFAULT_SETTINGS, RAMP_STEP_SEC, ClosedLoop, TimerCycle, active_window,
+    effective_settings, ramp_steps, validate_settings)
+from telemetry.board import (
+    DEFAULT_PATH as BOARD_PATH, BoardReader, BoardUnavailable)
+from telemetry.pump_state import (
+    DEFAULT_EVENTS_PATH, DEFAULT_STATE_PATH, PumpRecorder)
+
 # ========================
 # Pump Configuration
 # ========================
 
 PUMP_PIN = 12             # BCM pin number (GPIO12)
 PWM_FREQ = 1000           # Hz
-DUTY_CYCLE = 100           # % duty during active phase
-PUMP_ON_DURATION = 20     # seconds
-PUMP_REST_DURATION = 300  # seconds (5 min)
+WRITE_RETRY_SEC = 1.0     # next step after a failed PWM write
+
+# Timings, duty, ramps, schedule windows and the control mode come from the
+# "pump" block of the agent's config.json (see pump_control.DEFAULT_SETTINGS)
+# and are reloaded whenever the file changes.
+CFG_PATH = pathlib.Path(os.environ.get(
+    "CONFIG_PATH",
+    "/home/user/greenscale-edge/greenscale-edge/config.json",
+))
+
+
+def load_settings():
+    """Return ``(pump settings, state board path, telemetry paths)``.
+
+    The telemetry paths are ``(pump_state_path, pump_events_path)``, where
+    the service shares its state and events with the agent.
+    """
+    settings = dict(DEFAULT_SETTINGS)
+    board_path = BOARD_PATH
+    telemetry = (DEFAULT_STATE_PATH, DEFAULT_EVENTS_PATH)
+    if CFG_PATH.exists():
+        with CFG_PATH.open() as f:
+            config = json.load(f)
+        if not isinstance(config, dict) or not isinstance(config.get("pump") or {}, dict):
+            raise ValueError("config.json and its pump block must be objects")
+        settings.update(config.get("pump") or {})
+        board_path = config.get("state_board_path", BOARD_PATH)
+        telemetry = (config.get("pump_state_path", DEFAULT_STATE_PATH),
+                     config.get("pump_events_path", DEFAULT_EVENTS_PATH))
+        if not all(path is None or isinstance(path, str) and path
+                   for path in telemetry):
+            raise ValueError("pump_state_path and pump_events_path must be paths or null")
+    return validate_settings(settings), board_path, telemetry
+
+
+def load_settings_or_defaults():
+    """load_settings(), or the defaults if the config is unusable."""
+    try:
+        return load_settings()
+    except (OSError, ValueError) as e:
+        # Keep aerating whatever the file says.
+        print(f"[WARN] Unusable pump config, running defaults: {e}")
+        return validate_settings(dict(DEFAULT_SETTINGS)), BOARD_PATH, telemetry_paths()
+
+
+def telemetry_paths():
+    """Where to share pump state and events with the agent (None = off)."""
+    config = {}
+    try:
+        if CFG_PATH.exists():
+            with CFG_PATH.open() as f:
+                config = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Unreadable config, default pump telemetry paths: {e}")
+    if not isinstance(config, dict):
+        config = {}
+    return (config.get("pump_state_path", DEFAULT_STATE_PATH),
+            config.get("pump_events_path", DEFAULT_EVENTS_PATH))
+
+
+def read_inputs(board, max_age):
+    """Latest DO and temperature from the agent, None when stale or failing."""
+    if board is None:
+        return None, None
+    try:
+        snapshot = board.read()
+    except BoardUnavailable:
+        return None, None
+    now = time.time()
+
+    def fresh(metric, device):
+        entry = snapshot["metrics"].get(metric)
+        health = snapshot["devices"].get(device, {})
+        if (entry is None or entry["value"] is None or entry["ts"] is None
+                or health.get("state", "ok") != "ok"
+                or now - entry["ts"] > max_age):
+            return None
+        return entry["value"]
+
+    return (fresh("do_mg_per_l", "dissolved_oxygen"),
+            fresh("temperature_c", "temperature"))
+
+
+def open_recorder(paths=None):
+    """Create the state/event recorder, or return None if unusable."""
+    try:
+        return PumpRecorder(*(paths or telemetry_paths()))
+    except OSError as e:
+        print(f"[WARN] Pump telemetry disabled: {e}")
+        return None
+
+
+class PumpService:
+    """Drives the PWM from the current settings without blocking sleeps.
+
+    Every wait is on ``wake``, which a config reload or a stop request sets,
+    so new schedules take effect at once and SIGTERM never waits out a rest
+    phase. Duty changes are ramped over ``ramp_sec``. State changes and
+    GPIO errors go to ``recorder`` (a PumpRecorder) when given; ``telemetry``
+    is the pair of paths it was opened with.
+    """
+
+    def __init__(self, pwm, settings, board_path=None, clock=time.monotonic,
+                 local_time=time.localtime, sleep=time.sleep, recorder=None,
+                 telemetry=None):
+        self.pwm = pwm
+        self.recorder = recorder
+        self.telemetry = tuple(telemetry) if telemetry else None
+        self.clock = clock
+        self.local_time = local_time
+        self.sleep = sleep
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.duty = 0.0
+        self.reason = None
+        self.window = None
+        self.timer = TimerCycle()
+        self.control = None
+        self.board = None
+        self.board_path = None
+        self.apply(settings, board_path)
+
+    def apply(self, settings, board_path=None, telemetry=None):
+        """Swap in new settings; takes effect on the next step.
+
+        New ``telemetry`` paths reopen the recorder there, so the agent
+        follows the pump when both are pointed at other files.
+        """
+        self.settings = settings
+        if telemetry is not None and tuple(telemetry) != self.telemetry:
+            if self.recorder is not None:
+                self.recorder.close()
+            self.recorder = open_recorder(telemetry)
+            self.telemetry = tuple(telemetry)
+        if settings["mode"] == "closed_loop":
+            if self.control is None:
+                self.control = ClosedLoop(settings)
+            if board_path != self.board_path:
+                if self.board is not None:
+                    self.board.close()
+                self.board = BoardReader(board_path) if board_path else None
+                self.board_path = board_path
+        else:
+            self.control = None
+        self.reason = None  # log the state under the new settings
+
+    def stop(self, *_args):
+        """Request a soft stop; usable as a signal handler."""
+        self.stopping.set()
+        self.wake.set()
+
+    def step(self):
+        """Set the duty for now; return seconds until the next decision."""
+        local = self.local_time()
+        minute = local.tm_hour * 60 + local.tm_min
+        window = active_window(self.settings, minute)
+        if window != self.window:
+            label = "none" if window is None else "{from}-{to}".format(
+                **self.settings["schedule"][window])
+            print(f"[PUMP] Schedule window: {label}")
+            self.window = window
+        settings = effective_settings(self.settings, minute)
+        now = self.clock()
+
+        if self.control is not None:
+            self.control.configure(settings)
+            do_mg_l, temp_c = read_inputs(self.board, settings["max_stale_sec"])
+            duty, reason = self.control.step(do_mg_l, temp_c, now)
+            wait = settings["control_interval"]
+            detail = f"(DO {do_mg_l} mg/L, temp {temp_c} C)"
+        else:
+            duty, wait = self.timer.step(settings, now)
+            reason = "on" if duty else "off"
+            detail = f"for {wait:.0f}s"
+        if reason != self.reason:
+            print(f"[PUMP] {reason}: duty {duty:.0f}% {detail}")
+            self.reason = reason
+        if not self.set_duty(duty):
+            # Don't wait out the phase with the pump stuck at the old duty.
+            wait = min(wait, WRITE_RETRY_SEC)
+        if self.recorder is not None:
+            self.recorder.update(self.duty, reason)
+
+        if settings.get("schedule"):
+            # Windows are minute-aligned: look again at the next minute.
+            wait = min(wait, 60 - local.tm_sec)
+        return max(0.0, wait)
+
+    def set_duty(self, duty, interruptible=True):
+        """Ramp to ``duty``; a stop request cuts an interruptible ramp short.
+
+        Returns False if a PWM write failed, leaving ``self.duty`` at the
+        last value that was written.
+        """
+        if abs(duty - self.duty) < 1 and (duty == 0) == (self.duty == 0):
+            return True
+        for value in ramp_steps(self.duty, duty, self.settings["ramp_sec"]):
+            if not self._write(value):
+                return False
+            self.duty = value
+            if value == duty:
+                break
+            if interruptible:
+                if self.stopping.wait(RAMP_STEP_SEC):
+                    break
+            else:
+                self.sleep(RAMP_STEP_SEC)
+        return True
+
+    def _write(self, duty):
+        try:
+            self.pwm.ChangeDutyCycle(duty)
+        except (RuntimeError, OSError, ValueError) as e:
+            print(f"[PUMP] GPIO error setting duty {duty:.0f}%: {e}")
+            if self.recorder is not None:
+                self.recorder.gpio_error(e)
+            return False
+        if self.recorder is not None:
+            self.recorder.gpio_ok()
+        return True
+
+    def run(self, watcher=None):
+        """Loop until stop(); reloads come from ``watcher.take()``."""
+        while not self.stopping.is_set():
+            self.wake.clear()
+            if watcher is not None:
+                reloaded = watcher.take()
+                if reloaded is not None:
+                    print("[PUMP] Settings reloaded.")
+                    self.apply(*reloaded)
+            self.wake.wait(self.step())
+        print("[PUMP] Stopping, ramping down.")
+        self.set_duty(0, interruptible=False)
+        if self.recorder is not None:
+            self.recorder.update(self.duty, "stopped")
+        if self.board is not None:
+            self.board.close()
 
 
 def pump_loop():
+    settings, board_path, telemetry = load_settings_or_defaults()
     GPIO.setmode(GPIO.BCM)
     GPIO.setup(PUMP_PIN, GPIO.OUT)
 
     pwm = GPIO.PWM(PUMP_PIN, PWM_FREQ)
     pwm.start(0)
 
-    print("[PUMP] Pump loop started.")
+    service = PumpService(pwm, settings, board_path,
+                          recorder=open_recorder(telemetry), telemetry=telemetry)
+    signal.signal(signal.SIGTERM, service.stop)
+    signal.signal(signal.SIGINT, service.stop)
+    watcher = ConfigWatcher(CFG_PATH, load_settings, wake=service.wake)
+    watcher.start()
+
+    print(f"[PUMP] Pump loop started ({settings['mode']} mode).")
     try:
-        while True:
-            # Active phase
-            print(f"[PUMP] ON for {PUMP_ON_DURATION}s at {DUTY_CYCLE}% duty")
-            pwm.ChangeDutyCycle(DUTY_CYCLE)
-            time.sleep(PUMP_ON_DURATION)
-
-            # Rest phase
-            print(f"[PUMP] OFF for {PUMP_REST_DURATION}s")
-            pwm.ChangeDutyCycle(0)
-            time.sleep(PUMP_REST_DURATION)
-    except KeyboardInterrupt:
-        print("[PUMP] Interrupted, cleaning up GPIO.")
+        service.run(watcher)
     finally:
+        watcher.stop()
+        if service.recorder is not None:
+            service.recorder.close()
         pwm.stop()
         GPIO.cleanup()
         print("[PUMP] GPIO cleaned up, exiting.")
@@ -0,0 +1,254 @@
+"""
+Closed-loop aeration control from dissolved-oxygen readings.
+
+``PIDController`` turns the DO error (target minus reading) into a pump
+duty cycle: derivative on the measurement (no kick when the target
+changes), integral frozen while the output is saturated (anti-windup) and
+the output clamped to ``[min_duty, max_duty]``.
+
+``ClosedLoop`` wraps it with the safety rules:
+
+- readings older than ``max_stale_sec`` (or a failing probe) fall back to
+  the fixed on/rest timer, so the tank is never left unaerated;
+- above ``warm_temp_c`` the duty never drops below ``warm_min_duty``;
+- duties below ``min_run_duty`` (where the pump stalls) become 0;
+- after ``max_on_sec`` of continuous running the pump rests for
+  ``cooldown_sec``;
+- the duty changes by at most ``slew_per_sec`` percent per second.
+
+``TimerCycle`` is the on/rest cycle of timer mode (and of the fallback); it
+re-reads the timings on every step, so new settings apply mid-phase.
+``schedule`` windows override timings by time of day, and ``ramp_steps``
+spreads duty changes over ``ramp_sec`` (soft start and stop).
+"""
+
+import math
+
+DEFAULT_SETTINGS = {
+    "mode": "timer",
+    # Timer mode, and the fallback while DO readings are unavailable.
+    "on_sec": 20,
+    "rest_sec": 300,
+    "duty": 100,
+    # Closed-loop mode.
+    "do_target": 6.0,
+    "kp": 25.0,
+    "ki": 0.5,
+    "kd": 0.0,
+    "min_duty": 0,
+    "max_duty": 100,
+    "min_run_duty": 30,
+    "slew_per_sec": 10.0,
+    "control_interval": 1.0,
+    "max_stale_sec": 30,
+    "warm_temp_c": 26.0,
+    "warm_min_duty": 40,
+    "max_on_sec": 3600,
+    "cooldown_sec": 120,
+    # Seconds for a full 0-100% change; 0 switches instantly.
+    "ramp_sec": 2.0,
+    # Daily windows, e.g. {"from": "22:00", "to": "06:00", "duty": 0}.
+    "schedule": [],
+}
+MODES = ("timer", "closed_loop")
+# Settings a schedule window may override.
+WINDOW_KEYS = ("on_sec", "rest_sec", "duty", "do_target", "max_duty")
+RAMP_STEP_SEC = 0.05
+
+
+def _minutes(text):
+    """Minute of the day for ``"HH:MM"``; raises ValueError."""
+    hours, _, minutes = str(text).partition(":")
+    if not (hours.isdigit() and minutes.isdigit()
+            and int(hours) < 24 and int(minutes) < 60):
+        raise ValueError(f"invalid time of day {text!r}, expected HH:MM")
+    return int(hours) * 60 + int(minutes)
+
+
+def _validate_schedule(schedule):
+    if not isinstance(schedule, list):
+        raise ValueError("pump.schedule must be a list of windows")
+    for window in schedule:
+        if not isinstance(window, dict):
+            raise ValueError("pump.schedule entries must be objects")
+        _minutes(window.get("from"))
+        _minutes(window.get("to"))
+        for key, value in window.items():
+            if key in ("from", "to"):
+                continue
+            if key not in WINDOW_KEYS:
+                raise ValueError(f"pump.schedule cannot override {key}")
+            if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+                raise ValueError(f"pump.schedule {key} must be a non-negative number")
+            if key in ("duty", "max_duty") and value > 100:
+                raise ValueError(f"pump.schedule {key} must be a percentage")
+
+
+def validate_settings(settings):
+    """Raise ValueError if a pump settings block is unusable."""
+    if settings.get("mode") not in MODES:
+        raise ValueError(f"pump.mode must be one of {', '.join(MODES)}")
+    for key, value in settings.items():
+        if key in ("mode", "schedule"):
+            continue
+        if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+            raise ValueError(f"pump.{key} must be a non-negative number")
+    for key in ("duty", "min_duty", "max_duty", "min_run_duty", "warm_min_duty"):
+        if settings[key] > 100:
+            raise ValueError(f"pump.{key} must be a percentage")
+    if settings["min_duty"] > settings["max_duty"]:
+        raise ValueError("pump.min_duty must not exceed pump.max_duty")
+    if settings["control_interval"] <= 0 or settings["on_sec"] + settings["rest_sec"] <= 0:
+        raise ValueError("pump.control_interval and the timer cycle must be positive")
+    _validate_schedule(settings.get("schedule", []))
+    return settings
+
+
+def active_window(settings, minute):
+    """Index of the first schedule window covering ``minute``, or None."""
+    for index, window in enumerate(settings.get("schedule") or ()):
+        start, end = _minutes(window["from"]), _minutes(window["to"])
+        inside = start <= minute < end if start <= end else (
+            minute >= start or minute < end)  # across midnight
+        if inside:
+            return index
+    return None
+
+
+def effective_settings(settings, minute):
+    """Settings with the active schedule window (if any) applied."""
+    index = active_window(settings, minute)
+    if index is None:
+        return settings
+    window = settings["schedule"][index]
+    return {**settings, **{key: window[key] for key in WINDOW_KEYS if key in window}}
+
+
+def ramp_steps(current, target, ramp_sec, step_sec=RAMP_STEP_SEC):
+    """Intermediate duties from ``current`` to ``target``, ending on it.
+
+    A full 0-100% swing takes ``ramp_sec``; smaller changes proportionally
+    less. Consecutive values are ``step_sec`` apart.
+    """
+    duration = ramp_sec * abs(target - current) / 100.0
+    steps = max(1, math.ceil(duration / step_sec)) if step_sec > 0 else 1
+    return [current + (target - current) * i / steps for i in range(1, steps)] + [target]
+
+
+class TimerCycle:
+    """Fixed on/rest cycle; ``step()`` returns ``(duty, seconds left in phase)``."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.on = True
+        self.since = None
+
+    def step(self, settings, now):
+        if self.since is None:
+            self.since = now
+        cycle = settings["on_sec"] + settings["rest_sec"]
+        if now - self.since >= 2 * cycle:
+            # Skip whole cycles we slept through.
+            self.since += (now - self.since) // cycle * cycle
+        while True:
+            end = self.since + (settings["on_sec"] if self.on else settings["rest_sec"])
+            if now < end:
+                break
+            self.on, self.since = not self.on, end
+        return (settings["duty"] if self.on else 0.0), end - now
+
+
+class PIDController:
+    """PID on dissolved oxygen; returns a duty cycle in percent."""
+
+    def __init__(self, target, kp, ki=0.0, kd=0.0, min_output=0.0,
+                 max_output=100.0):
+        self.target = target
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.min_output = min_output
+        self.max_output = max_output
+        self.reset()
+
+    def reset(self):
+        self.integral = 0.0
+        self.last_measurement = None
+        self.last_time = None
+
+    def update(self, measurement, now):
+        error = self.target - measurement
+        dt = 0.0 if self.last_time is None else max(0.0, now - self.last_time)
+        derivative = 0.0
+        if dt > 0 and self.last_measurement is not None:
+            derivative = -(measurement - self.last_measurement) / dt
+        self.last_measurement = measurement
+        self.last_time = now
+
+        integral = self.integral + error * dt
+        output = self.kp * error + self.ki * integral + self.kd * derivative
+        clamped = min(self.max_output, max(self.min_output, output))
+        # Anti-windup: only integrate while it does not push further into
+        # saturation.
+        if clamped == output or (output > clamped) != (error > 0):
+            self.integral = integral
+        return clamped
+
+
+class ClosedLoop:
+    """PID plus the safety rules; ``step()`` returns ``(duty, reason)``."""
+
+    def __init__(self, settings):
+        self.pid = PIDController(0.0, 0.0)
+        self.duty = 0.0
+        self.last_time = None
+        self.on_since = None
+        self.rest_until = None
+        self.timer = TimerCycle()
+        self.configure(settings)
+
+    def configure(self, settings):
+        self.settings = settings
+        pid = self.pid
+        pid.target = settings["do_target"]
+        pid.kp, pid.ki, pid.kd = settings["kp"], settings["ki"], settings["kd"]
+        pid.min_output = settings["min_duty"]
+        pid.max_output = settings["max_duty"]
+
+    def step(self, do_mg_l, temp_c, now):
+        s = self.settings
+        if do_mg_l is None:
+            target, reason = self.timer.step(s, now)[0], "fallback"
+            self.pid.reset()
+        else:
+            self.timer.reset()
+            target, reason = self.pid.update(do_mg_l, now), "pid"
+            if temp_c is not None and temp_c >= s["warm_temp_c"]:
+                if target < s["warm_min_duty"]:
+                    target, reason = s["warm_min_duty"], "warm"
+        if 0 < target < s["min_run_duty"]:
+            target = 0.0
+
+        if self.rest_until is not None:
+            if now < self.rest_until:
+                target, reason = 0.0, "cooldown"
+            else:
+                self.rest_until = None
+        if target > 0:
+            if self.on_since is None:
+                self.on_since = now
+            elif now - self.on_since >= s["max_on_sec"]:
+                self.rest_until = now + s["cooldown_sec"]
+                self.on_since = None
+                target, reason = 0.0, "cooldown"
+        else:
+            self.on_since = None
+
+        if self.last_time is not None and s["slew_per_sec"]:
+            max_step = s["slew_per_sec"] * max(0.0, now - self.last_time)
+            target = min(self.duty + max_step, max(self.duty - max_step, target))
+        self.last_time = now
+        self.duty = target
+        return target, reason
@@ -0,0 +1,112 @@
+"""
+Drift-free deadline scheduler for the acquisition loop.
+
+Each task runs on its own fixed cadence measured against the monotonic
+clock. The next deadline is always the previous deadline plus the interval,
+never "now plus the interval", so time spent reading sensors or publishing
+does not stretch the period. When a task finishes after its next deadline
+has already passed, the missed slots are skipped (keeping the original
+phase) and the overrun is counted and logged.
+"""
+
+import time
+
+
+class Task:
+    """A periodic job tracked by the scheduler."""
+
+    def __init__(self, name, interval, func, next_due):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.next_due = next_due
+        self.runs = 0
+        self.errors = 0
+        self.overruns = 0
+        self.last_duration = 0.0
+        self.max_lag = 0.0
+
+    def stats(self):
+        return {
+            "interval_s": self.interval,
+            "runs": self.runs,
+            "errors": self.errors,
+            "overruns": self.overruns,
+            "last_ms": round(self.last_duration * 1000, 1),
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+        }
+
+
+class Scheduler:
+    """Runs tasks at fixed monotonic deadlines."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.tasks = {}
+
+    def add(self, name, interval, func, delay=0.0):
+        """Schedule ``func()`` every ``interval`` seconds, first after ``delay``."""
+        if interval <= 0:
+            raise ValueError(f"interval for '{name}' must be positive")
+        task = Task(name, interval, func, self.clock() + delay)
+        self.tasks[name] = task
+        return task
+
+    def set_interval(self, name, interval):
+        """Change a task's interval without waiting out the old period."""
+        if interval <= 0:
+            raise ValueError(f"interval for '{name}' must be positive")
+        task = self.tasks[name]
+        if interval == task.interval:
+            return
+        last_due = task.next_due - task.interval
+        task.interval = interval
+        task.next_due = max(last_due + interval, self.clock())
+
+    def time_until_next(self):
+        """Seconds until the earliest deadline (0 if one is already due)."""
+        if not self.tasks:
+            return None
+        next_due = min(task.next_due for task in self.tasks.values())
+        return max(0.0, next_due - self.clock())
+
+    def run_pending(self):
+        """Run every due task in deadline order.
+
+        Exceptions from a task are logged and counted; the task keeps its
+        schedule. KeyboardInterrupt is not caught.
+        """
+        now = self.clock()
+        due = sorted(
+            (t for t in self.tasks.values() if t.next_due <= now),
+            key=lambda t: t.next_due,
+        )
+        for task in due:
+            started = self.clock()
+            task.max_lag = max(task.max_lag, started - task.next_due)
+            try:
+                task.func()
+            except Exception as e:
+                task.errors += 1
+                print(f"[ERROR] Task '{task.name}' failed: {e}")
+            finished = self.clock()
+            task.runs += 1
+            task.last_duration = finished - started
+            self._advance(task, finished)
+        return len(due)
+
+    def _advance(self, task, now):
+        task.next_due += task.interval
+        if task.next_due > now:
+            return
+        skipped = int((now - task.next_due) // task.interval) + 1
+        task.next_due += skipped * task.interval
+        task.overruns += 1
+        print(f"[SCHED] Task '{task.name}' overran its {task.interval}s "
+              f"period, skipped {skipped} slot(s)")
+
+    def stats(self):
+        return {name: task.stats() for name, task in self.tasks.items()}
+
+    def overruns(self):
+        return {name: task.overruns for name, task in self.tasks.items()}
@@ -0,0 +1,170 @@
+"""
+systemd readiness/watchdog notifications and per-stage deadlines.
+
+``sd_notify`` speaks the ``NOTIFY_SOCKET`` datagram protocol directly, so no
+python-systemd dependency is needed and everything is a no-op when the
+agent is not started by systemd.
+
+Hardware reads (1-Wire, ADS1115, ``capture_array()``) can block forever.
+``Deadlines.call`` runs a stage on a daemon thread and gives up after the
+stage's timeout, so the main loop keeps going; a stuck stage is not
+restarted until its previous call returns. ``SystemdWatchdog.alive`` is
+called once per loop iteration and pings systemd only while the loop is
+progressing and no stage has been stuck longer than ``max_hang`` (by
+default ``HANG_FACTOR`` times the longest stage timeout), so a wedged node
+is restarted by ``WatchdogSec`` instead of sitting silent.
+"""
+
+import os
+import socket
+import threading
+import time
+
+HANG_FACTOR = 3
+# max_hang when it is not set and no stage has a timeout.
+DEFAULT_MAX_HANG = 60.0
+
+
+def sd_notify(message, env=None):
+    """Send one notification to systemd; False if not running under it."""
+    env = os.environ if env is None else env
+    address = env.get("NOTIFY_SOCKET")
+    if not address:
+        return False
+    if address.startswith("@"):
+        address = "\0" + address[1:]  # abstract namespace socket
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.connect(address)
+            sock.sendall(message.encode())
+    except OSError as e:
+        print(f"[WARN] sd_notify failed: {e}")
+        return False
+    return True
+
+
+def watchdog_interval(env=None):
+    """Seconds between watchdog pings (half of WatchdogSec), or None."""
+    env = os.environ if env is None else env
+    usec = env.get("WATCHDOG_USEC")
+    if not usec:
+        return None
+    pid = env.get("WATCHDOG_PID")
+    if pid and int(pid) != os.getpid():
+        return None
+    return int(usec) / 1_000_000 / 2
+
+
+class StageTimeout(Exception):
+    """A stage missed its deadline or is still stuck from an earlier call."""
+
+
+class Deadlines:
+    """Runs named stages with a timeout each."""
+
+    def __init__(self, timeouts=None, clock=time.monotonic):
+        self.timeouts = timeouts or {}
+        self.clock = clock
+        self._stuck = {}  # stage -> (done event, started)
+
+    def call(self, stage, func, *args, **kwargs):
+        """Return ``func(*args, **kwargs)`` or raise StageTimeout.
+
+        Stages without a timeout run inline on the caller's thread.
+        """
+        timeout = self.timeouts.get(stage)
+        if not timeout:
+            return func(*args, **kwargs)
+
+        stuck = self._stuck.get(stage)
+        if stuck is not None:
+            if not stuck[0].is_set():
+                raise StageTimeout(
+                    f"{stage} still hung after "
+                    f"{self.clock() - stuck[1]:.0f}s")
+            del self._stuck[stage]
+            print(f"[WATCHDOG] Stage '{stage}' recovered")
+
+        result = {}
+        done = threading.Event()
+
+        def target():
+            try:
+                result["value"] = func(*args, **kwargs)
+            except BaseException as e:
+                result["error"] = e
+            finally:
+                done.set()
+
+        started = self.clock()
+        threading.Thread(target=target, name=f"stage-{stage}",
+                         daemon=True).start()
+        if not done.wait(timeout):
+            # Threads can't be killed; abandon it and refuse new calls
+            # until it returns.
+            self._stuck[stage] = (done, started)
+            raise StageTimeout(f"{stage} exceeded its {timeout}s deadline")
+        if "error" in result:
+            raise result["error"]
+        return result["value"]
+
+    def stuck(self):
+        """Seconds each currently stuck stage has been hung."""
+        now = self.clock()
+        return {stage: now - started
+                for stage, (done, started) in self._stuck.items()
+                if not done.is_set()}
+
+
+class SystemdWatchdog:
+    """READY/WATCHDOG/STOPPING notifications tied to main loop progress."""
+
+    def __init__(self, deadlines=None, max_hang=None, clock=time.monotonic,
+                 env=None):
+        self.env = os.environ if env is None else env
+        self.deadlines = deadlines
+        self.max_hang = max_hang
+        self.clock = clock
+        self.interval = watchdog_interval(self.env)
+        self._last_ping = None
+        self._withheld = False
+
+    def notify(self, message):
+        return sd_notify(message, self.env)
+
+    def ready(self, status=None):
+        message = "READY=1"
+        if status:
+            message += f"\nSTATUS={status}"
+        self.notify(message)
+
+    def stopping(self):
+        self.notify("STOPPING=1")
+
+    def hang_limit(self):
+        """``max_hang``, or ``HANG_FACTOR`` times the longest stage timeout."""
+        if self.max_hang is not None:
+            return self.max_hang
+        timeouts = [t for t in (self.deadlines.timeouts.values()
+                                if self.deadlines is not None else ()) if t]
+        return HANG_FACTOR * max(timeouts) if timeouts else DEFAULT_MAX_HANG
+
+    def alive(self):
+        """Call once per loop iteration; pings systemd when it is due."""
+        if self.interval is None:
+            return False
+        stuck = self.deadlines.stuck() if self.deadlines is not None else {}
+        limit = self.hang_limit()
+        hung = {stage: age for stage, age in stuck.items() if age > limit}
+        if hung:
+            if not self._withheld:
+                print(f"[WATCHDOG] Withholding watchdog pings, stuck stages: "
+                      f"{', '.join(sorted(hung))}")
+                self._withheld = True
+            return False
+        self._withheld = False
+        now = self.clock()
+        if self._last_ping is not None and now - self._last_ping < self.interval / 2:
+            return False
+        self._last_ping = now
+        return self.notify("WATCHDOG=1")
@@ -109,6 +109,9 @@ addr_G = ADS1115_IIC_ADDRESS0
 
 
 class ADS1115():
+    # Conversion mode written by set_single()/set_differential().
+    mode = ADS1115_REG_CONFIG_MODE_CONTIN
+
     def set_gain(self, gain):
         '''!
           @brief Sets the gain and input voltage range.
@@ -170,6 +173,38 @@ class ADS1115():
 
         return self.channel
 
+    def set_mode(self, mode):
+        '''!
+          @brief Selects continuous or power-down single-shot conversion.
+          @param mode  ADS1115_REG_CONFIG_MODE_CONTIN or ADS1115_REG_CONFIG_MODE_SINGLE
+          @n In single-shot mode the chip converts once per read and then
+          @n powers down until the next one.
+        '''
+        self.mode = mode
+
+    def wait_ready(self, timeout=0.1):
+        '''!
+          @brief Waits for a single-shot conversion to finish.
+          @param timeout  Seconds to wait before reading anyway.
+          @return True if the conversion finished in time
+        '''
+        deadline = time.monotonic() + timeout
+        while True:
+            data = bus.read_i2c_block_data(
+                addr_G, ADS1115_REG_POINTER_CONFIG, 2)
+            # OS bit reads 1 once the device is idle again.
+            if data[0] & ADS1115_REG_CONFIG_OS_SINGLE:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.002)
+
+    def _settle(self):
+        if self.mode == ADS1115_REG_CONFIG_MODE_SINGLE:
+            self.wait_ready()
+        else:
+            time.sleep(0.1)
+
     def set_single(self):
         '''!
           @brief Configuration using a single read.
@@ -177,16 +212,16 @@ class ADS1115():
         global addr_G
         if self.channel == 0:
             CONFIG_REG = [ADS1115_REG_CONFIG_OS_SINGLE | ADS1115_REG_CONFIG_MUX_SINGLE_0 | mygain |
-                          ADS1115_REG_CONFIG_MODE_CONTIN, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
+                          self.mode, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
         elif self.channel == 1:
             CONFIG_REG = [ADS1115_REG_CONFIG_OS_SINGLE | ADS1115_REG_CONFIG_MUX_SINGLE_1 | mygain |
-                          ADS1115_REG_CONFIG_MODE_CONTIN, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
+                          self.mode, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
         elif self.channel == 2:
             CONFIG_REG = [ADS1115_REG_CONFIG_OS_SINGLE | ADS1115_REG_CONFIG_MUX_SINGLE_2 | mygain |
-                          ADS1115_REG_CONFIG_MODE_CONTIN, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
+                          self.mode, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
         elif self.channel == 3:
             CONFIG_REG = [ADS1115_REG_CONFIG_OS_SINGLE | ADS1115_REG_CONFIG_MUX_SINGLE_3 | mygain |
-                          ADS1115_REG_CONFIG_MODE_CONTIN, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
+                          self.mode, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
 
         bus.write_i2c_block_data(
             addr_G, ADS1115_REG_POINTER_CONFIG, CONFIG_REG)
@@ -198,16 +233,16 @@ class ADS1115():
         global addr_G
         if self.channel == 0:
             CONFIG_REG = [ADS1115_REG_CONFIG_OS_SINGLE | ADS1115_REG_CONFIG_MUX_DIFF_0_1 | mygain |
-                          ADS1115_REG_CONFIG_MODE_CONTIN, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
+                          self.mode, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
         elif self.channel == 1:
             CONFIG_REG = [ADS1115_REG_CONFIG_OS_SINGLE | ADS1115_REG_CONFIG_MUX_DIFF_0_3 | mygain |
-                          ADS1115_REG_CONFIG_MODE_CONTIN, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
+                          self.mode, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
         elif self.channel == 2:
             CONFIG_REG = [ADS1115_REG_CONFIG_OS_SINGLE | ADS1115_REG_CONFIG_MUX_DIFF_1_3 | mygain |
-                          ADS1115_REG_CONFIG_MODE_CONTIN, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
+                          self.mode, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
         elif self.channel == 3:
             CONFIG_REG = [ADS1115_REG_CONFIG_OS_SINGLE | ADS1115_REG_CONFIG_MUX_DIFF_2_3 | mygain |
-                          ADS1115_REG_CONFIG_MODE_CONTIN, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
+                          self.mode, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
 
         bus.write_i2c_block_data(
             addr_G, ADS1115_REG_POINTER_CONFIG, CONFIG_REG)
@@ -247,7 +282,7 @@ class ADS1115():
         '''
         self.set_channel(channel)
         self.set_single()
-        time.sleep(0.1)
+        self._settle()
         return self.read_value()
 
     def comparator_voltage(self, channel):
@@ -268,5 +303,5 @@ class ADS1115():
         '''
         self.set_channel(channel)
         self.set_differential()
-        time.sleep(0.1)
+        self._settle()
         return self.read_value()
@@ -5,19 +5,50 @@ Thin wrapper around the vendored DFRobot ADS1115 driver.
 A0 -> turbidity
 A1 -> pH
 A2 -> DO
+
+Each channel is read under its own stage deadline, and a read that misses
+it keeps running on an abandoned thread. Every bus transaction therefore
+holds ``_bus_lock``, and a caller that cannot get it within
+``BUS_WAIT_SEC`` fails instead of talking to the ADS1115 concurrently.
 """
 
-from .DFRobot_ADS1115 import ADS1115
+import threading
+
+from .DFRobot_ADS1115 import (
+    ADS1115, ADS1115_REG_CONFIG_MODE_CONTIN, ADS1115_REG_CONFIG_MODE_SINGLE)
 
 # DFRobot gain constants
 ADS1115_REG_CONFIG_PGA_6_144V = 0x00  # 6.144V range = Gain 2/3
 
+# A conversion takes ~8 ms at the default data rate.
+BUS_WAIT_SEC = 0.5
+_bus_lock = threading.Lock()
+
 _adc = ADS1115()
 _adc.set_addr_ADS1115(0x48)
 _adc.set_gain(ADS1115_REG_CONFIG_PGA_6_144V)
 
 
+def _acquire_bus() -> None:
+    if not _bus_lock.acquire(timeout=BUS_WAIT_SEC):
+        raise TimeoutError("ADS1115 busy: an earlier read is still hung")
+
+
+def set_single_shot(enabled: bool) -> None:
+    """Power the ADC down between reads (single-shot) or run it continuously."""
+    _acquire_bus()
+    try:
+        _adc.set_mode(ADS1115_REG_CONFIG_MODE_SINGLE if enabled
+                      else ADS1115_REG_CONFIG_MODE_CONTIN)
+    finally:
+        _bus_lock.release()
+
+
 def read_channel_mv(channel: int) -> float:
     """Read a channel and return millivolts as float."""
-    val = _adc.read_voltage(channel)   # {'r': <millivolts>}
+    _acquire_bus()
+    try:
+        val = _adc.read_voltage(channel)   # {'r': <millivolts>}
+    finally:
+        _bus_lock.release()
     return float(val["r"])
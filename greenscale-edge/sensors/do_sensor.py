@@ -12,8 +12,6 @@ We read:
 and compute DO in mg/L.
 """
 
-from datetime import datetime, UTC
-
 from .adc import read_channel_mv
 from .temp_sensor import read_temp_c
 
@@ -104,5 +102,4 @@ def read(temp_c: float | None = None):
         "status": "ok",
         "temperature_c": round(temp_c, 2),
         "raw_mv": mv,
-        "timestamp": datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ"),
     }
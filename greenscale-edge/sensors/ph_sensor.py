@@ -11,7 +11,6 @@ Least-squares fit gives:
     pH = PH_M * V + PH_B
 """
 
-from datetime import datetime, UTC
 from .adc import read_channel_mv
 
 PH_CHANNEL = 1  # ADS1115 A1
@@ -40,5 +39,4 @@ def read():
         "value": round(ph_value, 2),
         "units": "pH",
         "status": "ok",
-        "timestamp": datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ"),
     }
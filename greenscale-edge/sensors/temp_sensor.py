@@ -2,7 +2,6 @@
 import glob
 import os
 import time
-from datetime import datetime, UTC
 
 BASE_DIR = "/sys/bus/w1/devices"
 DEVICE_GLOB = BASE_DIR + "/28*"
@@ -62,5 +61,4 @@ def read():
         "value": round(temp_c, 2),
         "units": "degC",
         "status": "ok",
-        "timestamp": datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ"),
     }
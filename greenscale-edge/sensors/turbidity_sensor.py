@@ -10,7 +10,6 @@ Else:
     NTU = -1120.4 * V^2 + 5742.3 * V - 4352.9
 """
 
-from datetime import datetime, UTC
 from .adc import read_channel_mv
 
 TURBIDITY_CHANNEL = 0  # ADS1115 A0
@@ -37,5 +36,4 @@ def read():
         "value": round(ntu, 2),
         "units": "NTU",
         "status": "ok",
-        "timestamp": datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ"),
     }
@@ -0,0 +1,97 @@
+"""
+Fixed-record ring buffer in ``multiprocessing.shared_memory``.
+
+One producer process appends records and one consumer process drains them;
+records are packed with a ``struct`` format straight into the shared block,
+so nothing is pickled. Layout::
+
+    [written: u64][read: u64][dropped: u64][claimed: u64][slot 0]...
+
+The producer only ever advances ``claimed`` (before packing a record) and
+``written`` (after), the consumer only ``read`` and ``dropped``. Both counters are read and written under a small
+cross-process lock, which also orders the record bytes against the counter
+update; the record payloads themselves are copied outside the lock. A
+producer that laps a slow consumer overwrites the oldest records, and the
+consumer counts them in ``dropped`` instead of returning torn data.
+"""
+
+import multiprocessing
+import os
+import struct
+from multiprocessing import shared_memory
+
+HEADER = struct.Struct("<QQQQ")
+
+
+class RingBuffer:
+    """SPSC ring of fixed-layout records in a named shared-memory block."""
+
+    def __init__(self, record_format, capacity=1024, name=None, lock=None):
+        self.record = struct.Struct(record_format)
+        self.capacity = capacity
+        self.lock = lock if lock is not None else multiprocessing.Lock()
+        size = HEADER.size + capacity * self.record.size
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            HEADER.pack_into(self.shm.buf, 0, 0, 0, 0, 0)
+            self._owner = os.getpid()
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            if self.shm.size < size:
+                raise ValueError(f"shared memory block {name} is too small")
+            self._owner = None
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def _offset(self, index):
+        return HEADER.size + (index % self.capacity) * self.record.size
+
+    def _counters(self):
+        with self.lock:
+            return HEADER.unpack_from(self.shm.buf, 0)
+
+    def push(self, *fields):
+        """Append one record, overwriting the oldest if the ring is full."""
+        buf = self.shm.buf
+        with self.lock:
+            written = HEADER.unpack_from(buf, 0)[0]
+            struct.pack_into("<Q", buf, 24, written + 1)
+        self.record.pack_into(buf, self._offset(written), *fields)
+        with self.lock:
+            struct.pack_into("<Q", buf, 0, written + 1)
+
+    def pop_all(self):
+        """Return every record not read yet, oldest first."""
+        buf = self.shm.buf
+        written, read, dropped, _claimed = self._counters()
+        if written - read > self.capacity:
+            dropped += written - self.capacity - read
+            read = written - self.capacity
+        records = [self.record.unpack_from(buf, self._offset(index))
+                   for index in range(read, written)]
+        with self.lock:
+            claimed = HEADER.unpack_from(buf, 0)[3]
+            # Slots the producer reused (or is reusing right now) while we
+            # were copying are torn.
+            torn = max(0, min(claimed - self.capacity, written) - read)
+            struct.pack_into("<QQ", buf, 8, written, dropped + torn)
+        return records[torn:]
+
+    def __len__(self):
+        written, read = self._counters()[:2]
+        return min(written - read, self.capacity)
+
+    @property
+    def dropped(self):
+        return self._counters()[2]
+
+    def close(self):
+        """Detach; the creating process (not a forked child) frees the block."""
+        self.shm.close()
+        if self._owner == os.getpid():
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,89 @@
+"""
+Incremental per-channel window statistics.
+
+Sensors are sampled faster than we publish; every sample is folded into a
+RunningStats window (Welford's algorithm) and each publish drains the
+windows into min/max/mean/std/last/count summaries. Memory per channel is a
+handful of floats no matter how many samples land in a window.
+"""
+
+import math
+
+
+class RunningStats:
+    """Welford's online mean/variance plus min, max and last value."""
+
+    __slots__ = ("count", "mean", "_m2", "min", "max", "last")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.last = None
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.last = value
+
+    @property
+    def variance(self):
+        """Sample variance (0.0 until there are two samples)."""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def summary(self, digits=3):
+        return {
+            "min": round(self.min, digits),
+            "max": round(self.max, digits),
+            "mean": round(self.mean, digits),
+            "std": round(self.std, digits),
+            "last": round(self.last, digits),
+            "count": self.count,
+        }
+
+
+class WindowAggregator:
+    """One RunningStats window per channel, drained on every publish."""
+
+    def __init__(self):
+        self._windows = {}
+
+    def add(self, channel, value):
+        window = self._windows.get(channel)
+        if window is None:
+            window = self._windows[channel] = RunningStats()
+        window.add(value)
+
+    def update(self, readings):
+        """Add every numeric value of a ``{channel: value}`` mapping."""
+        for channel, value in readings.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.add(channel, float(value))
+
+    def drain(self, digits=3):
+        """Return summaries for channels sampled since the last drain.
+
+        Windows are reset in place and reused, so draining allocates no
+        per-sample state.
+        """
+        summaries = {}
+        for channel, window in self._windows.items():
+            if window.count:
+                summaries[channel] = window.summary(digits)
+                window.reset()
+        return summaries
@@ -0,0 +1,158 @@
+"""
+Streaming anomaly detection on sensor channels.
+
+Each channel keeps a handful of floats and runs three checks on every
+sample as it arrives:
+
+- ``zscore``: distance from an exponentially weighted mean, in EW standard
+  deviations (after ``warmup`` samples)
+- ``rate``: absolute change per minute above a per-channel limit, measured
+  over at least ``RATE_SPAN_SEC`` and only once the change is at least
+  ``RATE_MIN_STEPS`` times the sensor's quantisation step (the smallest
+  change seen between samples), so sample-to-sample noise never trips it
+- ``stuck``: the value has not changed at all for ``stuck_sec`` seconds
+
+Checks are edge-triggered with hysteresis: an ``alarm`` event is returned
+once when a check trips and a ``clear`` event once it has recovered (to
+half the threshold for ``zscore``/``rate``), so a noisy signal hovering at
+the limit does not flood the alarm topic.
+"""
+
+import math
+import time
+
+KINDS = ("zscore", "rate", "stuck")
+RATE_SPAN_SEC = 60.0
+RATE_MIN_STEPS = 5
+
+
+class ChannelDetector:
+    """Constant-memory detector state for one channel."""
+
+    __slots__ = ("alpha", "z_threshold", "warmup", "rate_limit", "stuck_sec",
+                 "count", "mean", "var", "last_value", "last_time",
+                 "rate_value", "rate_time", "quantum", "unchanged_since",
+                 "active")
+
+    def __init__(self, alpha=0.05, z_threshold=4.0, warmup=30,
+                 rate_limit=None, stuck_sec=900.0):
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self.rate_limit = rate_limit
+        self.stuck_sec = stuck_sec
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.last_value = None
+        self.last_time = None
+        self.rate_value = None
+        self.rate_time = None
+        self.quantum = None
+        self.unchanged_since = None
+        self.active = set()
+
+    def update(self, value, now):
+        """Fold in one sample; return ``[(kind, state, detail), ...]``."""
+        events = []
+        if self.count >= self.warmup and self.var > 0:
+            z = (value - self.mean) / math.sqrt(self.var)
+            self._edge(events, "zscore", abs(z), self.z_threshold,
+                       {"z": round(z, 2), "mean": round(self.mean, 4)})
+
+        if self.last_value is not None and value != self.last_value:
+            step = abs(value - self.last_value)
+            self.quantum = step if self.quantum is None else min(self.quantum, step)
+        if self.rate_time is None:
+            self.rate_value, self.rate_time = value, now
+        elif now - self.rate_time >= RATE_SPAN_SEC:
+            change = value - self.rate_value
+            rate = change / (now - self.rate_time) * 60
+            if self.quantum and abs(change) < RATE_MIN_STEPS * self.quantum:
+                rate = 0.0  # within quantisation noise
+            if self.rate_limit:
+                self._edge(events, "rate", abs(rate), self.rate_limit,
+                           {"per_min": round(rate, 4)})
+            self.rate_value, self.rate_time = value, now
+
+        if value != self.last_value:
+            self.unchanged_since = now
+            if "stuck" in self.active:
+                self.active.discard("stuck")
+                events.append(("stuck", "clear", {}))
+        elif (self.stuck_sec and "stuck" not in self.active
+                and now - self.unchanged_since >= self.stuck_sec):
+            self.active.add("stuck")
+            events.append(("stuck", "alarm", {
+                "unchanged_sec": round(now - self.unchanged_since, 1)}))
+
+        # EWMA mean/variance (West's incremental form).
+        if self.count == 0:
+            self.mean = value
+        else:
+            diff = value - self.mean
+            incr = self.alpha * diff
+            self.mean += incr
+            self.var = (1 - self.alpha) * (self.var + diff * incr)
+        self.count += 1
+        self.last_value = value
+        self.last_time = now
+        return events
+
+    def _edge(self, events, kind, level, threshold, detail):
+        if kind in self.active:
+            if level < threshold / 2:
+                self.active.discard(kind)
+                events.append((kind, "clear", detail))
+        elif level > threshold:
+            self.active.add(kind)
+            events.append((kind, "alarm", detail))
+
+
+class AnomalyDetector:
+    """Per-channel detectors created on first sight of each numeric metric."""
+
+    def __init__(self, alpha=0.05, z_threshold=4.0, warmup=30,
+                 rate_limits=None, stuck_sec=900.0, clock=time.monotonic):
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self.rate_limits = rate_limits or {}
+        self.stuck_sec = stuck_sec
+        self.clock = clock
+        self.channels = {}
+
+    def configure(self, z_threshold=None, rate_limits=None, stuck_sec=None):
+        """Change thresholds in place, keeping each channel's history."""
+        if z_threshold is not None:
+            self.z_threshold = z_threshold
+        if rate_limits is not None:
+            self.rate_limits = rate_limits
+        if stuck_sec is not None:
+            self.stuck_sec = stuck_sec
+        for metric, channel in self.channels.items():
+            channel.z_threshold = self.z_threshold
+            channel.rate_limit = self.rate_limits.get(metric)
+            channel.stuck_sec = self.stuck_sec
+
+    def update(self, values, now=None):
+        """Check a mapping of readings; return alarm/clear event dicts."""
+        now = self.clock() if now is None else now
+        events = []
+        for metric, value in values.items():
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                continue
+            channel = self.channels.get(metric)
+            if channel is None:
+                channel = self.channels[metric] = ChannelDetector(
+                    self.alpha, self.z_threshold, self.warmup,
+                    self.rate_limits.get(metric), self.stuck_sec)
+            for kind, state, detail in channel.update(value, now):
+                events.append({"metric": metric, "kind": kind,
+                               "state": state, "value": value, **detail})
+        return events
+
+    def active(self):
+        """Currently raised alarms, e.g. ``{"ph": ["rate"]}``."""
+        return {metric: sorted(channel.active)
+                for metric, channel in self.channels.items() if channel.active}
@@ -0,0 +1,217 @@
+"""
+Latest-values board: a small memory-mapped file holding the newest reading
+of every metric and the health of every device.
+
+The main service is the only writer. Any local process (the portal, the
+pump controller) can map the file and take a consistent snapshot in a few
+microseconds without touching I2C/1-Wire or talking to the broker.
+
+Layout (little endian)::
+
+    header  magic "GSB1", version, metric count, device count,
+            seq (u64), updated (f64 epoch), writer pid, crc32 of the data
+    names   24-byte names of the metrics, then of the devices
+    data    per metric: value f64 (NaN = none), ts f64, text 16s
+            per device: state u8, failures u16, error 44s
+
+Writers bump ``seq`` to an odd number, copy the data and bump it to the
+next even number (a seqlock). Readers retry while ``seq`` is odd or changed
+during their copy, and also check the CRC, so a torn read is never
+returned even without memory barriers between the processes.
+"""
+
+import math
+import mmap
+import os
+import struct
+import time
+import zlib
+
+MAGIC = b"GSB1"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHxxQdII")
+SEQ_OFFSET = 12
+NAME = struct.Struct("<24s")
+METRIC_SLOT = struct.Struct("<dd16s")
+DEVICE_SLOT = struct.Struct("<BxH44s")
+STATES = ("ok", "failing", "open", "half_open")
+DEFAULT_PATH = "/dev/shm/greenscale-state"
+
+
+class BoardUnavailable(RuntimeError):
+    """No consistent snapshot could be read (missing, stale layout, busy)."""
+
+
+def _layout_size(n_metrics, n_devices):
+    names = (n_metrics + n_devices) * NAME.size
+    data = n_metrics * METRIC_SLOT.size + n_devices * DEVICE_SLOT.size
+    return HEADER.size + names, data
+
+
+class StateBoard:
+    """Writer side; owned by the main service."""
+
+    def __init__(self, path, metrics, devices):
+        self.path = os.fspath(path)
+        self.metrics = tuple(metrics)
+        self.devices = tuple(devices)
+        self._metric_index = {name: i for i, name in enumerate(self.metrics)}
+        self._device_index = {name: i for i, name in enumerate(self.devices)}
+        self.data_offset, data_size = _layout_size(len(self.metrics),
+                                                   len(self.devices))
+        self.device_offset = len(self.metrics) * METRIC_SLOT.size
+        self.data = bytearray(data_size)
+        for i in range(len(self.metrics)):
+            METRIC_SLOT.pack_into(self.data, i * METRIC_SLOT.size,
+                                  math.nan, 0.0, b"")
+        self.seq = 0
+        self._create()
+
+    def _create(self):
+        # Build the file aside and rename it into place, so a reader never
+        # maps a half-initialised board.
+        head = bytearray(self.data_offset)
+        HEADER.pack_into(head, 0, MAGIC, VERSION, len(self.metrics),
+                         len(self.devices), 0, 0.0, os.getpid(), 0)
+        for i, name in enumerate(self.metrics + self.devices):
+            NAME.pack_into(head, HEADER.size + i * NAME.size, name.encode())
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(head + self.data)
+        os.replace(tmp, self.path)
+        self._file = open(self.path, "r+b")
+        self.map = mmap.mmap(self._file.fileno(), 0)
+
+    def update(self, reading, ts=None):
+        """Stage ``{metric: value}``; commit() makes it visible."""
+        ts = time.time() if ts is None else ts
+        for metric, value in reading.items():
+            index = self._metric_index.get(metric)
+            if index is None:
+                continue
+            text = b""
+            if isinstance(value, str):
+                text, value = value.encode()[:16], math.nan
+            elif value is None or isinstance(value, bool):
+                value = math.nan
+            METRIC_SLOT.pack_into(self.data, index * METRIC_SLOT.size,
+                                  float(value), ts, text)
+
+    def set_health(self, health):
+        """Stage ``{device: breaker.status()}``."""
+        for device, status in health.items():
+            index = self._device_index.get(device)
+            if index is None:
+                continue
+            state = status.get("state", "ok")
+            DEVICE_SLOT.pack_into(
+                self.data, self.device_offset + index * DEVICE_SLOT.size,
+                STATES.index(state) if state in STATES else 0,
+                min(status.get("failures", 0), 0xFFFF),
+                (status.get("error") or "").encode()[:44])
+
+    def commit(self, now=None):
+        """Publish the staged values under the seqlock."""
+        self.seq += 1  # odd: write in progress
+        struct.pack_into("<Q", self.map, SEQ_OFFSET, self.seq)
+        self.map[self.data_offset:] = self.data
+        HEADER.pack_into(self.map, 0, MAGIC, VERSION, len(self.metrics),
+                         len(self.devices), self.seq,
+                         time.time() if now is None else now, os.getpid(),
+                         zlib.crc32(self.data))
+        self.seq += 1
+        struct.pack_into("<Q", self.map, SEQ_OFFSET, self.seq)
+
+    def close(self):
+        self.map.close()
+        self._file.close()
+
+
+class BoardReader:
+    """Reader side; safe to use from any number of processes."""
+
+    def __init__(self, path=DEFAULT_PATH, retries=1000):
+        self.path = os.fspath(path)
+        self.retries = retries
+        self.map = None
+        self._inode = None
+
+    def _open(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            raise BoardUnavailable(f"{self.path} does not exist") from None
+        if self.map is not None and stat.st_ino == self._inode:
+            return
+        self.close()
+        with open(self.path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._inode = stat.st_ino
+        magic, version, n_metrics, n_devices = HEADER.unpack_from(self.map, 0)[:4]
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise BoardUnavailable(f"{self.path} is not a version {VERSION} board")
+        self.data_offset, data_size = _layout_size(n_metrics, n_devices)
+        names = [NAME.unpack_from(self.map, HEADER.size + i * NAME.size)[0]
+                 .rstrip(b"\0").decode() for i in range(n_metrics + n_devices)]
+        self.metrics, self.devices = names[:n_metrics], names[n_metrics:]
+        self.data_size = data_size
+
+    def read(self):
+        """Return a consistent snapshot of the board.
+
+        ``{"seq", "updated", "pid", "metrics": {name: {"value", "ts"}},
+        "devices": {name: status}}``; raises BoardUnavailable.
+        """
+        self._open()
+        end = self.data_offset + self.data_size
+        for attempt in range(self.retries):
+            if attempt:
+                time.sleep(0)  # let a descheduled writer finish
+            _magic, _version, _m, _d, seq, updated, pid, crc = \
+                HEADER.unpack_from(self.map, 0)
+            if seq == 0:
+                raise BoardUnavailable("the board has not been written yet")
+            if seq & 1:
+                continue
+            data = self.map[self.data_offset:end]
+            if (struct.unpack_from("<Q", self.map, SEQ_OFFSET)[0] == seq
+                    and zlib.crc32(data) == crc):
+                return self._decode(data, seq, updated, pid)
+        raise BoardUnavailable("the writer kept the board busy")
+
+    def _decode(self, data, seq, updated, pid):
+        metrics = {}
+        for i, name in enumerate(self.metrics):
+            value, ts, text = METRIC_SLOT.unpack_from(data, i * METRIC_SLOT.size)
+            if text.rstrip(b"\0"):
+                value = text.rstrip(b"\0").decode(errors="replace")
+            elif math.isnan(value):
+                value = None
+            metrics[name] = {"value": value, "ts": ts or None}
+        devices = {}
+        offset = len(self.metrics) * METRIC_SLOT.size
+        for i, name in enumerate(self.devices):
+            state, failures, error = DEVICE_SLOT.unpack_from(
+                data, offset + i * DEVICE_SLOT.size)
+            status = {"state": STATES[state] if state < len(STATES) else "ok"}
+            if status["state"] != "ok" or failures:
+                status.update(failures=failures,
+                              error=error.rstrip(b"\0").decode(errors="replace") or None)
+            devices[name] = status
+        return {"seq": seq, "updated": updated, "pid": pid,
+                "metrics": metrics, "devices": devices}
+
+    def value(self, metric, max_age=None):
+        """Latest value of one metric, or None if missing or older than ``max_age`` s."""
+        entry = self.read()["metrics"].get(metric)
+        if entry is None or entry["value"] is None:
+            return None
+        if max_age is not None and time.time() - entry["ts"] > max_age:
+            return None
+        return entry["value"]
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
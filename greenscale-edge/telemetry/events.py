@@ -0,0 +1,97 @@
+"""
+Append-only event log shared between local processes.
+
+One JSON object per line. The writer appends with ``O_APPEND`` (a line is
+one ``write()``, so it is never interleaved) and renames the file to
+``<path>.1`` once it grows past ``max_bytes``. The reader keeps the file
+open and follows renames like ``tail -F``: it finishes the rotated file
+before switching to the new one. A partial last line is kept until its
+newline arrives.
+"""
+
+import json
+import os
+
+MAX_BYTES = 256 * 1024
+
+
+class EventLog:
+    """Writer side."""
+
+    def __init__(self, path, max_bytes=MAX_BYTES):
+        self.path = os.fspath(path)
+        self.max_bytes = max_bytes
+        self._fd = None
+        self._open()
+
+    def _open(self):
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def append(self, event):
+        line = (json.dumps(event, separators=(",", ":")) + "\n").encode()
+        os.write(self._fd, line)
+        if os.fstat(self._fd).st_size >= self.max_bytes:
+            os.replace(self.path, self.path + ".1")
+            os.close(self._fd)
+            self._open()
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class EventTail:
+    """Reader side; starts at the end of the current file."""
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        self._file = None
+        self._inode = None
+        self._partial = b""
+        self._open(from_start=False)
+
+    def _open(self, from_start):
+        try:
+            self._file = open(self.path, "rb")
+        except FileNotFoundError:
+            self._file = self._inode = None
+            return
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        if not from_start:
+            self._file.seek(0, os.SEEK_END)
+        self._partial = b""
+
+    def read_new(self):
+        """Return the events appended since the previous call."""
+        if self._file is None:
+            self._open(from_start=True)
+            if self._file is None:
+                return []
+        events = self._read()
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return events
+        if inode != self._inode:
+            # Rotated: the old file is finished, continue with the new one.
+            self._file.close()
+            self._open(from_start=True)
+            events += self._read()
+        return events
+
+    def _read(self):
+        data = self._partial + self._file.read()
+        *lines, self._partial = data.split(b"\n")
+        events = []
+        for line in lines:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                print(f"[WARN] Skipping malformed event in {self.path}")
+        return events
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,207 @@
+"""
+Query layer behind the portal's ``/api/history`` endpoints.
+
+Kept free of Flask so it can be tested and reused without the web stack:
+``parse_query`` validates request arguments, ``query_etag`` derives a cache
+validator from two index seeks (``etag_matches`` checks it against
+``If-None-Match``), and ``stream_json`` yields the response body in chunks
+straight from the database cursor.
+
+Query arguments:
+
+- ``start`` / ``end``: epoch milliseconds, ISO 8601, or relative to now
+  (``-24h``, ``-7d``); the default range is the last 24 hours
+- ``resolution``: ``auto`` (default), ``raw``, ``1m`` or ``1h``
+- ``bucket``: re-bucket to any width (``5m``, ``6h``, ``1d``)
+- ``agg``: comma-separated fields for rollup points (``mean,max``)
+- ``limit`` / ``after``: page size and the ``next`` cursor of a previous page
+"""
+
+import hashlib
+import json
+import math
+from datetime import datetime, timezone
+
+from telemetry.store import (
+    DAY_MS, HOUR_MS, MINUTE_MS, RESOLUTIONS, bucket_source, now_ms,
+    pick_resolution)
+
+DURATION_UNITS = {"s": 1000, "m": MINUTE_MS, "h": HOUR_MS, "d": DAY_MS}
+AGGREGATES = ("count", "mean", "std", "min", "max", "last")
+DEFAULT_SPAN_MS = DAY_MS
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+POINTS_PER_CHUNK = 100
+# Upper bound for times and durations in ms; SQLite integers are 64-bit.
+MAX_MS = 2 ** 62
+
+
+class HistoryQueryError(ValueError):
+    """Raised for invalid query arguments (HTTP 400)."""
+
+
+def parse_duration(text):
+    """Parse ``90s``/``5m``/``6h``/``7d`` into milliseconds."""
+    text = str(text).strip()
+    unit = DURATION_UNITS.get(text[-1:])
+    try:
+        value = float(text[:-1])
+    except ValueError:
+        unit = None
+    if unit is None or not math.isfinite(value) or not 0 < value * unit < MAX_MS:
+        raise HistoryQueryError(f"invalid duration '{text}'")
+    return int(value * unit)
+
+
+def parse_time(text, now):
+    """Parse an absolute or ``-<duration>`` relative time into epoch ms."""
+    text = str(text).strip()
+    if text.startswith("-"):
+        return now - parse_duration(text[1:])
+    if text.isdigit():
+        if int(text) >= MAX_MS:
+            raise HistoryQueryError(f"invalid time '{text}'")
+        return int(text)
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        raise HistoryQueryError(f"invalid time '{text}'") from None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+def _int_arg(args, name, default, low, high):
+    raw = args.get(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise HistoryQueryError(f"{name} must be an integer") from None
+    if not low <= value <= high:
+        raise HistoryQueryError(f"{name} must be between {low} and {high}")
+    return value
+
+
+def _relative(text):
+    return str(text).strip().startswith("-")
+
+
+def parse_query(args, metric, now=None):
+    """Validate request arguments into a query dict.
+
+    ``window`` keeps the raw ``start``/``end`` arguments of a range that
+    moves with the clock (a relative or default end or start), else None.
+    """
+    now = now_ms() if now is None else now
+    end = parse_time(args["end"], now) if args.get("end") else now
+    start = (parse_time(args["start"], now) if args.get("start")
+             else end - DEFAULT_SPAN_MS)
+    if start >= end:
+        raise HistoryQueryError("start must be before end")
+
+    bucket_ms = parse_duration(args["bucket"]) if args.get("bucket") else None
+    resolution = args.get("resolution") or "auto"
+    if bucket_ms is not None:
+        resolution = bucket_source(bucket_ms)
+    elif resolution == "auto":
+        resolution = pick_resolution(start, end)
+    elif resolution not in RESOLUTIONS:
+        raise HistoryQueryError(
+            f"resolution must be auto or one of {', '.join(RESOLUTIONS)}")
+
+    fields = AGGREGATES
+    if args.get("agg"):
+        fields = tuple(f.strip() for f in args["agg"].split(",") if f.strip())
+        unknown = [f for f in fields if f not in AGGREGATES]
+        if unknown:
+            raise HistoryQueryError(f"unknown aggregate '{unknown[0]}'")
+
+    after = args.get("after")
+    moving = (not args.get("end") or _relative(args["end"])
+              or bool(args.get("start")) and _relative(args["start"]))
+    return {
+        "metric": metric,
+        "start": start,
+        "end": end,
+        "resolution": resolution,
+        "bucket_ms": bucket_ms,
+        "fields": fields,
+        "limit": _int_arg(args, "limit", DEFAULT_LIMIT, 1, MAX_LIMIT),
+        "after": _int_arg(args, "after", None, 0, 2 ** 62) if after else None,
+        "window": [args.get("start"), args.get("end")] if moving else None,
+    }
+
+
+def query_etag(store, query):
+    """ETag that changes whenever the data in the queried range changes.
+
+    A range that moves with the clock is keyed on its raw arguments, not on
+    the resolved ``start``/``end``, so a repeated ``-24h`` query still
+    validates while no row enters or leaves it. Its body does carry the new
+    ``start``/``end``, so that tag is weak.
+    """
+    fingerprint = store.fingerprint(
+        query["metric"], query["start"], query["end"], query["resolution"])
+    prefix = ""
+    if query["window"] is not None:
+        query = {k: v for k, v in query.items() if k not in ("start", "end")}
+        prefix = "W/"
+    key = json.dumps([query, fingerprint], sort_keys=True, default=list)
+    return prefix + '"' + hashlib.sha1(key.encode()).hexdigest()[:24] + '"'
+
+
+def etag_matches(header, etag):
+    """Weak comparison of ``etag`` with each tag of an If-None-Match header."""
+    if not header:
+        return False
+    opaque = etag.removeprefix("W/")
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def iter_points(store, query):
+    """Yield at most ``limit`` points, projected to the requested fields."""
+    if query["bucket_ms"] is not None:
+        rows = store.iter_buckets(
+            query["metric"], query["start"], query["end"], query["bucket_ms"],
+            after_ms=query["after"], limit=query["limit"])
+    else:
+        rows = store.iter_range(
+            query["metric"], query["start"], query["end"], query["resolution"],
+            after_ms=query["after"], limit=query["limit"])
+    fields = query["fields"]
+    for row in rows:
+        if "value" in row:
+            yield row
+        else:
+            yield {"ts": row["ts"], **{f: row[f] for f in fields}}
+
+
+def stream_json(store, query):
+    """Yield the JSON response body in chunks as rows come off the cursor.
+
+    ``next`` is the ``after`` cursor for the following page, or null on
+    the last page.
+    """
+    header = {key: query[key] for key in
+              ("metric", "start", "end", "resolution", "bucket_ms")}
+    yield json.dumps(header)[:-1] + ', "points": ['
+    count = 0
+    last_ts = None
+    batch = []
+    for point in iter_points(store, query):
+        batch.append(json.dumps(point, separators=(",", ":")))
+        count += 1
+        last_ts = point["ts"]
+        if len(batch) >= POINTS_PER_CHUNK:
+            yield ("," if count > len(batch) else "") + ",".join(batch)
+            batch = []
+    if batch:
+        yield ("," if count > len(batch) else "") + ",".join(batch)
+    next_cursor = last_ts if count >= query["limit"] else None
+    yield f'], "count": {count}, "next": {json.dumps(next_cursor)}}}'
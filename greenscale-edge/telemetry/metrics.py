@@ -0,0 +1,196 @@
+"""
+Low-overhead stage timing and counters with a Prometheus text endpoint.
+
+Stages are timed with ``registry.time(stage)``; each stage feeds a
+fixed-bucket histogram, so recording is a perf_counter() call and a
+bisect, and memory use does not grow with the number of samples. Counters
+are keyed by name and labels. ``MetricsServer`` serves everything on a
+local ``/metrics`` endpoint in the Prometheus text format, and
+``summary()`` condenses the histograms for the payload's ``status`` block.
+"""
+
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds: sensor reads take milliseconds, camera captures
+# and a slow broker can take seconds.
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _labels(labels):
+    return ",".join(f'{key}="{value}"' for key, value in labels)
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Counts observations into fixed buckets (plus +Inf)."""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "max")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def cumulative(self):
+        """Yield (upper bound, cumulative count), ending with +Inf."""
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (0 if empty)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return self.max if bound == float("inf") else min(bound, self.max)
+        return self.max
+
+
+class _Timer:
+    __slots__ = ("registry", "stage", "started")
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.stage, time.perf_counter() - self.started)
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.registry.inc("stage_errors", stage=self.stage)
+        return False
+
+
+class MetricsRegistry:
+    """Stage histograms and labelled counters shared across the agent."""
+
+    def __init__(self, prefix="greenscale", buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.stages = {}
+        self.counters = {}  # name -> {label tuple: value}
+        self._lock = threading.Lock()
+
+    def time(self, stage):
+        """Context manager timing one run of ``stage``."""
+        return _Timer(self, stage)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def inc(self, name, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self.counters.setdefault(name, {})
+            family[key] = family.get(key, 0) + amount
+
+    def summary(self):
+        """Per-stage count, mean, p99 and max in milliseconds."""
+        with self._lock:
+            return {
+                stage: {
+                    "count": h.count,
+                    "mean_ms": round(h.sum / h.count * 1000, 2) if h.count else 0.0,
+                    "p99_ms": round(h.quantile(0.99) * 1000, 2),
+                    "max_ms": round(h.max * 1000, 2),
+                }
+                for stage, h in sorted(self.stages.items())
+            }
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        name = f"{self.prefix}_stage_duration_seconds"
+        lines = [
+            f"# HELP {name} Time spent in each acquisition and publish stage.",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            for stage, h in sorted(self.stages.items()):
+                for bound, total in h.cumulative():
+                    le = "+Inf" if bound == float("inf") else _number(bound)
+                    lines.append(
+                        f'{name}_bucket{{stage="{stage}",le="{le}"}} {total}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {_number(h.sum)}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {h.count}')
+            for counter, family in sorted(self.counters.items()):
+                full = f"{self.prefix}_{counter}_total"
+                lines.append(f"# TYPE {full} counter")
+                for labels, value in sorted(family.items()):
+                    label_text = f"{{{_labels(labels)}}}" if labels else ""
+                    lines.append(f"{full}{label_text} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves ``registry.render()`` at ``/metrics`` from a daemon thread."""
+
+    def __init__(self, registry, host="127.0.0.1", port=9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header(
+                    "Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *_args):
+                pass  # scrapes every few seconds would flood the journal
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+        print(f"[METRICS] Serving http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
@@ -0,0 +1,100 @@
+"""
+Telemetry payload assembly and pluggable JSON serialisation.
+
+``PayloadTemplate`` is compiled once per device: the fixed head of the
+document (``version``, ``device_id``) is encoded to bytes up front, and each
+publish only encodes the parts that change, straight into the final
+message, without first copying them into a nested dict. ``utc_timestamp``
+formats the cycle timestamp at most once per second.
+
+``get_serializer`` returns an ``obj -> bytes`` callable: orjson when it is
+installed (about 8x faster on a Pi), otherwise a pre-built compact stdlib
+encoder. Both produce plain JSON, so the broker side cannot tell them apart.
+"""
+
+import json
+import time
+
+SCHEMA_VERSION = 1
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+SERIALIZERS = ("auto", "orjson", "json")
+
+# (whole second, formatted); replaced in one assignment so other threads
+# never see a half-updated pair.
+_timestamp_cache = (None, "")
+
+
+def utc_timestamp(now=None):
+    """ISO 8601 UTC timestamp with second resolution, cached per second."""
+    global _timestamp_cache
+    second = int(time.time() if now is None else now)
+    cached_second, text = _timestamp_cache
+    if second != cached_second:
+        text = time.strftime(TIMESTAMP_FORMAT, time.gmtime(second))
+        _timestamp_cache = (second, text)
+    return text
+
+
+def _stdlib_serializer():
+    # Building the encoder once skips json.dumps' per-call argument handling.
+    encode = json.JSONEncoder(separators=(",", ":"), check_circular=False).encode
+
+    def dumps(obj):
+        return encode(obj).encode()
+
+    return dumps
+
+
+def get_serializer(name="auto"):
+    """Return ``(name, dumps)`` for the requested JSON backend."""
+    if name not in SERIALIZERS:
+        raise ValueError(f"serializer must be one of {', '.join(SERIALIZERS)}")
+    if name in ("auto", "orjson"):
+        try:
+            import orjson
+        except ImportError:
+            if name == "orjson":
+                print("[WARN] orjson is not installed, using the json module")
+        else:
+            return "orjson", orjson.dumps
+    return "json", _stdlib_serializer()
+
+
+class PayloadTemplate:
+    """Pre-compiled telemetry document for one device."""
+
+    def __init__(self, device_id, dumps=None, version=SCHEMA_VERSION):
+        self.device_id = device_id
+        self.version = version
+        self.dumps = dumps or get_serializer()[1]
+        head = json.dumps({"version": version, "device_id": device_id},
+                          separators=(",", ":"))
+        self._head = head[:-1].encode() + b',"timestamp":"'
+
+    def build(self, timestamp, status, sensors, camera, stats=None):
+        """The payload as a dict (for per-metric topics and tests)."""
+        payload = {
+            "version": self.version,
+            "device_id": self.device_id,
+            "timestamp": timestamp,
+            "status": status,
+            "sensors": sensors,
+            "camera": camera,
+        }
+        if stats is not None:
+            payload["stats"] = stats
+        return payload
+
+    def encode(self, timestamp, status, sensors, camera, stats=None):
+        """Encode the payload to JSON bytes without building it as a dict."""
+        dumps = self.dumps
+        parts = [
+            self._head, timestamp.encode(),
+            b'","status":', dumps(status),
+            b',"sensors":', dumps(sensors),
+            b',"camera":', dumps(camera),
+        ]
+        if stats is not None:
+            parts += (b',"stats":', dumps(stats))
+        parts.append(b"}")
+        return b"".join(parts)
@@ -0,0 +1,271 @@
+"""
+Pump runtime state and events, shared by the pump service with the agent.
+
+``PumpRecorder`` runs inside the pump service. It keeps the current duty,
+reason, cumulative runtime, start count and GPIO health on a small
+latest-values board (see ``telemetry.board``) and appends timestamped
+events to an ``EventLog``:
+
+    start / stop   the pump switched on or off
+    reason         the controller changed why it runs (pid, warm, ...)
+    duty           the duty moved by ``DUTY_EVENT_STEP`` percent or more
+    gpio_error     a PWM write failed; ``gpio_ok`` once one succeeds again
+
+``PumpMonitor`` runs in the agent: ``status()`` maps the board for the
+publish payload and ``events()`` returns the events logged since the
+previous call, so no request ever goes to the pump process.
+
+``AerationGate`` uses the same board as a schedule signal: while the pump
+runs, and for ``settle_sec`` after it stops, bubbles distort the turbidity
+readings, so those samples are tagged (kept as latest values but left out
+of statistics) or skipped altogether.
+"""
+
+import os
+import time
+
+from telemetry.board import BoardReader, BoardUnavailable, StateBoard
+from telemetry.events import EventLog, EventTail
+
+DEFAULT_STATE_PATH = "/dev/shm/greenscale-pump"
+DEFAULT_EVENTS_PATH = "/dev/shm/greenscale-pump-events"
+METRICS = ("pump_duty", "pump_reason", "pump_on_since", "pump_off_at",
+           "pump_runtime_s", "pump_starts", "pump_gpio_errors")
+DEVICES = ("pump",)
+DUTY_EVENT_STEP = 5.0
+AERATION_METRICS = ("turbidity_sensor_v", "turbidity_index")
+AERATION_POLICIES = ("off", "tag", "skip")
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _previous_totals(path):
+    """Runtime counters left by the previous run, so they stay cumulative."""
+    reader = BoardReader(path, retries=10)
+    try:
+        values = reader.read()["metrics"]
+    except (BoardUnavailable, OSError, ValueError):
+        return 0.0, 0, 0
+    finally:
+        reader.close()
+
+    def get(name):
+        entry = values.get(name)
+        return entry["value"] if entry and isinstance(entry["value"], float) else 0
+
+    runtime = get("pump_runtime_s")
+    if get("pump_on_since"):
+        # Killed while running: count up to its last update.
+        runtime += max(0.0, values["pump_runtime_s"]["ts"] - get("pump_on_since"))
+    return runtime, int(get("pump_starts")), int(get("pump_gpio_errors"))
+
+
+class PumpRecorder:
+    """Writer side; owned by the pump service."""
+
+    def __init__(self, state_path=None, events_path=None, clock=time.time):
+        self.clock = clock
+        self.runtime, self.starts, self.gpio_errors = (
+            _previous_totals(state_path) if state_path else (0.0, 0, 0))
+        self.board = StateBoard(state_path, METRICS, DEVICES) if state_path else None
+        self.log = EventLog(events_path) if events_path else None
+        self.duty = 0.0
+        self.reason = None
+        self.on_since = None
+        self.off_at = None
+        self.logged_duty = 0.0
+        self.error = None
+        self._commit()
+
+    def _event(self, kind, now, **fields):
+        if self.log is None:
+            return
+        try:
+            self.log.append({"ts": round(now, 3), "event": kind, **fields})
+        except OSError as e:
+            print(f"[WARN] Could not log pump event: {e}")
+
+    def update(self, duty, reason, now=None):
+        """Record the duty now applied and why."""
+        now = self.clock() if now is None else now
+        if duty > 0 and self.on_since is None:
+            self.on_since = now
+            self.starts += 1
+            self._event("start", now, duty=round(duty, 1), reason=reason)
+            self.logged_duty = duty
+        elif duty <= 0 and self.on_since is not None:
+            ran = now - self.on_since
+            self.runtime += ran
+            self.on_since = None
+            self.off_at = now
+            self._event("stop", now, reason=reason, ran_s=round(ran, 1),
+                        runtime_s=round(self.runtime, 1))
+            self.logged_duty = 0.0
+        elif duty > 0 and reason != self.reason:
+            self._event("reason", now, duty=round(duty, 1), reason=reason)
+            self.logged_duty = duty
+        elif duty > 0 and abs(duty - self.logged_duty) >= DUTY_EVENT_STEP:
+            self._event("duty", now, duty=round(duty, 1), reason=reason)
+            self.logged_duty = duty
+        self.duty = duty
+        self.reason = reason
+        self._commit(now)
+
+    def gpio_error(self, error, now=None):
+        now = self.clock() if now is None else now
+        self.gpio_errors += 1
+        if self.error is None:
+            self._event("gpio_error", now, error=str(error))
+        self.error = str(error)
+        self._commit(now)
+
+    def gpio_ok(self, now=None):
+        if self.error is None:
+            return
+        now = self.clock() if now is None else now
+        self.error = None
+        self._event("gpio_ok", now)
+        self._commit(now)
+
+    def _commit(self, now=None):
+        if self.board is None:
+            return
+        now = self.clock() if now is None else now
+        self.board.update({
+            "pump_duty": self.duty,
+            "pump_reason": self.reason or "",
+            "pump_on_since": self.on_since or 0.0,
+            "pump_off_at": self.off_at or 0.0,
+            "pump_runtime_s": self.runtime,
+            "pump_starts": self.starts,
+            "pump_gpio_errors": self.gpio_errors,
+        }, now)
+        failing = {"state": "failing", "failures": self.gpio_errors,
+                   "error": self.error}
+        self.board.set_health({"pump": failing if self.error else {"state": "ok"}})
+        self.board.commit(now)
+
+    def close(self):
+        if self.board is not None:
+            self.board.close()
+        if self.log is not None:
+            self.log.close()
+
+
+class PumpMonitor:
+    """Reader side; used by the agent's publish cycle."""
+
+    def __init__(self, state_path=DEFAULT_STATE_PATH, events_path=None,
+                 clock=time.time):
+        self.clock = clock
+        self.reader = BoardReader(state_path) if state_path else None
+        self.tail = EventTail(events_path) if events_path else None
+
+    def _snapshot(self):
+        """``(values, snapshot)``, or ``(None, None)`` without a board."""
+        if self.reader is None:
+            return None, None
+        try:
+            snapshot = self.reader.read()
+        except BoardUnavailable:
+            return None, None
+        values = {name: entry["value"] for name, entry in snapshot["metrics"].items()}
+        if values.get("pump_on_since") and not _alive(snapshot["pid"]):
+            # The service died with the pump on; its PWM died with it.
+            values["pump_on_since"] = None
+            values["pump_off_at"] = snapshot["updated"]
+        return values, snapshot
+
+    def aerating(self, settle_sec):
+        """True while the pump runs and for ``settle_sec`` after it stops."""
+        values, _snapshot = self._snapshot()
+        if values is None:
+            return False
+        if values.get("pump_on_since"):
+            return True
+        off_at = values.get("pump_off_at")
+        return bool(off_at) and self.clock() - off_at < settle_sec
+
+    def status(self):
+        """Current pump state, or ``{"state": "unknown"}`` without a pump."""
+        values, snapshot = self._snapshot()
+        if values is None:
+            return {"state": "unknown"}
+        on_since = values.get("pump_on_since") or None
+        runtime = values.get("pump_runtime_s") or 0.0
+        if on_since:
+            runtime += max(0.0, self.clock() - on_since)
+        return {
+            "state": "on" if on_since else "off",
+            "duty": values.get("pump_duty"),
+            "reason": values.get("pump_reason"),
+            "runtime_s": round(runtime, 1),
+            "starts": int(values.get("pump_starts") or 0),
+            "gpio_errors": int(values.get("pump_gpio_errors") or 0),
+            "health": snapshot["devices"].get("pump", {"state": "ok"}),
+            "updated": snapshot["updated"],
+        }
+
+    def events(self):
+        return self.tail.read_new() if self.tail is not None else []
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+        if self.tail is not None:
+            self.tail.close()
+
+
+class AerationGate:
+    """Keeps aeration-distorted samples out of the statistics.
+
+    ``split(reading)`` returns ``(clean, latest)``: ``clean`` is what may be
+    recorded and aggregated, ``latest`` what becomes the published current
+    value. With the "tag" policy affected metrics stay in ``latest`` and are
+    listed in ``status()``; with "skip" they are dropped.
+    """
+
+    def __init__(self, monitor=None, policy="tag", settle_sec=30.0,
+                 metrics=AERATION_METRICS):
+        self.monitor = monitor
+        self.metrics = frozenset(metrics)
+        self.policy = policy
+        self.settle_sec = settle_sec
+        self.excluded = {}
+
+    def configure(self, policy, settle_sec):
+        self.policy = policy
+        self.settle_sec = settle_sec
+
+    def active(self):
+        return (self.policy != "off" and self.monitor is not None
+                and self.monitor.aerating(self.settle_sec))
+
+    def skipping(self):
+        """True when acquisition of affected metrics should not run at all."""
+        return self.policy == "skip" and self.active()
+
+    def split(self, reading):
+        if not self.metrics.intersection(reading) or not self.active():
+            return reading, reading
+        clean = {}
+        for metric, value in reading.items():
+            if metric in self.metrics:
+                self.excluded[metric] = self.excluded.get(metric, 0) + 1
+            else:
+                clean[metric] = value
+        return clean, (reading if self.policy == "tag" else clean)
+
+    def status(self):
+        """Policy, whether a window is open and what was excluded since last call."""
+        excluded, self.excluded = self.excluded, {}
+        return {"policy": self.policy, "active": self.active(),
+                "excluded": excluded}
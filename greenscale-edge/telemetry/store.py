@@ -0,0 +1,361 @@
+"""
+On-device time-series history in SQLite.
+
+Three tiers share one database file:
+
+- ``samples``: every raw sample, kept for ``raw_days``
+- ``rollup_1m`` / ``rollup_1h``: count, sum, sum of squares, min, max and
+  last per metric and bucket, kept for ``rollup_days``
+
+Rollups are maintained incrementally: each newly flushed sample is upserted
+into its minute and hour bucket in the same transaction as the raw insert,
+so nothing ever rescans history. A sample that overwrites an existing
+``(metric, ts)`` with a different value instead rebuilds its two buckets
+from the raw rows, so repeats are never counted twice. All tables are clustered on
+``(metric_id, ts)`` (WITHOUT ROWID), so a range read is one index seek
+followed by a sequential scan, and ``iter_range`` streams rows from the
+cursor instead of loading them into memory.
+
+Samples are buffered in memory and written in one transaction per
+``flush()`` to keep SD card writes down; WAL mode lets other processes
+(the portal) read while the agent writes.
+"""
+
+import math
+import sqlite3
+import time
+
+MINUTE_MS = 60_000
+HOUR_MS = 3_600_000
+DAY_MS = 86_400_000
+
+RESOLUTIONS = ("raw", "1m", "1h")
+TIERS = {"1m": ("rollup_1m", MINUTE_MS), "1h": ("rollup_1h", HOUR_MS)}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metrics (
+    id   INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS samples (
+    metric_id INTEGER NOT NULL,
+    ts        INTEGER NOT NULL,  -- ms since the Unix epoch, UTC
+    value     REAL NOT NULL,
+    PRIMARY KEY (metric_id, ts)
+) WITHOUT ROWID;
+"""
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    metric_id INTEGER NOT NULL,
+    ts        INTEGER NOT NULL,  -- bucket start, ms since the Unix epoch
+    count     INTEGER NOT NULL,
+    sum       REAL NOT NULL,
+    sumsq     REAL NOT NULL,
+    min       REAL NOT NULL,
+    max       REAL NOT NULL,
+    last      REAL NOT NULL,
+    last_ts   INTEGER NOT NULL,
+    PRIMARY KEY (metric_id, ts)
+) WITHOUT ROWID;
+"""
+
+ROLLUP_UPSERT = """
+INSERT INTO {table} (metric_id, ts, count, sum, sumsq, min, max, last, last_ts)
+VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (metric_id, ts) DO UPDATE SET
+    count = count + 1,
+    sum = sum + excluded.sum,
+    sumsq = sumsq + excluded.sumsq,
+    min = min(min, excluded.min),
+    max = max(max, excluded.max),
+    last = CASE WHEN excluded.last_ts >= last_ts THEN excluded.last ELSE last END,
+    last_ts = max(last_ts, excluded.last_ts)
+"""
+
+ROLLUP_REBUILD = """
+INSERT OR REPLACE INTO {table}
+    (metric_id, ts, count, sum, sumsq, min, max, last, last_ts)
+SELECT ?1, ?2, count(*), sum(value), sum(value * value), min(value),
+       max(value),
+       (SELECT value FROM samples WHERE metric_id = ?1 AND ts >= ?2
+        AND ts < ?3 ORDER BY ts DESC LIMIT 1),
+       max(ts)
+FROM samples WHERE metric_id = ?1 AND ts >= ?2 AND ts < ?3
+"""
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+def pick_resolution(start_ms, end_ms, max_points=1500):
+    """Finest tier that keeps a range under ``max_points`` buckets."""
+    span = max(0, end_ms - start_ms)
+    if span <= max_points * 1000:  # raw samples arrive about once a second
+        return "raw"
+    if span <= max_points * MINUTE_MS:
+        return "1m"
+    return "1h"
+
+
+def bucket_source(bucket_ms):
+    """Coarsest stored tier whose buckets divide ``bucket_ms`` evenly."""
+    for resolution in ("1h", "1m"):
+        if bucket_ms % TIERS[resolution][1] == 0:
+            return resolution
+    return "raw"
+
+
+def _rollup_row(row):
+    ts, count, total, sumsq, low, high, last = row
+    mean = total / count
+    # Sample variance, matching aggregate.RunningStats.
+    if count > 1:
+        variance = max(0.0, (sumsq - total * mean) / (count - 1))
+    else:
+        variance = 0.0
+    return {
+        "ts": ts,
+        "count": count,
+        "mean": mean,
+        "std": math.sqrt(variance),
+        "min": low,
+        "max": high,
+        "last": last,
+    }
+
+
+class HistoryStore:
+    """Raw samples plus minute/hour rollups for every numeric metric."""
+
+    def __init__(self, path, raw_days=7, rollup_days=365,
+                 prune_interval_ms=HOUR_MS, readonly=False):
+        self.path = str(path)
+        self.raw_days = raw_days
+        self.rollup_days = rollup_days
+        self.prune_interval_ms = prune_interval_ms
+        self.pending = []
+        self._metric_ids = {}
+        self._last_prune = 0
+        if readonly:
+            # Readers (the portal) must never create or modify the file.
+            self.conn = sqlite3.connect(
+                f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            with self.conn:
+                self.conn.executescript(SCHEMA)
+                for table, _width in TIERS.values():
+                    self.conn.executescript(ROLLUP_SCHEMA.format(table=table))
+        for metric_id, name in self.conn.execute("SELECT id, name FROM metrics"):
+            self._metric_ids[name] = metric_id
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def _metric_id(self, name):
+        metric_id = self._metric_ids.get(name)
+        if metric_id is None:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO metrics (name) VALUES (?)", (name,))
+            metric_id = self.conn.execute(
+                "SELECT id FROM metrics WHERE name = ?", (name,)).fetchone()[0]
+            self._metric_ids[name] = metric_id
+        return metric_id
+
+    def _lookup(self, name):
+        """Metric id for reads; another process may have added it since."""
+        metric_id = self._metric_ids.get(name)
+        if metric_id is None:
+            row = self.conn.execute(
+                "SELECT id FROM metrics WHERE name = ?", (name,)).fetchone()
+            if row is not None:
+                metric_id = self._metric_ids[name] = row[0]
+        return metric_id
+
+    def metrics(self):
+        return sorted(
+            name for (name,) in self.conn.execute("SELECT name FROM metrics"))
+
+    # --- Writes ---------------------------------------------------------
+
+    def record(self, values, ts_ms=None):
+        """Buffer the numeric entries of ``values``; flush() writes them."""
+        ts_ms = now_ms() if ts_ms is None else int(ts_ms)
+        for name, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.pending.append((name, ts_ms, float(value)))
+
+    def flush(self):
+        """Write buffered samples and update rollups in one transaction."""
+        if not self.pending:
+            return 0
+        pending, self.pending = self.pending, []
+        with self.conn:
+            # The last value buffered for a (metric, ts) wins.
+            latest = {}
+            for name, ts, value in pending:
+                latest[self._metric_id(name), ts] = value
+            inserted, replaced = [], set()
+            for (metric_id, ts), value in latest.items():
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO samples (metric_id, ts, value) "
+                    "VALUES (?, ?, ?)", (metric_id, ts, value))
+                if cursor.rowcount:
+                    inserted.append((metric_id, ts, value))
+                    continue
+                cursor = self.conn.execute(
+                    "UPDATE samples SET value = ? "
+                    "WHERE metric_id = ? AND ts = ? AND value != ?",
+                    (value, metric_id, ts, value))
+                if cursor.rowcount:
+                    replaced.add((metric_id, ts))
+            for table, width in TIERS.values():
+                self.conn.executemany(ROLLUP_UPSERT.format(table=table), [
+                    (metric_id, ts - ts % width, value, value * value,
+                     value, value, value, ts)
+                    for metric_id, ts, value in inserted
+                ])
+                buckets = {(metric_id, ts - ts % width)
+                           for metric_id, ts in replaced}
+                self.conn.executemany(ROLLUP_REBUILD.format(table=table), [
+                    (metric_id, bucket, bucket + width)
+                    for metric_id, bucket in buckets
+                ])
+        newest = max(ts for _name, ts, _value in pending)
+        if newest - self._last_prune >= self.prune_interval_ms:
+            self.prune(newest)
+        return len(latest)
+
+    def prune(self, now=None):
+        """Drop rows that have aged out of their tier."""
+        now = now_ms() if now is None else now
+        with self.conn:
+            self.conn.execute("DELETE FROM samples WHERE ts < ?",
+                              (now - self.raw_days * DAY_MS,))
+            for table, _width in TIERS.values():
+                self.conn.execute(f"DELETE FROM {table} WHERE ts < ?",
+                                  (now - self.rollup_days * DAY_MS,))
+        self._last_prune = now
+
+    # --- Reads ----------------------------------------------------------
+
+    def iter_range(self, metric, start_ms, end_ms, resolution="raw",
+                   after_ms=None, limit=None):
+        """Yield rows for ``start_ms <= ts < end_ms`` in time order.
+
+        Raw rows are ``{"ts", "value"}``; rollup rows carry count, mean,
+        std, min, max and last. ``after_ms`` resumes after a row already
+        seen (for pagination).
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"resolution must be one of {', '.join(RESOLUTIONS)}")
+        metric_id = self._lookup(metric)
+        if metric_id is None:
+            return
+        if after_ms is not None:
+            start_ms = max(start_ms, after_ms + 1)
+        rows = self._rows(metric_id, start_ms, end_ms, resolution, limit)
+        if resolution == "raw":
+            for row in rows:
+                yield {"ts": row[0], "value": row[2]}
+        else:
+            for row in rows:
+                yield _rollup_row(row)
+
+    def _rows(self, metric_id, start_ms, end_ms, resolution, limit=None):
+        """Cursor of (ts, count, sum, sumsq, min, max, last) tuples."""
+        if resolution == "raw":
+            sql = ("SELECT ts, 1, value, value * value, value, value, value "
+                   "FROM samples")
+        else:
+            table, _width = TIERS[resolution]
+            sql = f"SELECT ts, count, sum, sumsq, min, max, last FROM {table}"
+        sql += " WHERE metric_id = ? AND ts >= ? AND ts < ? ORDER BY ts"
+        params = [metric_id, start_ms, end_ms]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return self.conn.execute(sql, params)
+
+    def iter_buckets(self, metric, start_ms, end_ms, bucket_ms,
+                     after_ms=None, limit=None):
+        """Yield rollup rows for arbitrary ``bucket_ms`` buckets.
+
+        Reads the coarsest tier that divides the bucket width, so a week of
+        hourly buckets touches 168 rows rather than 600k raw samples.
+        ``after_ms`` is the start of the last bucket already returned.
+        """
+        if bucket_ms <= 0:
+            raise ValueError("bucket must be positive")
+        metric_id = self._lookup(metric)
+        if metric_id is None:
+            return
+        if after_ms is not None:
+            start_ms = max(start_ms, after_ms - after_ms % bucket_ms + bucket_ms)
+        resolution = bucket_source(bucket_ms)
+        if resolution != "raw":
+            start_ms -= start_ms % TIERS[resolution][1]
+
+        current = None
+        emitted = 0
+        for ts, count, total, sumsq, low, high, last in self._rows(
+                metric_id, start_ms, end_ms, resolution):
+            bucket = ts - ts % bucket_ms
+            if current is not None and current[0] == bucket:
+                current[1] += count
+                current[2] += total
+                current[3] += sumsq
+                current[4] = min(current[4], low)
+                current[5] = max(current[5], high)
+                current[6] = last
+                continue
+            if current is not None:
+                yield _rollup_row(current)
+                emitted += 1
+                if limit is not None and emitted >= limit:
+                    return
+            current = [bucket, count, total, sumsq, low, high, last]
+        if current is not None:
+            yield _rollup_row(current)
+
+    def fingerprint(self, metric, start_ms, end_ms, resolution):
+        """Cheap change marker for a range: first/last row and last count.
+
+        Two index seeks, no scan; used for HTTP ETags.
+        """
+        metric_id = self._lookup(metric)
+        if metric_id is None:
+            return None
+        if resolution == "raw":
+            table, column = "samples", "1"
+        else:
+            table, column = TIERS[resolution][0], "count"
+        where = "WHERE metric_id = ? AND ts >= ? AND ts < ?"
+        params = (metric_id, start_ms, end_ms)
+        first = self.conn.execute(
+            f"SELECT ts FROM {table} {where} ORDER BY ts LIMIT 1",
+            params).fetchone()
+        last = self.conn.execute(
+            f"SELECT ts, {column} FROM {table} {where} ORDER BY ts DESC LIMIT 1",
+            params).fetchone()
+        return (first[0] if first else None,) + (tuple(last) if last else ())
+
+    def query(self, metric, start_ms, end_ms, resolution="auto", limit=None):
+        if resolution == "auto":
+            resolution = pick_resolution(start_ms, end_ms)
+        return list(self.iter_range(metric, start_ms, end_ms, resolution,
+                                    limit=limit))
+
+    def latest(self, metric):
+        metric_id = self._lookup(metric)
+        if metric_id is None:
+            return None
+        row = self.conn.execute(
+            "SELECT ts, value FROM samples WHERE metric_id = ? "
+            "ORDER BY ts DESC LIMIT 1", (metric_id,)).fetchone()
+        return {"ts": row[0], "value": row[1]} if row else None
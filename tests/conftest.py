@@ -1,6 +1,6 @@
-import datetime
 import json
 import sys
+import time
 import types
 
 import pytest
@@ -22,16 +22,27 @@ def stub_third_party_modules(monkeypatch):
             self._username = None
             self._password = None
             self.published_messages = []
+            self.on_connect = None
+            self.on_disconnect = None
+            self.on_message = None
+            self.subscriptions = []
+            self._acked = False
             FakeClient.instances.append(self)
 
         def connect(self, *_args, **_kwargs):
+            self._acked = False
             return 0
 
-        def publish(self, topic, payload, qos=0, **_kwargs):
+        def publish(self, topic, payload, qos=0, retain=False, **_kwargs):
             self.published_messages.append(
-                {"topic": topic, "payload": payload, "qos": qos}
+                {"topic": topic, "payload": payload, "qos": qos,
+                 "retain": retain}
             )
-            return True
+            return types.SimpleNamespace(rc=0, mid=len(self.published_messages))
+
+        def subscribe(self, topic, qos=0, **_kwargs):
+            self.subscriptions.append((topic, qos))
+            return (0, 1)
 
         def username_pw_set(self, username, password):
             self._username = username
@@ -43,9 +54,24 @@ def stub_third_party_modules(monkeypatch):
         def tls_insecure_set(self, *_args, **_kwargs):
             return True
 
+        def will_set(self, topic, payload=None, qos=0, retain=False):
+            self.will = {"topic": topic, "payload": payload,
+                         "qos": qos, "retain": retain}
+
         def loop_start(self):
             return True
 
+        def loop(self, timeout=1.0):
+            if not self._acked and self.on_connect is not None:
+                # The broker's CONNACK arrives through the network loop.
+                self._acked = True
+                self.on_connect(self, None, {}, 0, None)
+            time.sleep(min(timeout, 0.01))
+            return 0
+
+        def disconnect(self, *_args, **_kwargs):
+            return 0
+
     class _CallbackAPIVersion:
         VERSION1 = 1
         VERSION2 = 2
@@ -89,9 +115,6 @@ def stub_third_party_modules(monkeypatch):
         "value": 22.5,
         "units": "degC",
         "status": "ok",
-        "timestamp": datetime.datetime.now(datetime.UTC).strftime(
-            "%Y-%m-%dT%H:%M:%SZ"
-        ),
     }
 
     ph_module = types.ModuleType("sensors.ph_sensor")
@@ -100,22 +123,16 @@ def stub_third_party_modules(monkeypatch):
         "value": 7.0,
         "units": "pH",
         "status": "ok",
-        "timestamp": datetime.datetime.now(datetime.UTC).strftime(
-            "%Y-%m-%dT%H:%M:%SZ"
-        ),
     }
 
     do_module = types.ModuleType("sensors.do_sensor")
-    do_module.read = lambda: {
+    do_module.read = lambda temp_c=None: {
         "sensor": "dissolved_oxygen",
         "value": 8.5,
         "units": "mg/L",
         "status": "ok",
         "temperature_c": 20.0,
         "raw_mv": 1500,
-        "timestamp": datetime.datetime.now(datetime.UTC).strftime(
-            "%Y-%m-%dT%H:%M:%SZ"
-        ),
     }
 
     turbidity_module = types.ModuleType("sensors.turbidity_sensor")
@@ -124,9 +141,6 @@ def stub_third_party_modules(monkeypatch):
         "value": 3.0,
         "units": "NTU",
         "status": "ok",
-        "timestamp": datetime.datetime.now(datetime.UTC).strftime(
-            "%Y-%m-%dT%H:%M:%SZ"
-        ),
     }
 
     paho_mod = types.ModuleType("paho")
@@ -134,6 +148,8 @@ def stub_third_party_modules(monkeypatch):
     client_mod = types.ModuleType("paho.mqtt.client")
     client_mod.Client = FakeClient
     client_mod.CallbackAPIVersion = _CallbackAPIVersion
+    client_mod.MQTT_ERR_SUCCESS = 0
+    client_mod.MQTT_ERR_NO_CONN = 4
     mqtt_mod.client = client_mod
     paho_mod.mqtt = mqtt_mod
 
@@ -198,7 +214,6 @@ def deterministic_sensors(monkeypatch):
             "value": 19.8,
             "units": "degC",
             "status": "ok",
-            "timestamp": "2024-01-01T00:00:00Z",
         },
     )
     monkeypatch.setattr(
@@ -209,7 +224,6 @@ def deterministic_sensors(monkeypatch):
             "value": 6.9,
             "units": "pH",
             "status": "ok",
-            "timestamp": "2024-01-01T00:00:01Z",
         },
     )
     monkeypatch.setattr(
@@ -222,7 +236,6 @@ def deterministic_sensors(monkeypatch):
             "status": "ok",
             "temperature_c": 21.0,
             "raw_mv": 1400,
-            "timestamp": "2024-01-01T00:00:02Z",
         },
     )
     monkeypatch.setattr(
@@ -233,7 +246,6 @@ def deterministic_sensors(monkeypatch):
             "value": 2.5,
             "units": "NTU",
             "status": "ok",
-            "timestamp": "2024-01-01T00:00:03Z",
         },
     )
     monkeypatch.setattr(
@@ -0,0 +1,104 @@
+import importlib.util
+import random
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PROJECT_SRC = REPO_ROOT / "greenscale-edge" / "greenscale-edge"
+MAIN_MODULE_PATH = PROJECT_SRC / "main.py"
+
+if str(PROJECT_SRC) not in sys.path:
+    sys.path.insert(0, str(PROJECT_SRC))
+
+from adaptive import AdaptiveRate  # noqa: E402
+
+
+def make_rate(**overrides):
+    settings = dict(interval=10, min_interval=2, max_interval=80,
+                    speedup_at=1.0, slowdown_below=0.3, hold_sec=60,
+                    scales={"ph": 0.05})
+    settings.update(overrides)
+    return AdaptiveRate(**settings)
+
+
+def test_flat_signal_backs_off_one_step_per_hold_period():
+    rate = make_rate()
+    intervals = [rate.update({"ph": 7.0}, now=t) for t in range(0, 400, 10)]
+
+    assert intervals[5] == 10   # calm for 50s: not yet
+    assert intervals[6] == 20   # calm for 60s
+    assert intervals[12] == 40
+    assert intervals[-1] == 80  # capped heartbeat
+    assert rate.status() == {"mode": "adaptive", "interval_s": 80,
+                             "activity": 0.0}
+
+
+def test_activity_speeds_up_and_holds_in_dead_band():
+    rate = make_rate(interval=80)
+    # A steady rise of 0.18 pH/min is activity 3.6 at scale 0.05.
+    t, value = 0, 7.0
+    while rate.interval == 80 and t < 60:
+        rate.update({"ph": value}, now=t)
+        t, value = t + 10, value + 0.03
+    assert rate.interval == 40 and t <= 60  # within one horizon
+    # The signal settles: activity decays through the dead band, during
+    # which the interval may only shrink, then the back-off starts.
+    previous = rate.interval
+    while rate.activity >= 0.3:
+        t += 10
+        interval = rate.update({"ph": value}, now=t)
+        assert interval <= previous
+        previous = interval
+    settled = t
+    while t < settled + 60:
+        t += 10
+        rate.update({"ph": value}, now=t)
+    assert rate.interval == previous * 2
+
+
+def test_noise_at_fast_sampling_still_backs_off():
+    rate = make_rate(interval=2, max_interval=300, hold_sec=120,
+                     scales={"ph": 0.05, "do_mg_per_l": 0.2})
+    rng = random.Random(11)
+    t = 0.0
+    while t < 3600:
+        rate.update({"ph": round(7.0 + rng.gauss(0, 0.01), 2),
+                     "do_mg_per_l": round(7.5 + rng.gauss(0, 0.02), 2)}, now=t)
+        t += rate.interval
+    assert rate.interval == 300
+
+
+def test_unscaled_and_missing_metrics_are_ignored():
+    rate = make_rate()
+    for t in range(5):
+        rate.update({"ph": None, "turbidity_index": t * 100.0}, now=t)
+    assert rate.channels == {} and rate.activity == 0.0
+
+
+def test_configure_reclamps_interval():
+    rate = make_rate(interval=80)
+    rate.configure(min_interval=1, max_interval=30, speedup_at=1.0,
+                   slowdown_below=0.3, hold_sec=60)
+    assert rate.interval == 30
+
+
+def test_source_intervals_follow_adaptive_interval(
+        deterministic_environment, deterministic_sensors):
+    env = deterministic_environment.set_env({
+        "broker_host": "localhost",
+        "publish_interval": 10,
+        "adaptive_sampling": True,
+        "sample_intervals": {"adc": 1, "temperature": None, "camera": 30},
+    })
+    spec = importlib.util.spec_from_file_location(
+        "greenscale_edge_adaptive_main", MAIN_MODULE_PATH)
+    main = importlib.util.module_from_spec(spec)
+    with env:
+        spec.loader.exec_module(main)
+
+    main.sampling.interval = 40
+    assert main.task_intervals() == {
+        "publish": 40, "adc": 4, "temperature": 40, "camera": 40}
+    main.sampling.interval = 2
+    assert main.task_intervals() == {
+        "publish": 2, "adc": 0.5, "temperature": 2, "camera": 2}
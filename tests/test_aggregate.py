@@ -0,0 +1,55 @@
+import random
+import statistics
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PROJECT_SRC = REPO_ROOT / "greenscale-edge" / "greenscale-edge"
+
+if str(PROJECT_SRC) not in sys.path:
+    sys.path.insert(0, str(PROJECT_SRC))
+
+from telemetry.aggregate import RunningStats, WindowAggregator  # noqa: E402
+
+
+def test_running_stats_matches_batch_statistics():
+    """Welford results should agree with the two-pass formulas."""
+    rng = random.Random(1)
+    values = [rng.gauss(8.0, 0.5) for _ in range(1000)]
+    stats = RunningStats()
+    for v in values:
+        stats.add(v)
+
+    assert stats.count == 1000
+    assert stats.mean == pytest.approx(statistics.fmean(values))
+    assert stats.std == pytest.approx(statistics.stdev(values))
+    assert stats.min == min(values)
+    assert stats.max == max(values)
+    assert stats.last == values[-1]
+
+
+def test_single_sample_has_zero_std():
+    stats = RunningStats()
+    stats.add(7.2)
+    assert stats.summary() == {
+        "min": 7.2, "max": 7.2, "mean": 7.2, "std": 0.0, "last": 7.2,
+        "count": 1,
+    }
+
+
+def test_window_drain_resets_and_skips_idle_channels():
+    """Draining should summarise the window and start a fresh one."""
+    windows = WindowAggregator()
+    for do in (8.0, 6.0, 7.0):
+        windows.update({"do_mg_per_l": do, "avg_color_hex": "#000000"})
+    windows.add("ph", 7.0)
+
+    first = windows.drain()
+    assert first["do_mg_per_l"]["min"] == 6.0
+    assert first["do_mg_per_l"]["count"] == 3
+    assert "avg_color_hex" not in first
+
+    windows.add("ph", 7.1)
+    assert list(windows.drain()) == ["ph"]
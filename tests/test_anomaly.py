@@ -0,0 +1,81 @@
+import random
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PROJECT_SRC = REPO_ROOT / "greenscale-edge" / "greenscale-edge"
+
+if str(PROJECT_SRC) not in sys.path:
+    sys.path.insert(0, str(PROJECT_SRC))
+
+from telemetry.anomaly import AnomalyDetector  # noqa: E402
+
+
+def feed(detector, metric, values, start=0.0, step=1.0):
+    events = []
+    for i, value in enumerate(values):
+        events += detector.update({metric: value}, now=start + i * step)
+    return events
+
+
+def test_zscore_alarm_is_edge_triggered_with_hysteresis():
+    detector = AnomalyDetector(z_threshold=4.0, warmup=20, stuck_sec=None)
+    noise = [7.0 + (0.01 if i % 2 else -0.01) for i in range(40)]
+    assert feed(detector, "ph", noise) == []
+
+    events = feed(detector, "ph", [7.5, 7.5], start=40)
+    assert [(e["kind"], e["state"]) for e in events] == [("zscore", "alarm")]
+    assert events[0]["z"] > 4
+    assert detector.active() == {"ph": ["zscore"]}
+
+    # Back near the mean: cleared once, then quiet.
+    events = feed(detector, "ph", [7.0] * 3, start=42)
+    assert [(e["kind"], e["state"]) for e in events] == [("zscore", "clear")]
+    assert detector.active() == {}
+
+
+def test_rate_limit_is_per_minute():
+    detector = AnomalyDetector(warmup=1000, stuck_sec=None,
+                               rate_limits={"temperature_c": 0.5})
+    # 0.1 degC per 30 s is 0.2/min: fine.
+    assert feed(detector, "temperature_c", [20.0, 20.1, 20.2], step=30) == []
+    # Rates are measured over a minute, not between two samples.
+    assert feed(detector, "temperature_c", [21.0], start=90) == []
+    events = feed(detector, "temperature_c", [21.0], start=120)
+    assert events[0]["kind"] == "rate" and events[0]["per_min"] == 0.8
+    # Rates for metrics without a limit are never checked.
+    assert feed(detector, "ph", [6.0, 9.0], step=1) == []
+
+
+def test_stuck_value_alarm_and_clear():
+    detector = AnomalyDetector(warmup=1000, stuck_sec=60)
+    events = feed(detector, "do_mg_per_l", [7.7] * 8, step=10)
+    assert [(e["kind"], e["state"]) for e in events] == [("stuck", "alarm")]
+    assert events[0]["unchanged_sec"] == 60
+
+    events = feed(detector, "do_mg_per_l", [7.8], start=80)
+    assert [(e["kind"], e["state"]) for e in events] == [("stuck", "clear")]
+
+
+def test_ignores_missing_and_non_numeric_values():
+    detector = AnomalyDetector(warmup=0, stuck_sec=1)
+    readings = {"ph": None, "avg_color_hex": "#123456", "online": True}
+    assert detector.update(readings, now=0) == []
+    assert detector.update(readings, now=5) == []
+    assert detector.channels == {}
+
+
+def test_rate_ignores_quantisation_noise_on_a_stable_tank():
+    detector = AnomalyDetector(stuck_sec=None,
+                               rate_limits={"ph": 0.5, "do_mg_per_l": 1.0})
+    rng = random.Random(7)
+    events = []
+    for t in range(600):
+        events += detector.update({
+            "ph": round(7.0 + rng.gauss(0, 0.01), 2),
+            "do_mg_per_l": round(7.5 + rng.gauss(0, 0.02), 2)}, now=float(t))
+    assert [e for e in events if e["kind"] == "rate"] == []
+    # A real drift still trips it.
+    for t in range(600, 700):
+        events += detector.update({"ph": 7.0 - (t - 600) * 0.02}, now=float(t))
+    assert any(e["kind"] == "rate" and e["state"] == "alarm" for e in events)
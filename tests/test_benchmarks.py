@@ -0,0 +1,66 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+BENCH_DIR = REPO_ROOT / "greenscale-edge" / "benchmarks"
+
+
+def load_bench_module(name):
+    if str(BENCH_DIR) not in sys.path:
+        sys.path.insert(0, str(BENCH_DIR))
+    spec = importlib.util.spec_from_file_location(
+        f"greenscale_bench_{name}", BENCH_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    assert spec.loader is not None
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_topic_matching_wildcards():
+    """The broker stand-in should follow MQTT filter semantics."""
+    loopback = load_bench_module("loopback")
+    assert loopback.topic_matches("greenscale/+/telemetry",
+                                  "greenscale/a/telemetry")
+    assert loopback.topic_matches("greenscale/#", "greenscale/a/sensors/ph")
+    assert not loopback.topic_matches("greenscale/+/telemetry",
+                                      "greenscale/a/b/telemetry")
+
+
+def test_fleet_benchmark_smoke():
+    """A tiny fleet run should deliver every message and report metrics."""
+    fleet = load_bench_module("fleet")
+    report = fleet.run(nodes=3, rounds=5)
+
+    assert report["messages"] == 15
+    assert report["delivered"] == 15
+    assert report["throughput_msg_per_sec"] > 0
+    assert report["publish_p99_ms"] >= report["publish_p50_ms"] > 0
+    assert report["memory_per_node_kib"] > 0
+    assert fleet.check_thresholds(report) == []
+
+
+def test_fleet_thresholds_flag_regressions():
+    """Threshold violations should be reported for CI gating."""
+    fleet = load_bench_module("fleet")
+    report = {
+        "publish_p99_ms": 5.0,
+        "throughput_msg_per_sec": 100.0,
+        "memory_per_node_kib": 10.0,
+        "delivered": 10,
+        "messages": 10,
+    }
+    failures = fleet.check_thresholds(
+        report, max_p99_ms=1.0, min_throughput=1000, max_node_kib=20)
+    assert len(failures) == 2
+
+
+def test_payload_benchmark_smoke():
+    """A tiny payload benchmark run should time every installed backend."""
+    bench = load_bench_module("payload")
+    report = bench.run(iterations=200)
+
+    assert report["baseline_us_per_msg"] > 0
+    assert "json" in report["backends"]
+    for result in report["backends"].values():
+        assert result["us_per_msg"] > 0
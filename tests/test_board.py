@@ -0,0 +1,99 @@
+import math
+import os
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PROJECT_SRC = REPO_ROOT / "greenscale-edge" / "greenscale-edge"
+
+if str(PROJECT_SRC) not in sys.path:
+    sys.path.insert(0, str(PROJECT_SRC))
+
+from telemetry.board import (  # noqa: E402
+    BoardReader, BoardUnavailable, StateBoard)
+
+METRICS = ("temperature_c", "ph", "avg_color_hex")
+DEVICES = ("temperature", "ph", "camera")
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = tmp_path / "state"
+    reader = BoardReader(path)
+    with pytest.raises(BoardUnavailable):
+        reader.read()
+
+    board = StateBoard(path, METRICS, DEVICES)
+    with pytest.raises(BoardUnavailable, match="not been written"):
+        reader.read()
+
+    board.update({"temperature_c": 19.8, "avg_color_hex": "#123456",
+                  "unknown": 1.0}, ts=1000.0)
+    board.set_health({"ph": {"state": "open", "failures": 3,
+                             "error": "no ACK from ADS1115"}})
+    board.commit(now=1001.0)
+
+    snapshot = reader.read()
+    assert snapshot["seq"] == 2 and snapshot["updated"] == 1001.0
+    assert snapshot["pid"] == os.getpid()
+    assert snapshot["metrics"] == {
+        "temperature_c": {"value": 19.8, "ts": 1000.0},
+        "ph": {"value": None, "ts": None},
+        "avg_color_hex": {"value": "#123456", "ts": 1000.0},
+    }
+    assert snapshot["devices"]["ph"] == {
+        "state": "open", "failures": 3, "error": "no ACK from ADS1115"}
+    assert snapshot["devices"]["camera"] == {"state": "ok"}
+    assert reader.value("temperature_c") == 19.8
+    assert reader.value("temperature_c", max_age=5) is None  # ts is 1970
+    board.close()
+    reader.close()
+
+
+def test_reader_follows_a_restarted_writer(tmp_path):
+    path = tmp_path / "state"
+    first = StateBoard(path, METRICS, DEVICES)
+    first.update({"ph": 6.9})
+    first.commit()
+    reader = BoardReader(path)
+    assert reader.value("ph") == 6.9
+
+    first.close()
+    second = StateBoard(path, ("ph", "do_mg_per_l"), DEVICES)
+    second.update({"ph": 7.1, "do_mg_per_l": 7.7})
+    second.commit()
+    assert reader.read()["metrics"]["do_mg_per_l"]["value"] == 7.7
+    assert reader.value("ph") == 7.1
+    second.close()
+    reader.close()
+
+
+def test_concurrent_reads_are_never_torn(tmp_path):
+    path = tmp_path / "state"
+    board = StateBoard(path, METRICS, DEVICES)
+    board.update({"temperature_c": 0.0, "ph": 0.0})
+    board.commit()
+    stop = threading.Event()
+
+    def writer():
+        n = 0
+        while not stop.is_set():
+            n += 1
+            board.update({"temperature_c": float(n), "ph": float(n)})
+            board.commit()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    reader = BoardReader(path)
+    try:
+        for _ in range(2000):
+            metrics = reader.read()["metrics"]
+            assert metrics["temperature_c"]["value"] == metrics["ph"]["value"]
+    finally:
+        stop.set()
+        thread.join()
+        board.close()
+        reader.close()
+    assert not math.isnan(metrics["ph"]["value"])
@@ -0,0 +1,90 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PROJECT_SRC = REPO_ROOT / "greenscale-edge" / "greenscale-edge"
+MAIN_MODULE_PATH = PROJECT_SRC / "main.py"
+
+if str(PROJECT_SRC) not in sys.path:
+    sys.path.insert(0, str(PROJECT_SRC))
+
+from breaker import CircuitBreaker  # noqa: E402
+
+
+def test_breaker_opens_backs_off_and_recovers():
+    now = [0.0]
+    breaker = CircuitBreaker("ph", failure_threshold=2, reset_timeout=10,
+                             max_reset_timeout=25, clock=lambda: now[0])
+
+    breaker.record_failure(OSError("i2c timeout"))
+    assert breaker.allow()
+    assert breaker.status()["state"] == "failing"
+    breaker.record_failure(OSError("i2c timeout"))
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    now[0] = 10
+    assert breaker.allow()  # one half-open trial
+    breaker.record_failure(OSError("i2c timeout"))
+    assert breaker.reset_timeout == 20
+    now[0] = 29
+    assert not breaker.allow()
+
+    now[0] = 30
+    assert breaker.allow()
+    breaker.record_failure(OSError("i2c timeout"))
+    assert breaker.reset_timeout == 25  # capped
+
+    now[0] = 55
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.status() == {"state": "ok"}
+    assert breaker.reset_timeout == 10
+
+
+@pytest.fixture
+def main_module(deterministic_environment, deterministic_sensors):
+    env = deterministic_environment.set_env({"broker_host": "localhost"})
+    spec = importlib.util.spec_from_file_location(
+        "greenscale_edge_breaker_main", MAIN_MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    with env:
+        spec.loader.exec_module(module)
+    return module
+
+
+def test_failing_sensor_yields_partial_payload(main_module, monkeypatch):
+    """A broken pH probe must not stop the other readings."""
+    import sensors.ph_sensor as ph_sensor
+
+    def broken():
+        raise OSError("no ACK from ADS1115")
+
+    monkeypatch.setattr(ph_sensor, "read", broken)
+    data = main_module.collect_sensor_data()
+
+    assert data["ph"] is None
+    assert data["temperature_c"] == 19.8
+    assert data["do_mg_per_l"] == 7.7
+    status = main_module.device_status()
+    assert status["ph"]["state"] == "failing"
+    assert "ADS1115" in status["ph"]["error"]
+    assert status["temperature"] == {"state": "ok"}
+
+
+def test_hung_camera_is_abandoned(main_module, monkeypatch):
+    import threading
+    from camera import camera as camera_module
+
+    release = threading.Event()
+    monkeypatch.setattr(camera_module, "compute_camera_metrics", release.wait)
+    main_module.deadlines.timeouts = {"camera": 0.05}
+    try:
+        assert main_module.collect_camera_data() == {
+            "turbidity_index": None, "avg_color_hex": None}
+        assert "deadline" in main_module.device_status()["camera"]["error"]
+    finally:
+        release.set()
@@ -123,3 +123,40 @@ def test_capture_snapshot_writes_file(monkeypatch, tmp_path, camera_module):
     written_path, written_data = imwrite_calls[0]
     assert written_path == str(output_path)
     assert written_data == converted_frame
+
+
+def test_power_saving_closes_camera_after_each_capture(monkeypatch, camera_module):
+    """In the low-power profile the camera must not stream between captures."""
+    events = []
+
+    class FakeCamera:
+        def create_still_configuration(self, main):
+            return main
+
+        def configure(self, configuration):
+            pass
+
+        def start(self):
+            events.append("start")
+
+        def stop(self):
+            events.append("stop")
+
+        def close(self):
+            events.append("close")
+
+        def capture_array(self):
+            return [[0, 0, 0]]
+
+    monkeypatch.setattr(camera_module, "Picamera2", FakeCamera)
+    monkeypatch.setattr(camera_module.time, "sleep", lambda _s: None)
+
+    camera_module._capture_raw_frame()
+    assert events == ["start"]
+
+    camera_module.set_power_saving(True)
+    assert events == ["start", "stop", "close"]
+    camera_module._capture_raw_frame()
+    camera_module._capture_raw_frame()
+    assert events[3:] == ["start", "stop", "close"] * 2
+    assert camera_module._picam2 is None
@@ -0,0 +1,152 @@
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PROJECT_SRC = REPO_ROOT / "greenscale-edge" / "greenscale-edge"
+MAIN_MODULE_PATH = PROJECT_SRC / "main.py"
+
+if str(PROJECT_SRC) not in sys.path:
+    sys.path.insert(0, str(PROJECT_SRC))
+
+from network.commands import CommandChannel, CommandError  # noqa: E402
+
+
+class RecordingPublisher:
+    """Collects replies and subscriptions instead of talking to a broker."""
+
+    def __init__(self):
+        self.replies = []
+        self.subscriptions = {}
+
+    def subscribe(self, topic, callback, qos=1):
+        self.subscriptions[topic] = callback
+
+    def publish_to(self, topic, payload, qos=1, retain=False):
+        self.replies.append((topic, payload))
+        return True
+
+
+@pytest.fixture
+def channel():
+    return CommandChannel(RecordingPublisher(), "dev/cmd", "dev/cmd/reply")
+
+
+def test_immediate_command_runs_and_replies(channel):
+    """A registered command should run at once and be acknowledged."""
+    channel.register("echo", lambda text: {"text": text})
+    channel.start()
+
+    channel.publisher.subscriptions["dev/cmd"](
+        json.dumps({"id": "1", "cmd": "echo", "args": {"text": "hi"}}))
+
+    topic, reply = channel.publisher.replies[-1]
+    assert topic == "dev/cmd/reply"
+    assert reply["id"] == "1"
+    assert reply["ok"] is True
+    assert reply["result"] == {"text": "hi"}
+    assert reply["latency_ms"] >= 0
+    assert channel.wake.is_set()
+
+
+def test_deferred_command_waits_for_main_loop(channel):
+    """Deferred commands should only run from run_pending()."""
+    calls = []
+    channel.register("snap", lambda: calls.append("snap"), defer=True)
+
+    channel.handle(json.dumps({"id": "2", "cmd": "snap"}))
+    assert calls == []
+    assert channel.wait(0) is True
+
+    channel.run_pending()
+    assert calls == ["snap"]
+    assert channel.publisher.replies[-1][1]["ok"] is True
+
+
+@pytest.mark.parametrize(
+    "raw, error",
+    [
+        ("not json", "invalid command"),
+        (json.dumps({"id": "3", "cmd": "nope"}), "unknown command"),
+        (json.dumps({"id": "4", "cmd": "fail"}), "rejected"),
+        (json.dumps({"id": "5", "cmd": "fail", "args": {"x": 1}}),
+         "bad arguments"),
+    ],
+)
+def test_bad_commands_are_rejected_with_reason(channel, raw, error):
+    """Malformed, unknown or failing commands get a negative reply."""
+    def fail():
+        raise CommandError("rejected")
+
+    channel.register("fail", fail)
+    channel.handle(raw)
+
+    reply = channel.publisher.replies[-1][1]
+    assert reply["ok"] is False
+    assert error in reply["error"]
+
+
+def test_main_command_handlers_apply_and_persist(deterministic_environment):
+    """set_publish_interval should update live config and the file."""
+    env = deterministic_environment.set_env(
+        {"broker_host": "localhost", "broker_password": "hunter2"})
+    spec = importlib.util.spec_from_file_location(
+        "greenscale_edge_commands_main", MAIN_MODULE_PATH)
+    main = importlib.util.module_from_spec(spec)
+    with env:
+        spec.loader.exec_module(main)
+
+    assert main.cmd_set_publish_interval(seconds=3) == {"publish_interval": 3}
+    assert main.cfg["publish_interval"] == 3
+    assert json.loads(main.CFG_PATH.read_text())["publish_interval"] == 3
+    with pytest.raises(CommandError):
+        main.cmd_set_publish_interval(seconds=0)
+
+    main.cmd_burst(interval=1, duration=30)
+    assert main.current_interval() == 1
+    for bad in ({"duration": True}, {"interval": True}, {"duration": "30"}):
+        with pytest.raises(CommandError):
+            main.cmd_burst(**bad)
+
+    assert main.cmd_get_config()["broker_password"] == "***"
+
+    assert main.cmd_set_pump(on_sec=10, schedule=[
+        {"from": "22:00", "to": "06:00", "duty": 0}])["pump"]["on_sec"] == 10
+    assert json.loads(main.CFG_PATH.read_text())["pump"]["schedule"][0]["duty"] == 0
+    with pytest.raises(CommandError, match="schedule"):
+        main.cmd_set_pump(schedule=[{"from": "22:00", "to": "06:00", "mode": "timer"}])
+    assert main.cfg["pump"]["on_sec"] == 10
+
+
+def test_config_commands_run_on_the_main_loop(deterministic_environment, channel):
+    """Handlers touching cfg must not race apply_config on the main loop."""
+    env = deterministic_environment.set_env({"broker_host": "localhost"})
+    spec = importlib.util.spec_from_file_location(
+        "greenscale_edge_defer_main", MAIN_MODULE_PATH)
+    main = importlib.util.module_from_spec(spec)
+    with env:
+        spec.loader.exec_module(main)
+
+    main.register_commands(channel)
+    channel.handle(json.dumps({"id": "1", "cmd": "set_publish_interval",
+                               "args": {"seconds": 4}}))
+    assert channel.publisher.replies == []
+    assert main.cfg["publish_interval"] != 4
+    channel.run_pending()
+    assert main.cfg["publish_interval"] == 4
+    assert channel.publisher.replies[-1][1]["ok"] is True
+
+
+def test_type_errors_inside_a_handler_are_not_bad_arguments(channel):
+    """Only a call that doesn't match the signature is a bad-arguments error."""
+    def broken(x):
+        return len(x)
+
+    channel.register("broken", broken)
+    channel.handle(json.dumps({"id": "1", "cmd": "broken", "args": {"x": 5}}))
+    reply = channel.publisher.replies[-1][1]
+    assert reply["ok"] is False
+    assert not reply["error"].startswith("bad arguments")
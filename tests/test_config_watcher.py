@@ -0,0 +1,194 @@
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PROJECT_SRC = REPO_ROOT / "greenscale-edge" / "greenscale-edge"
+MAIN_MODULE_PATH = PROJECT_SRC / "main.py"
+
+if str(PROJECT_SRC) not in sys.path:
+    sys.path.insert(0, str(PROJECT_SRC))
+
+from config_watcher import ConfigWatcher  # noqa: E402
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def load_json(path):
+    return json.loads(path.read_text())
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_watcher_reloads_after_atomic_replace(tmp_path, use_inotify):
+    """Both inotify and polling should pick up a renamed-in config file."""
+    cfg_path = tmp_path / "config.json"
+    cfg_path.write_text(json.dumps({"publish_interval": 10}))
+    wake = threading.Event()
+    watcher = ConfigWatcher(cfg_path, load=lambda: load_json(cfg_path),
+                            wake=wake, debounce=0.05, poll_interval=0.05,
+                            use_inotify=use_inotify)
+    watcher.start()
+    try:
+        if not use_inotify:
+            assert watcher.mode == "poll"
+            time.sleep(0.02)  # make sure the new mtime differs
+        tmp = tmp_path / "config.json.tmp"
+        tmp.write_text(json.dumps({"publish_interval": 5}))
+        os.replace(tmp, cfg_path)
+
+        assert wake.wait(3.0)
+        assert watcher.take() == {"publish_interval": 5}
+        assert watcher.take() is None
+    finally:
+        watcher.stop()
+
+
+def test_watcher_ignores_invalid_config_and_other_files(tmp_path):
+    """Invalid JSON and unrelated files must not produce a reload."""
+    cfg_path = tmp_path / "config.json"
+    cfg_path.write_text("{}")
+    watcher = ConfigWatcher(cfg_path, load=lambda: load_json(cfg_path),
+                            debounce=0.05, poll_interval=0.05)
+    watcher.start()
+    try:
+        (tmp_path / "other.json").write_text("{}")
+        cfg_path.write_text("{not json")
+        time.sleep(0.3)
+        assert watcher.take() is None
+
+        cfg_path.write_text(json.dumps({"ok": True}))
+        assert wait_for(lambda: watcher._pending is not None)
+        assert watcher.take() == {"ok": True}
+    finally:
+        watcher.stop()
+
+
+@pytest.fixture
+def main_module(deterministic_environment):
+    env = deterministic_environment.set_env({"broker_host": "localhost"})
+    spec = importlib.util.spec_from_file_location(
+        "greenscale_edge_reload_main", MAIN_MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    with env:
+        spec.loader.exec_module(module)
+    return module
+
+
+def test_validate_config_rejects_bad_values(main_module):
+    """Out-of-range or mistyped values should fail validation."""
+    good = main_module.load_config()
+    assert main_module.validate_config(dict(good)) == good
+    for bad in ({"broker_port": 0}, {"publish_interval": "10"},
+                {"topic_layout": "nope"}, {"camera_resolution": [640]},
+                {"sample_intervals": {"adc": -1}}, {"pump": {"duty": 150}},
+                {"pump": "on"}, {"upload_chunk_size": True},
+                {"upload_rate_bps": False}, {"metrics_port": True},
+                {"camera_resolution": [True, 480]}):
+        with pytest.raises(ValueError):
+            main_module.validate_config({**good, **bad})
+
+
+@pytest.mark.parametrize("contents", [
+    json.dumps({"broker_host": "localhost", "publish_interval": -1}),
+    "{truncated",
+])
+def test_unusable_config_at_boot_falls_back_to_defaults(
+        deterministic_environment, contents):
+    """A bad config file must not stop the agent from starting."""
+    env = deterministic_environment.set_env()
+    Path(os.environ["CONFIG_PATH"]).write_text(contents)
+    spec = importlib.util.spec_from_file_location(
+        "greenscale_edge_boot_main", MAIN_MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    with env:
+        spec.loader.exec_module(module)
+    assert module.cfg == module.DEFAULT_CONFIG
+
+
+def test_worker_keeps_its_config_on_a_wrong_typed_file(main_module):
+    before = dict(main_module.cfg)
+    main_module.CFG_PATH.write_text("[1, 2]")
+    main_module.reload_worker_config()
+    assert main_module.cfg == before
+
+
+def test_apply_config_reconfigures_only_affected_components(
+        main_module, monkeypatch):
+    """Broker, uploader and camera changes reach the live objects."""
+    publisher = MagicMock()
+    uploader = MagicMock()
+    configure_camera = MagicMock()
+    monkeypatch.setattr(main_module.camera, "configure", configure_camera)
+
+    new_cfg = dict(main_module.cfg, publish_interval=2)
+    assert main_module.apply_config(new_cfg, publisher, uploader) == [
+        "publish_interval"]
+    assert main_module.cfg["publish_interval"] == 2
+    publisher.reconfigure.assert_not_called()
+    uploader.configure.assert_not_called()
+
+    new_cfg = dict(main_module.cfg, broker_host="10.0.0.5",
+                   upload_rate_bps=1024, camera_resolution=[1920, 1080])
+    main_module.apply_config(new_cfg, publisher, uploader)
+    assert publisher.reconfigure.call_args.kwargs["host"] == "10.0.0.5"
+    uploader.configure.assert_called_once_with(16384, 1024)
+    configure_camera.assert_called_once_with(resolution=[1920, 1080])
+
+
+def test_startup_only_keys_are_reported_as_needing_restart(main_module, capsys):
+    main_module.apply_config(dict(main_module.cfg, serializer="json",
+                                  publish_interval=3))
+    out = capsys.readouterr().out
+    assert "Applied changes: publish_interval\n" in out
+    assert "Needs restart: serializer" in out
+
+
+def test_apply_config_reopens_the_pump_monitor_on_a_new_path(
+        main_module, tmp_path):
+    """The one shared monitor follows pump_state_path changes."""
+    from telemetry.pump_state import PumpRecorder
+
+    old = MagicMock()
+    main_module.aeration.monitor = old
+    recorder = PumpRecorder(tmp_path / "pump")
+    recorder.update(50, "on")
+    main_module.apply_config(dict(main_module.cfg,
+                                  pump_state_path=str(tmp_path / "pump")))
+    old.close.assert_called_once()
+    monitor = main_module.aeration.monitor
+    assert monitor is not old and monitor.status()["state"] == "on"
+    monitor.close()
+    recorder.close()
+
+
+def test_publisher_reconfigure_switches_broker(monkeypatch):
+    """reconfigure() should reconnect to the new host and keep the spool."""
+    from network import mqtt
+
+    pub = mqtt.MQTTPublisher("old-host", "dev/telemetry", backoff_base=0.01)
+    assert pub.connect()
+    old_client = pub.client
+    assert pub.reconfigure(host="old-host") is False
+
+    monkeypatch.setattr(
+        old_client, "publish",
+        MagicMock(side_effect=AssertionError("old client used")))
+    assert pub.reconfigure(host="new-host", port=8883) is True
+    assert pub.client is not old_client
+    assert wait_for(lambda: pub.connected)
+    assert pub.publish({"n": 1})
+    pub.close()
@@ -27,7 +27,7 @@ def test_main_runs_single_cycle_end_to_end(
     deterministic_environment, deterministic_sensors, monkeypatch
 ):
     """Run main() once end-to-end and inspect the broker payload."""
-    config_data = {"broker_host": "localhost", "publish_interval": 0}
+    config_data = {"broker_host": "localhost", "publish_interval": 0.01}
     env = deterministic_environment.set_env(
         config_data, device_id="e2e-device")
 
@@ -47,10 +47,54 @@ def test_main_runs_single_cycle_end_to_end(
     main.main()
 
     assert captured_publishers, "MQTT publisher should be invoked"
-    published = captured_publishers[-1].client.published_messages[-1]
+    messages = captured_publishers[-1].client.published_messages
+    published = [m for m in messages if m["topic"].endswith("/telemetry")][-1]
     decoded = json.loads(published["payload"])
 
     assert decoded["device_id"] == "e2e-device"
     assert decoded["sensors"]["temperature_c"] == 19.8
+    assert decoded["status"]["sensors"]["ph"] == {"state": "ok"}
     assert decoded["camera"]["avg_color_hex"] == "#123456"
+    assert decoded["stats"]["temperature_c"]["count"] == 1
+    assert decoded["stats"]["do_mg_per_l"]["last"] == 7.7
+    assert "avg_color_hex" not in decoded["stats"]
     assert published["topic"].endswith("/telemetry")
+    # The single layout encodes in one pass, reported as serialize.
+    assert main.metrics.stages["serialize"].count == 1
+    assert "build_payload" not in main.metrics.stages
+
+
+def test_payload_carries_pump_state(
+    deterministic_environment, deterministic_sensors, monkeypatch, tmp_path
+):
+    """The pump service's board is read straight into status.pump."""
+    from telemetry.pump_state import PumpRecorder
+
+    recorder = PumpRecorder(tmp_path / "pump", tmp_path / "pump-events")
+    recorder.update(75, "pid")
+    config_data = {"broker_host": "localhost", "publish_interval": 0.01,
+                   "pump_state_path": str(tmp_path / "pump"),
+                   "pump_events_path": str(tmp_path / "pump-events")}
+    env = deterministic_environment.set_env(config_data, device_id="e2e-pump")
+
+    import network.mqtt as mqtt_module
+
+    original_publish = mqtt_module.MQTTPublisher.publish
+    captured = []
+
+    def publish_and_stop(self, payload, qos=1):
+        captured.append(self)
+        original_publish(self, payload, qos)
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(mqtt_module.MQTTPublisher, "publish", publish_and_stop)
+
+    main = load_main_module(env, "greenscale_edge_e2e_pump_main")
+    main.main()
+    recorder.close()
+
+    messages = captured[-1].client.published_messages
+    published = [m for m in messages if m["topic"].endswith("/telemetry")][-1]
+    pump = json.loads(published["payload"])["status"]["pump"]
+    assert pump["state"] == "on" and pump["duty"] == 75
+    assert pump["reason"] == "pid" and pump["starts"] == 1
@@ -0,0 +1,136 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PROJECT_SRC = REPO_ROOT / "greenscale-edge" / "greenscale-edge"
+
+if str(PROJECT_SRC) not in sys.path:
+    sys.path.insert(0, str(PROJECT_SRC))
+
+from telemetry.history_api import (  # noqa: E402
+    HistoryQueryError, etag_matches, parse_duration, parse_query, query_etag,
+    stream_json)
+from telemetry.store import DAY_MS, HOUR_MS, MINUTE_MS, HistoryStore  # noqa: E402
+
+T0 = 1_700_000_000_000 - 1_700_000_000_000 % DAY_MS  # midnight UTC
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / "history.db"
+    writer = HistoryStore(path)
+    for i in range(3 * 60):  # three hours, one sample a minute
+        writer.record({"ph": float(i % 60)}, ts_ms=T0 + i * MINUTE_MS)
+    writer.close()
+    reader = HistoryStore(path, readonly=True)
+    yield reader
+    reader.close()
+
+
+def body(store, query):
+    return json.loads("".join(stream_json(store, query)))
+
+
+def test_parse_query_defaults_and_validation():
+    query = parse_query({}, "ph", now=T0)
+    assert (query["start"], query["end"]) == (T0 - DAY_MS, T0)
+    assert query["resolution"] == "1m"
+
+    query = parse_query({"start": "-2h", "bucket": "30m", "agg": "mean,max"},
+                        "ph", now=T0)
+    assert query["start"] == T0 - 2 * HOUR_MS
+    assert query["resolution"] == "1m"  # 30m buckets are built from 1m rows
+    assert query["fields"] == ("mean", "max")
+
+    iso = parse_query({"start": "2023-11-14T00:00:00Z", "end": "-1h"}, "ph",
+                      now=T0 + DAY_MS)
+    assert iso["start"] == T0
+    assert parse_duration("1d") == DAY_MS
+    for bad in ({"start": "yesterday"}, {"bucket": "5x"}, {"agg": "median"},
+                {"resolution": "5m"}, {"limit": "0"},
+                {"start": str(T0), "end": str(T0)}, {"start": "-infh"},
+                {"start": "-nanh"}, {"bucket": "1e300d"}, {"end": "9" * 30}):
+        with pytest.raises(HistoryQueryError):
+            parse_query(bad, "ph", now=T0)
+
+
+def test_bucketed_query_aggregates_rollups(store):
+    query = parse_query({"start": str(T0), "end": str(T0 + 3 * HOUR_MS),
+                         "bucket": "1h"}, "ph")
+    result = body(store, query)
+
+    assert result["count"] == 3 and result["next"] is None
+    first = result["points"][0]
+    assert first["ts"] == T0
+    assert first["count"] == 60
+    assert first["mean"] == pytest.approx(29.5)
+    assert (first["min"], first["max"], first["last"]) == (0.0, 59.0, 59.0)
+
+
+def test_pages_chain_through_next_cursor(store):
+    args = {"start": str(T0), "end": str(T0 + 3 * HOUR_MS),
+            "resolution": "raw", "limit": "70"}
+    seen = []
+    after = None
+    while True:
+        page = body(store, parse_query(dict(args, after=after or ""), "ph"))
+        seen.extend(p["ts"] for p in page["points"])
+        after = page["next"]
+        if after is None:
+            break
+    assert seen == [T0 + i * MINUTE_MS for i in range(180)]
+
+    bucket_args = {"start": str(T0), "end": str(T0 + 3 * HOUR_MS),
+                   "bucket": "15m", "limit": "5", "agg": "count"}
+    first = body(store, parse_query(bucket_args, "ph"))
+    second = body(store, parse_query(
+        dict(bucket_args, after=str(first["next"])), "ph"))
+    assert second["points"][0]["ts"] == first["points"][-1]["ts"] + 15 * MINUTE_MS
+    assert set(second["points"][0]) == {"ts", "count"}
+
+
+def test_etag_tracks_new_data(tmp_path):
+    path = tmp_path / "history.db"
+    writer = HistoryStore(path)
+    writer.record({"ph": 7.0}, ts_ms=T0)
+    writer.flush()
+    reader = HistoryStore(path, readonly=True)
+    query = parse_query({"start": str(T0), "end": str(T0 + HOUR_MS),
+                         "resolution": "1m"}, "ph")
+
+    etag = query_etag(reader, query)
+    assert etag == query_etag(reader, query)
+    writer.record({"ph": 7.2}, ts_ms=T0 + 1000)  # same minute bucket
+    writer.flush()
+    assert query_etag(reader, query) != etag
+    reader.close()
+    writer.close()
+
+
+def test_etag_of_relative_range_survives_the_clock(store):
+    now = T0 + 3 * HOUR_MS + 30_000  # between two samples
+    etag = query_etag(store, parse_query({"start": "-2h"}, "ph", now=now))
+    assert etag.startswith('W/"')
+    # A second later no row has entered or left the range.
+    assert query_etag(store, parse_query(
+        {"start": "-2h"}, "ph", now=now + 1000)) == etag
+    assert query_etag(store, parse_query(
+        {"start": "-3h"}, "ph", now=now + 1000)) != etag
+
+    absolute = query_etag(store, parse_query(
+        {"start": str(T0), "end": str(now)}, "ph"))
+    assert absolute.startswith('"')
+
+
+def test_if_none_match_compares_whole_tags():
+    etag = '"0123456789abcdef01234567"'
+    assert etag_matches(etag, etag)
+    assert etag_matches('"other", W/' + etag, etag)
+    assert etag_matches("*", etag)
+    assert etag_matches(etag, "W/" + etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"x' + etag[1:-1] + 'y"', etag)
+    assert not etag_matches('"0123456789abcdef0123"', etag)
@@ -42,6 +42,7 @@ def test_collect_and_publish_cycle_integration(
     payload = main.build_payload(sensor_data, camera_data)
 
     assert publisher.publish(payload)
+    publisher.close()
     published = publisher.client.published_messages[-1]
     decoded = json.loads(published["payload"])
 
@@ -0,0 +1,90 @@
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PROJECT_SRC = REPO_ROOT / "greenscale-edge" / "greenscale-edge"
+
+if str(PROJECT_SRC) not in sys.path:
+    sys.path.insert(0, str(PROJECT_SRC))
+
+from telemetry.metrics import Histogram, MetricsRegistry, MetricsServer  # noqa: E402
+
+
+def test_histogram_buckets_and_quantile():
+    """Observations land in the first bucket whose bound covers them."""
+    h = Histogram(buckets=(0.01, 0.1, 1.0))
+    for value in (0.005, 0.05, 0.05, 0.5, 3.0):
+        h.observe(value)
+
+    assert h.counts == [1, 2, 1, 1]
+    assert list(h.cumulative())[-1] == (float("inf"), 5)
+    assert h.quantile(0.5) == 0.1
+    assert h.quantile(0.99) == 3.0  # +Inf bucket reports the max seen
+    assert h.sum == pytest.approx(3.605)
+
+
+def test_timer_records_duration_and_errors():
+    """Failing stages are still timed and counted as errors."""
+    registry = MetricsRegistry()
+    with registry.time("ph"):
+        pass
+    with pytest.raises(RuntimeError):
+        with registry.time("ph"):
+            raise RuntimeError("bus error")
+
+    assert registry.stages["ph"].count == 2
+    assert registry.counters["stage_errors"] == {(("stage", "ph"),): 1}
+    summary = registry.summary()["ph"]
+    assert summary["count"] == 2
+    assert summary["max_ms"] >= summary["mean_ms"] >= 0
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    registry.observe("publish", 0.002)
+    registry.inc("mqtt_messages", result="sent")
+
+    text = registry.render()
+    assert "# TYPE greenscale_stage_duration_seconds histogram" in text
+    assert ('greenscale_stage_duration_seconds_bucket{stage="publish",le="0.0025"} 1'
+            in text)
+    assert ('greenscale_stage_duration_seconds_bucket{stage="publish",le="+Inf"} 1'
+            in text)
+    assert 'greenscale_stage_duration_seconds_count{stage="publish"} 1' in text
+    assert 'greenscale_mqtt_messages_total{result="sent"} 1' in text
+
+
+def test_metrics_server_serves_endpoint():
+    """The HTTP endpoint should serve /metrics and 404 anything else."""
+    registry = MetricsRegistry()
+    registry.observe("camera", 0.3)
+    server = MetricsServer(registry, port=0)
+    server.start()
+    try:
+        base = f"http://127.0.0.1:{server.port}"
+        with urllib.request.urlopen(f"{base}/metrics", timeout=2) as resp:
+            assert resp.status == 200
+            assert resp.headers["Content-Type"].startswith("text/plain")
+            assert 'stage="camera"' in resp.read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{base}/other", timeout=2)
+    finally:
+        server.stop()
+
+
+def test_publisher_times_serialise_and_publish():
+    """An attached registry records serialise/publish stages and results."""
+    from network.mqtt import MQTTPublisher
+
+    pub = MQTTPublisher("localhost", "dev/telemetry")
+    pub.metrics = MetricsRegistry()
+    assert pub.publish({"n": 1})
+    pub.close()
+
+    assert pub.metrics.stages["serialize"].count == 1
+    assert pub.metrics.stages["publish"].count == 1
+    assert pub.metrics.counters["mqtt_messages"] == {(("result", "sent"),): 1}
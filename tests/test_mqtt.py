@@ -3,6 +3,7 @@ import importlib
 import json
 import os
 import sys
+import time
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
@@ -34,6 +35,13 @@ def mqtt():
     return load_module()
 
 
+def accepting_client():
+    """A mock paho client whose publishes are accepted."""
+    client = MagicMock()
+    client.publish.return_value.rc = 0
+    return client
+
+
 def test_connect_success(mqtt):
     """Connect() should succeed when broker connection works."""
     with patch(
@@ -44,6 +52,7 @@ def test_connect_success(mqtt):
         assert pub.connect() is True
         mock_connect.assert_called_once_with("localhost", 1883, 30)
         assert pub.connected
+        pub.close()
 
 
 def test_connect_failure_retries(mqtt):
@@ -52,15 +61,17 @@ def test_connect_failure_retries(mqtt):
         "paho.mqtt.client.Client.connect",
         side_effect=Exception("fail"),
     ):
-        pub = mqtt.MQTTPublisher(host="localhost", topic="greenscale/test")
+        pub = mqtt.MQTTPublisher(
+            host="localhost", topic="greenscale/test", backoff_base=60)
         result = pub.connect(retries=2, delay=0)
         assert not result
         assert not pub.connected
+        pub.close()
 
 
 def test_publish_json_success(mqtt):
     """Publish should JSON-encode payload and call client.publish()."""
-    fake_client = MagicMock()
+    fake_client = accepting_client()
     pub = mqtt.MQTTPublisher(host="broker", topic="greenscale/test")
     pub.client = fake_client
     pub.connected = True
@@ -76,23 +87,106 @@ def test_publish_json_success(mqtt):
 
 
 def test_publish_triggers_connect_on_first_use(mqtt):
-    """If not connected, publish() should attempt to connect first."""
+    """If never connected, publish() should attempt to connect first."""
     with (
-        patch.object(mqtt.MQTTPublisher, "connect", return_value=True)
+        patch("paho.mqtt.client.Client.connect", return_value=0)
         as mock_connect,
-        patch("paho.mqtt.client.Client.publish", return_value=True)
+        patch("paho.mqtt.client.Client.publish",
+              return_value=MagicMock(rc=0))
         as mock_pub,
     ):
 
         pub = mqtt.MQTTPublisher(host="broker", topic="greenscale/test")
         payload = {"key": "value"}
         result = pub.publish(payload)
+        pub.close()
 
         mock_connect.assert_called_once()
         mock_pub.assert_called_once()
         assert result is True
 
 
+def test_publish_spools_while_offline_and_flushes_on_reconnect(mqtt):
+    """Offline publishes should be queued, not block, and drain in order."""
+    fake_client = accepting_client()
+    pub = mqtt.MQTTPublisher(host="broker", topic="greenscale/test")
+    pub.client = fake_client
+    pub._worker = MagicMock()  # pretend the background worker is running
+
+    assert pub.publish({"n": 1}) is False
+    assert pub.publish({"n": 2}) is False
+    fake_client.publish.assert_not_called()
+    assert len(pub.spool) == 2
+
+    pub.connected = True
+    pub._flush_spool()
+
+    sent = [json.loads(c.args[1])["n"]
+            for c in fake_client.publish.call_args_list]
+    assert sent == [1, 2]
+    assert not pub.spool
+
+
+def test_spool_is_bounded_and_counts_drops(mqtt):
+    """The spool should drop the oldest messages once full."""
+    pub = mqtt.MQTTPublisher(
+        host="broker", topic="greenscale/test", spool_size=2)
+    pub._worker = MagicMock()
+
+    for n in range(3):
+        pub.publish({"n": n})
+
+    assert [json.loads(m[1])["n"] for m in pub.spool] == [1, 2]
+    assert pub.dropped == 1
+
+
+def test_priority_messages_flush_before_telemetry(mqtt):
+    """Alarms spooled while offline should be delivered first."""
+    fake_client = accepting_client()
+    pub = mqtt.MQTTPublisher(host="broker", topic="greenscale/test")
+    pub.client = fake_client
+    pub._worker = MagicMock()
+
+    pub.publish({"n": 1})
+    pub.publish_to("greenscale/test/alarm", {"n": 2}, priority=True)
+    pub.publish({"n": 3})
+    assert len(pub.spool) == 2 and len(pub.priority_spool) == 1
+
+    pub.connected = True
+    pub._flush_spool()
+
+    sent = [json.loads(c.args[1])["n"]
+            for c in fake_client.publish.call_args_list]
+    assert sent == [2, 1, 3]
+    assert not pub.priority_spool
+
+
+def test_backoff_grows_exponentially_with_jitter_and_caps(mqtt):
+    """Delays should double per attempt, stay jittered, and respect the cap."""
+    backoff = mqtt.Backoff(base=1.0, cap=8.0)
+    delays = [backoff.next_delay() for _ in range(6)]
+
+    for attempt, d in enumerate(delays):
+        ceiling = min(8.0, 2 ** attempt)
+        assert ceiling / 2 <= d <= ceiling
+
+    backoff.reset()
+    assert 0.5 <= backoff.next_delay() <= 1.0
+
+
+def test_disconnect_callback_moves_to_disconnected(mqtt):
+    """on_disconnect should drop the connected state unless stopped."""
+    pub = mqtt.MQTTPublisher(host="broker", topic="greenscale/test")
+    pub.connected = True
+
+    pub._on_disconnect(pub.client, None, None, 7)
+    assert pub.state == mqtt.STATE_DISCONNECTED
+
+    pub.state = mqtt.STATE_STOPPED
+    pub._on_disconnect(pub.client, None, None, 0)
+    assert pub.state == mqtt.STATE_STOPPED
+
+
 def test_publish_handles_failure_and_resets_connection(mqtt):
     """If publish raises, connection flag should reset to False."""
     fake_client = MagicMock()
@@ -128,6 +222,7 @@ def test_connect_with_tls_configuration(mqtt):
         )
 
         assert pub.connect(retries=1, delay=0)
+        pub.close()
         mock_tls_set.assert_called_once_with(
             ca_certs="/path/ca.pem",
             certfile="/path/cert.pem",
@@ -152,6 +247,7 @@ def test_connect_with_missing_tls_file(mqtt):
         )
 
         result = pub.connect(retries=1, delay=0)
+        pub.close()
         assert result is False
         mock_connect.assert_not_called()
 
@@ -172,6 +268,7 @@ def test_connect_with_credentials_sets_username_and_password(mqtt):
         )
 
         assert pub.connect(retries=1, delay=0)
+        pub.close()
         mock_auth.assert_called_once_with("user1", "secret")
         mock_connect.assert_called_once_with("localhost", 1883, 30)
 
@@ -222,6 +319,7 @@ def test_main_passes_configured_credentials_to_publisher(tmp_path):
             tls_insecure=config_data["tls_insecure"],
             username=config_data["broker_username"],
             password=config_data["broker_password"],
+            status_topic=module.STATUS_TOPIC,
         )
 
 
@@ -246,3 +344,157 @@ def test_load_config_applies_security_defaults(tmp_path):
     assert config["tls_client_cert"] is None
     assert config["tls_client_key"] is None
     assert config["tls_insecure"] is False
+
+
+def test_connect_sets_will_and_publishes_retained_birth(mqtt):
+    """A status topic should get a Last Will and a retained birth message."""
+    pub = mqtt.MQTTPublisher(
+        host="localhost",
+        topic="greenscale/test/telemetry",
+        status_topic="greenscale/test/status",
+    )
+    assert pub.connect()
+    pub.close()
+
+    assert pub.client.will["topic"] == "greenscale/test/status"
+    assert json.loads(pub.client.will["payload"]) == {"online": False}
+    assert pub.client.will["retain"] is True
+
+    birth, death = pub.client.published_messages
+    assert birth["topic"] == "greenscale/test/status"
+    assert json.loads(birth["payload"]) == {"online": True}
+    assert birth["retain"] is True
+    assert json.loads(death["payload"]) == {"online": False}
+
+
+def test_publish_metrics_uses_one_retained_topic_per_metric(mqtt):
+    """Each sensor/camera value should land on its own retained topic."""
+    fake_client = accepting_client()
+    pub = mqtt.MQTTPublisher(host="broker", topic="greenscale/dev/telemetry")
+    pub.client = fake_client
+    pub.connected = True
+
+    payload = {
+        "timestamp": "2024-01-01T00:00:00Z",
+        "sensors": {"ph": 7.1, "temperature_c": 20.5},
+        "camera": {"turbidity_index": 0.3},
+    }
+    assert pub.publish_metrics(payload, "greenscale/dev")
+
+    calls = {c.args[0]: c for c in fake_client.publish.call_args_list}
+    assert set(calls) == {
+        "greenscale/dev/sensors/ph",
+        "greenscale/dev/sensors/temperature_c",
+        "greenscale/dev/camera/turbidity_index",
+    }
+    ph_call = calls["greenscale/dev/sensors/ph"]
+    assert json.loads(ph_call.args[1]) == {
+        "value": 7.1, "timestamp": "2024-01-01T00:00:00Z"}
+    assert ph_call.kwargs["retain"] is True
+
+
+def test_offline_retained_metrics_keep_only_latest_value(mqtt):
+    """Spooled retained messages should be coalesced per topic."""
+    pub = mqtt.MQTTPublisher(host="broker", topic="greenscale/dev/telemetry")
+    pub._worker = MagicMock()
+
+    for ph in (6.8, 6.9, 7.0):
+        pub.publish_metrics({"sensors": {"ph": ph}}, "greenscale/dev")
+
+    assert not pub.spool
+    assert list(pub.retained_pending) == ["greenscale/dev/sensors/ph"]
+    message, _qos = pub.retained_pending["greenscale/dev/sensors/ph"]
+    assert json.loads(message)["value"] == 7.0
+
+
+def test_subscriptions_are_restored_and_dispatched(mqtt):
+    """Subscriptions should be re-sent on connect and routed by topic."""
+    received = []
+    pub = mqtt.MQTTPublisher(host="localhost", topic="greenscale/test")
+    pub.subscribe("greenscale/test/cmd", received.append)
+
+    assert pub.connect()
+    pub.close()
+    assert ("greenscale/test/cmd", 1) in pub.client.subscriptions
+
+    message = MagicMock(topic="greenscale/test/cmd", payload=b"{}")
+    pub._on_message(pub.client, None, message)
+    assert received == [b"{}"]
+
+
+def test_connected_only_after_broker_acknowledges(mqtt):
+    """A sent CONNECT leaves the publisher connecting until the CONNACK."""
+    pub = mqtt.MQTTPublisher(host="broker", topic="greenscale/test")
+    pub.client = accepting_client()
+    pub._worker = MagicMock()
+    assert pub._attempt_connect() is True
+    assert pub.state == mqtt.STATE_CONNECTING
+    assert pub.publish({"n": 1}) is False
+
+    pub._on_connect(pub.client, None, {}, 0)
+    assert pub.connected
+    pub._flush_spool()
+    pub.client.publish.assert_called_once()
+
+    pub._on_connect(pub.client, None, {}, 5)
+    assert pub.state == mqtt.STATE_DISCONNECTED
+
+
+def test_retained_value_spooled_during_send_is_kept(mqtt):
+    """Flushing must not drop a newer value queued while the old one sent."""
+    pub = mqtt.MQTTPublisher(host="broker", topic="greenscale/dev/telemetry")
+    pub._worker = MagicMock()
+    pub.publish_metrics({"sensors": {"ph": 6.8}}, "greenscale/dev")
+
+    sent = []
+
+    def publish(topic, message, qos=0, retain=False):
+        sent.append(json.loads(message)["value"])
+        if len(sent) == 1:
+            pub._spool(topic, json.dumps({"value": 7.0}), qos, retain=True)
+        return MagicMock(rc=0)
+
+    pub.client = MagicMock()
+    pub.client.publish.side_effect = publish
+    pub.connected = True
+    pub._flush_spool()
+
+    assert sent == [6.8, 7.0]
+    assert not pub.retained_pending
+
+
+def test_publish_not_queued_by_paho_is_spooled(mqtt):
+    """A publish paho refuses (e.g. link just dropped) must not be lost."""
+    pub = mqtt.MQTTPublisher(host="broker", topic="greenscale/test")
+    pub.client = MagicMock()
+    pub.client.publish.return_value.rc = mqtt.mqtt.MQTT_ERR_NO_CONN
+    pub._worker = MagicMock()
+    pub.connected = True
+
+    assert pub.publish({"n": 1}) is False
+    assert not pub.connected
+    assert [json.loads(m[1])["n"] for m in pub.spool] == [1]
+
+    pub.connected = True
+    pub._flush_spool()
+    assert not pub.connected
+    assert [json.loads(m[1])["n"] for m in pub.spool] == [1]
+
+
+def test_worker_survives_errors_in_the_network_loop(mqtt):
+    """An exception in the loop should trigger a reconnect, not kill the thread."""
+    pub = mqtt.MQTTPublisher(
+        host="broker", topic="greenscale/test", backoff_base=0.01)
+    client = MagicMock()
+    client.loop.side_effect = [RuntimeError("boom")] + [0] * 1000
+    pub.client = client
+    pub.connected = True
+    pub._start_worker()
+    try:
+        deadline = time.monotonic() + 5
+        while client.connect.call_count == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert client.connect.called
+        assert pub._worker.is_alive()
+    finally:
+        pub.close()
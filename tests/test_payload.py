@@ -0,0 +1,42 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PROJECT_SRC = REPO_ROOT / "greenscale-edge" / "greenscale-edge"
+
+if str(PROJECT_SRC) not in sys.path:
+    sys.path.insert(0, str(PROJECT_SRC))
+
+from telemetry import payload  # noqa: E402
+
+
+@pytest.mark.parametrize("backend", ["json", "auto"])
+def test_template_encode_matches_built_payload(backend):
+    """encode() must produce the same document as build()."""
+    _name, dumps = payload.get_serializer(backend)
+    template = payload.PayloadTemplate('edge "01"', dumps=dumps)
+    args = ("2024-01-01T00:00:00Z", {"online": True}, {"ph": 6.9},
+            {"avg_color_hex": "#123456"})
+
+    assert json.loads(template.encode(*args)) == template.build(*args)
+    with_stats = template.encode(*args, stats={"ph": {"count": 2}})
+    assert json.loads(with_stats)["stats"] == {"ph": {"count": 2}}
+    assert json.loads(with_stats)["device_id"] == 'edge "01"'
+
+
+def test_utc_timestamp_is_cached_per_second():
+    assert payload.utc_timestamp(0) == "1970-01-01T00:00:00Z"
+    assert payload.utc_timestamp(0.9) is payload.utc_timestamp(0.2)
+    assert payload.utc_timestamp(61) == "1970-01-01T00:01:01Z"
+
+
+def test_get_serializer_falls_back_without_orjson(monkeypatch):
+    monkeypatch.setitem(sys.modules, "orjson", None)  # import fails
+    name, dumps = payload.get_serializer("orjson")
+    assert name == "json"
+    assert dumps({"a": [1, 2]}) == b'{"a":[1,2]}'
+    with pytest.raises(ValueError):
+        payload.get_serializer("msgpack")
@@ -0,0 +1,173 @@
+import importlib.util
+import math
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PROJECT_SRC = REPO_ROOT / "greenscale-edge" / "greenscale-edge"
+MAIN_MODULE_PATH = PROJECT_SRC / "main.py"
+
+if str(PROJECT_SRC) not in sys.path:
+    sys.path.insert(0, str(PROJECT_SRC))
+
+from pipeline import Pipeline, Worker, decode, encode  # noqa: E402
+from shm_ring import RingBuffer  # noqa: E402
+
+
+def test_ring_drops_oldest_when_lapped():
+    ring = RingBuffer("<dI", capacity=4)
+    try:
+        for i in range(3):
+            ring.push(float(i), i)
+        assert len(ring) == 3
+        assert ring.pop_all() == [(0.0, 0), (1.0, 1), (2.0, 2)]
+        for i in range(10):
+            ring.push(float(i), i)
+        assert [n for _, n in ring.pop_all()] == [6, 7, 8, 9]
+        assert ring.dropped == 6
+        assert ring.pop_all() == []
+    finally:
+        ring.close()
+
+
+def test_ring_attaches_by_name():
+    ring = RingBuffer("<d", capacity=8)
+    other = RingBuffer("<d", capacity=8, name=ring.name, lock=ring.lock)
+    try:
+        ring.push(1.5)
+        assert other.pop_all() == [(1.5,)]
+    finally:
+        other.close()
+        ring.close()
+
+
+def test_record_round_trip():
+    ok = {"state": "ok"}
+    assert decode(encode("ph", 6.9, ok, 0.01, mono=5.0, wall=1700000000.0)) == (
+        "ph", 6.9, ok, pytest.approx(0.01), 5.0, 1700000000.0)
+    assert decode(encode("avg_color_hex", "#123456", ok))[1] == "#123456"
+
+    failing = {"state": "open", "failures": 3, "error": "no ACK from ADS1115"}
+    metric, value, status, *_ = decode(encode("do_mg_per_l", None, failing))
+    assert value is None and status == failing
+
+
+def test_workers_run_in_child_processes():
+    import os
+
+    parent = os.getpid()
+    worker = Worker(
+        "acquisition",
+        {"temperature": lambda: {"temperature_c": float(os.getpid() != parent)}},
+        lambda metric: ({"state": "ok"}, 0.0),
+        handlers={"pid": os.getpid},
+    )
+    pipeline = Pipeline([worker], {"temperature": 0.5, "adc": 1, "camera": 1})
+    pipeline.start()
+    try:
+        deadline = time.monotonic() + 10
+        records = []
+        while not records and time.monotonic() < deadline:
+            time.sleep(0.05)
+            records = pipeline.drain()
+        assert records[0][:2] == ("temperature_c", 1.0)
+        assert pipeline.request("acquisition", "pid", timeout=10) != parent
+        with pytest.raises(RuntimeError, match="KeyError"):
+            pipeline.request("acquisition", "missing", timeout=10)
+        assert pipeline.dead() == []
+    finally:
+        pipeline.stop()
+    assert pipeline.dead() == ["acquisition"]
+
+
+def test_on_start_runs_in_the_child_before_tasks():
+    import os
+
+    started = {}
+    worker = Worker(
+        "acquisition",
+        {"temperature": lambda: {"temperature_c": float(started.get(os.getpid(), 0))}},
+        lambda metric: ({"state": "ok"}, 0.0),
+        on_start=lambda: started.update({os.getpid(): 1}),
+    )
+    pipeline = Pipeline([worker], {"temperature": 0.5, "adc": 1, "camera": 1})
+    pipeline.start()
+    try:
+        deadline = time.monotonic() + 10
+        records = []
+        while not records and time.monotonic() < deadline:
+            time.sleep(0.05)
+            records = pipeline.drain()
+        assert records[0][:2] == ("temperature_c", 1.0)
+    finally:
+        pipeline.stop()
+    assert started == {}
+
+
+def test_main_consumes_worker_records(
+        deterministic_environment, deterministic_sensors):
+    env = deterministic_environment.set_env(
+        {"broker_host": "localhost", "pipeline": "multiprocess"})
+    spec = importlib.util.spec_from_file_location(
+        "greenscale_edge_pipeline_main", MAIN_MODULE_PATH)
+    main = importlib.util.module_from_spec(spec)
+    with env:
+        spec.loader.exec_module(main)
+
+    pipeline = main.build_pipeline()
+    # Feed records as the workers would, without forking.
+    for name, worker in pipeline.workers.items():
+        for task in worker.tasks.values():
+            worker._push(task())
+    recorded, sensors, camera_data = [], {}, {}
+    count = main.consume_pipeline(
+        pipeline, lambda reading, **kw: recorded.append((reading, kw)),
+        sensors, camera_data)
+    for worker in pipeline.workers.values():
+        worker.ring.close()
+
+    assert count == 6
+    assert sensors == {"temperature_c": 19.8, "ph": 6.9, "do_mg_per_l": 7.7,
+                       "turbidity_sensor_v": 2.5}
+    assert camera_data == {"turbidity_index": 0.42, "avg_color_hex": "#123456"}
+    assert all(not math.isnan(kw["now"]) for _, kw in recorded)
+    assert main.device_status()["camera"] == {"state": "ok"}
+    assert all(worker.on_start is main.configure_hardware
+               for worker in pipeline.workers.values())
+
+
+def test_consumer_tags_turbidity_while_aerating(
+        deterministic_environment, deterministic_sensors):
+    env = deterministic_environment.set_env(
+        {"broker_host": "localhost", "pipeline": "multiprocess"})
+    spec = importlib.util.spec_from_file_location(
+        "greenscale_edge_aeration_main", MAIN_MODULE_PATH)
+    main = importlib.util.module_from_spec(spec)
+    with env:
+        spec.loader.exec_module(main)
+
+    class Pumping:
+        def aerating(self, settle_sec):
+            return True
+
+    main.aeration.monitor = Pumping()
+    pipeline = main.build_pipeline()
+    for worker in pipeline.workers.values():
+        for task in worker.tasks.values():
+            worker._push(task())
+    recorded, sensors, camera_data = [], {}, {}
+    main.consume_pipeline(
+        pipeline, lambda reading, **kw: recorded.append(reading),
+        sensors, camera_data)
+    for worker in pipeline.workers.values():
+        worker.ring.close()
+
+    assert sensors["turbidity_sensor_v"] == 2.5  # tagged: still the latest
+    assert camera_data["turbidity_index"] == 0.42
+    assert not any("turbidity_sensor_v" in r or "turbidity_index" in r
+                   for r in recorded)
+    assert main.aeration.status()["excluded"] == {
+        "turbidity_sensor_v": 1, "turbidity_index": 1}
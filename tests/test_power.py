@@ -0,0 +1,118 @@
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PROJECT_SRC = REPO_ROOT / "greenscale-edge" / "greenscale-edge"
+
+if str(PROJECT_SRC) not in sys.path:
+    sys.path.insert(0, str(PROJECT_SRC))
+
+from power import EnergyMeter  # noqa: E402
+
+MODEL = {"base": 2.0, "camera": 1.0, "adc": 0.01, "temperature": 0.0}
+
+
+def run_cycle(profile):
+    now = [0.0]
+    meter = EnergyMeter(profile, MODEL, clock=lambda: now[0])
+    meter.add("camera", 1.5)
+    meter.add("ph", 0.01)
+    meter.add("turbidity", 0.01)
+    now[0] = 10.0
+    return meter.cycle()
+
+
+def test_normal_profile_bills_streaming_devices_for_whole_cycle():
+    report = run_cycle("normal")
+    # 2.0*10 + 1.0*10 + 0.01*10
+    assert report == {"profile": "normal", "cycle_s": 10.0,
+                      "energy_j": 30.1, "avg_power_w": 3.01}
+
+
+def test_low_profile_bills_only_active_time():
+    report = run_cycle("low")
+    # 2.0*10 + 1.0*1.5 + 0.01*0.02
+    assert report["energy_j"] == 21.5
+    assert report["avg_power_w"] == 2.15
+
+
+def test_ads1115_single_shot_polls_instead_of_fixed_delay(monkeypatch):
+    writes, reads = [], []
+    ready = iter([0x00, 0x00, 0x80])
+
+    class FakeBus:
+        def write_i2c_block_data(self, addr, reg, data):
+            writes.append((reg, data))
+
+        def read_i2c_block_data(self, addr, reg, length):
+            reads.append(reg)
+            if reg == 0x01:
+                return [next(ready), 0]
+            return [0x10, 0x00]
+
+    monkeypatch.setitem(sys.modules, "smbus",
+                        types.SimpleNamespace(SMBus=lambda _n: FakeBus()))
+    import importlib.util
+    spec = importlib.util.spec_from_file_location(
+        "DFRobot_ADS1115", PROJECT_SRC / "sensors" / "DFRobot_ADS1115.py")
+    driver = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(driver)
+    sleeps = []
+    monkeypatch.setattr(driver.time, "sleep", sleeps.append)
+
+    adc = driver.ADS1115()
+    adc.set_mode(driver.ADS1115_REG_CONFIG_MODE_SINGLE)
+    assert adc.read_voltage(1) == {"r": 512}
+
+    config_msb = writes[0][1][0]
+    assert config_msb & driver.ADS1115_REG_CONFIG_MODE_SINGLE
+    assert reads == [0x01, 0x01, 0x01, 0x00]
+    assert 0.1 not in sleeps
+
+
+def test_adc_read_fails_fast_while_a_hung_read_holds_the_bus(monkeypatch):
+    import importlib.util
+    import threading
+
+    release = threading.Event()
+    entered = threading.Event()
+
+    class FakeADS1115:
+        def set_addr_ADS1115(self, addr):
+            pass
+
+        def set_gain(self, gain):
+            pass
+
+        def read_voltage(self, channel):
+            if channel == 1:
+                entered.set()
+                release.wait(5)
+            return {"r": 1500}
+
+    driver = types.SimpleNamespace(
+        ADS1115=FakeADS1115, ADS1115_REG_CONFIG_MODE_CONTIN=0x00,
+        ADS1115_REG_CONFIG_MODE_SINGLE=0x01)
+    sensors_pkg = types.ModuleType("sensors")
+    sensors_pkg.__path__ = []
+    monkeypatch.setitem(sys.modules, "sensors", sensors_pkg)
+    monkeypatch.setitem(sys.modules, "sensors.DFRobot_ADS1115", driver)
+    spec = importlib.util.spec_from_file_location(
+        "sensors.adc", PROJECT_SRC / "sensors" / "adc.py")
+    adc = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(adc)
+    monkeypatch.setattr(adc, "BUS_WAIT_SEC", 0.05)
+
+    hung = threading.Thread(target=adc.read_channel_mv, args=(1,), daemon=True)
+    hung.start()
+    assert entered.wait(5)
+    try:
+        with pytest.raises(TimeoutError):
+            adc.read_channel_mv(2)
+    finally:
+        release.set()
+        hung.join(5)
+    assert adc.read_channel_mv(2) == 1500.0
@@ -0,0 +1,245 @@
+import importlib.util
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PROJECT_SRC = REPO_ROOT / "greenscale-edge" / "greenscale-edge"
+PUMP_MODULE_PATH = PROJECT_SRC / "pump.py"
+
+if str(PROJECT_SRC) not in sys.path:
+    sys.path.insert(0, str(PROJECT_SRC))
+
+from pump_control import (  # noqa: E402
+    DEFAULT_SETTINGS, ClosedLoop, PIDController, TimerCycle,
+    effective_settings, ramp_steps, validate_settings)
+from telemetry.board import StateBoard  # noqa: E402
+
+
+def settings(**overrides):
+    return validate_settings({**DEFAULT_SETTINGS, "mode": "closed_loop",
+                              **overrides})
+
+
+def test_pid_saturates_without_winding_up():
+    pid = PIDController(6.0, kp=30, ki=1.0, max_output=100)
+    for t in range(100):
+        assert pid.update(2.0, t) == 100  # far below target: full aeration
+    # Back above target: the output drops at once instead of unwinding a
+    # hundred seconds of integral.
+    assert pid.update(7.0, 100) < 100
+
+
+def test_do_drop_reaches_full_duty_within_seconds():
+    loop = ClosedLoop(settings(slew_per_sec=25))
+    assert loop.step(7.0, 20.0, 0.0) == (0.0, "pid")
+    duties = [loop.step(2.0, 20.0, float(t))[0] for t in range(1, 6)]
+    assert duties == [25, 50, 75, 100, 100]
+
+
+def test_small_outputs_stop_the_pump_and_warm_water_keeps_it_running():
+    loop = ClosedLoop(settings(slew_per_sec=0, ki=0, kp=10, min_run_duty=30))
+    assert loop.step(5.0, 20.0, 0.0)[0] == 0  # 10% would stall the pump
+    assert loop.step(5.0, 27.0, 1.0) == (40, "warm")
+
+
+def test_stale_readings_fall_back_to_timer():
+    loop = ClosedLoop(settings(slew_per_sec=0, on_sec=20, rest_sec=40, duty=80))
+    duties = [loop.step(None, None, float(t)) for t in (0, 19, 20, 59, 60)]
+    assert duties == [(80, "fallback"), (80, "fallback"), (0, "fallback"),
+                      (0, "fallback"), (80, "fallback")]
+
+
+def test_long_runs_are_followed_by_a_cooldown():
+    loop = ClosedLoop(settings(slew_per_sec=0, max_on_sec=60, cooldown_sec=30))
+    assert loop.step(2.0, 20.0, 0.0)[0] == 100
+    assert loop.step(2.0, 20.0, 59.0)[0] == 100
+    assert loop.step(2.0, 20.0, 60.0) == (0.0, "cooldown")
+    assert loop.step(2.0, 20.0, 89.0) == (0.0, "cooldown")
+    assert loop.step(2.0, 20.0, 90.0)[0] == 100
+
+
+def test_invalid_settings_are_rejected():
+    with pytest.raises(ValueError, match="mode"):
+        validate_settings({**DEFAULT_SETTINGS, "mode": "auto"})
+    with pytest.raises(ValueError, match="percentage"):
+        settings(max_duty=150)
+
+
+def test_timer_cycle_picks_up_new_timings_mid_phase():
+    cycle = TimerCycle()
+    timer = {**DEFAULT_SETTINGS, "on_sec": 20, "rest_sec": 300, "duty": 80}
+    assert cycle.step(timer, 0.0) == (80, 20)
+    assert cycle.step(timer, 30.0) == (0.0, 290)
+    # Shortening the rest applies to the phase already running.
+    assert cycle.step({**timer, "rest_sec": 60}, 40.0) == (0.0, 40)
+    assert cycle.step({**timer, "rest_sec": 60}, 85.0) == (80, 15)
+
+
+def test_ramps_spread_duty_changes():
+    assert ramp_steps(0, 100, 1.0, 0.25) == [25, 50, 75, 100]
+    assert ramp_steps(100, 50, 1.0, 0.25) == [75, 50]
+    assert ramp_steps(0, 100, 0) == [100]
+
+
+def test_schedule_windows_override_timings():
+    s = validate_settings({**DEFAULT_SETTINGS, "schedule": [
+        {"from": "22:00", "to": "06:00", "duty": 0},
+        {"from": "12:00", "to": "13:30", "on_sec": 60}]})
+    assert effective_settings(s, 23 * 60)["duty"] == 0
+    assert effective_settings(s, 5 * 60 + 59)["duty"] == 0
+    assert effective_settings(s, 6 * 60) is s
+    assert effective_settings(s, 13 * 60)["on_sec"] == 60
+    with pytest.raises(ValueError, match="HH:MM"):
+        validate_settings({**DEFAULT_SETTINGS, "schedule": [{"from": "25:00", "to": "06:00"}]})
+
+
+@pytest.fixture
+def pump_module(monkeypatch):
+    gpio = types.ModuleType("RPi.GPIO")
+    rpi = types.ModuleType("RPi")
+    rpi.GPIO = gpio
+    monkeypatch.setitem(sys.modules, "RPi", rpi)
+    monkeypatch.setitem(sys.modules, "RPi.GPIO", gpio)
+    spec = importlib.util.spec_from_file_location("greenscale_pump", PUMP_MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_pump_reads_fresh_healthy_values_from_board(pump_module, tmp_path):
+    from telemetry.board import BoardReader
+
+    board = StateBoard(tmp_path / "state", ("do_mg_per_l", "temperature_c"),
+                       ("dissolved_oxygen", "temperature"))
+    reader = BoardReader(tmp_path / "state")
+    assert pump_module.read_inputs(reader, 30) == (None, None)
+
+    board.update({"do_mg_per_l": 5.5, "temperature_c": 21.0})
+    board.commit()
+    assert pump_module.read_inputs(reader, 30) == (5.5, 21.0)
+
+    board.set_health({"dissolved_oxygen": {"state": "open", "failures": 3}})
+    board.update({"temperature_c": 21.0}, ts=time.time() - 60)
+    board.commit()
+    assert pump_module.read_inputs(reader, 30) == (None, None)
+    board.close()
+    reader.close()
+
+
+class FakePWM:
+    def __init__(self):
+        self.duties = []
+
+    def ChangeDutyCycle(self, duty):
+        self.duties.append(duty)
+
+
+def test_service_reloads_and_stops_without_waiting_out_the_rest(pump_module):
+    now = [0.0]
+    pwm = FakePWM()
+    service = pump_module.PumpService(
+        pwm, validate_settings({**DEFAULT_SETTINGS, "ramp_sec": 0}),
+        clock=lambda: now[0], local_time=lambda: time.localtime(0))
+    assert service.step() == 20
+    assert pwm.duties == [100]
+    now[0] = 25.0
+    assert service.step() == 295  # resting
+    assert pwm.duties == [100, 0]
+
+    class Watcher:
+        def take(self):
+            return validate_settings({**DEFAULT_SETTINGS, "rest_sec": 4,
+                                      "duty": 60, "ramp_sec": 0}), None
+
+    service.wake.set()  # as the config watcher would
+    runner = threading.Thread(target=service.run, args=(Watcher(),), daemon=True)
+    started = time.monotonic()
+    runner.start()
+    time.sleep(0.05)
+    service.stop()
+    runner.join(timeout=2)
+    assert 60 in pwm.duties  # the shorter rest was already over
+    assert not runner.is_alive() and time.monotonic() - started < 2
+    assert pwm.duties[-1] == 0
+
+
+def test_service_soft_starts_and_soft_stops(pump_module):
+    pwm = FakePWM()
+    service = pump_module.PumpService(
+        pwm, validate_settings({**DEFAULT_SETTINGS, "ramp_sec": 0.5}),
+        sleep=lambda _s: None)
+    service.step()
+    assert pwm.duties[0] < 50 and pwm.duties[-1] == 100
+    assert pwm.duties == sorted(pwm.duties)
+    pwm.duties.clear()
+    service.set_duty(0, interruptible=False)
+    assert pwm.duties[0] > 50 and pwm.duties[-1] == 0
+
+
+def test_gpio_errors_are_recorded_and_retried(pump_module, tmp_path):
+    from telemetry.pump_state import PumpMonitor, PumpRecorder
+
+    class FlakyPWM(FakePWM):
+        fail = True
+
+        def ChangeDutyCycle(self, duty):
+            if self.fail:
+                raise RuntimeError("pwm channel lost")
+            super().ChangeDutyCycle(duty)
+
+    pwm = FlakyPWM()
+    recorder = PumpRecorder(tmp_path / "pump", tmp_path / "events")
+    monitor = PumpMonitor(tmp_path / "pump", tmp_path / "events")
+    service = pump_module.PumpService(
+        pwm, validate_settings({**DEFAULT_SETTINGS, "ramp_sec": 0}),
+        recorder=recorder, clock=lambda: 0.0,
+        local_time=lambda: time.localtime(0))
+    # A failed write is retried soon, not at the end of the 20 s phase.
+    assert service.step() == pump_module.WRITE_RETRY_SEC
+    assert monitor.status()["health"]["state"] == "failing"
+    pwm.fail = False
+    assert service.step() == 20
+    assert pwm.duties == [100]
+    status = monitor.status()
+    assert status["state"] == "on" and status["health"] == {"state": "ok"}
+    assert [e["event"] for e in monitor.events()] == ["gpio_error", "gpio_ok", "start"]
+    recorder.close()
+
+
+def test_unusable_config_falls_back_to_defaults(pump_module, tmp_path, monkeypatch):
+    config = tmp_path / "config.json"
+    monkeypatch.setattr(pump_module, "CFG_PATH", config)
+    for text in ('{"pump": {"duty": 150}}', '{"pump": {"on_sec": 5', '[]'):
+        config.write_text(text)
+        settings, _board, _telemetry = pump_module.load_settings_or_defaults()
+        assert settings == DEFAULT_SETTINGS
+        assert pump_module.telemetry_paths() == (
+            "/dev/shm/greenscale-pump", "/dev/shm/greenscale-pump-events")
+
+
+def test_reload_moves_pump_telemetry_to_new_paths(pump_module, tmp_path):
+    from telemetry.pump_state import PumpMonitor
+
+    old = (str(tmp_path / "old"), str(tmp_path / "old-events"))
+    new = (str(tmp_path / "new"), str(tmp_path / "new-events"))
+    settings = validate_settings({**DEFAULT_SETTINGS, "ramp_sec": 0})
+    service = pump_module.PumpService(
+        FakePWM(), settings, recorder=pump_module.open_recorder(old),
+        telemetry=old)
+    service.step()
+    first = service.recorder
+
+    service.apply(settings, None, old)
+    assert service.recorder is first
+    service.apply(settings, None, new)
+    assert service.recorder is not first and service.telemetry == new
+    service.step()
+    monitor = PumpMonitor(*new)
+    assert monitor.status()["state"] == "on"
+    monitor.close()
+    service.recorder.close()
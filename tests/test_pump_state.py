@@ -0,0 +1,107 @@
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PROJECT_SRC = REPO_ROOT / "greenscale-edge" / "greenscale-edge"
+
+if str(PROJECT_SRC) not in sys.path:
+    sys.path.insert(0, str(PROJECT_SRC))
+
+from telemetry.events import EventLog, EventTail  # noqa: E402
+from telemetry.pump_state import (  # noqa: E402
+    AerationGate, PumpMonitor, PumpRecorder)
+
+
+def test_event_tail_follows_rotation_and_partial_lines(tmp_path):
+    path = tmp_path / "events"
+    log = EventLog(path, max_bytes=60)
+    log.append({"n": 0})
+    tail = EventTail(path)  # starts at the end, like tail -F
+    assert tail.read_new() == []
+    for n in range(1, 8):
+        log.append({"n": n})
+    assert (tmp_path / "events.1").exists()
+    assert [event["n"] for event in tail.read_new()] == list(range(1, 8))
+
+    with open(path, "ab") as f:
+        f.write(b'{"n": 8')
+    assert tail.read_new() == []
+    with open(path, "ab") as f:
+        f.write(b'}\n')
+    assert tail.read_new() == [{"n": 8}]
+    log.close()
+    tail.close()
+
+
+def test_recorder_shares_state_and_events(tmp_path):
+    now = [1000.0]
+    clock = lambda: now[0]  # noqa: E731
+    state, events = tmp_path / "pump", tmp_path / "pump-events"
+    recorder = PumpRecorder(state, events, clock=clock)
+    monitor = PumpMonitor(state, events, clock=clock)
+    assert monitor.status()["state"] == "off"
+
+    recorder.update(100, "on")
+    now[0] = 1020.0
+    recorder.update(100, "on")  # unchanged: no event
+    assert monitor.status()["runtime_s"] == 20  # counted live while running
+    recorder.update(0, "off")
+    recorder.gpio_error(RuntimeError("pwm busy"))
+    recorder.gpio_error(RuntimeError("pwm busy"))
+    recorder.gpio_ok()
+
+    status = monitor.status()
+    assert status["state"] == "off" and status["runtime_s"] == 20
+    assert status["starts"] == 1 and status["gpio_errors"] == 2
+    assert [e["event"] for e in monitor.events()] == [
+        "start", "stop", "gpio_error", "gpio_ok"]
+
+    # Counters survive a restart of the pump service.
+    recorder.update(60, "pid")
+    now[0] = 1030.0
+    recorder.update(80, "pid")
+    recorder.close()
+    recorder = PumpRecorder(state, events, clock=clock)
+    status = monitor.status()
+    assert status["runtime_s"] == 30 and status["starts"] == 2
+    assert status["state"] == "off"
+    assert [(e["event"], e.get("duty")) for e in monitor.events()] == [
+        ("start", 60), ("duty", 80)]
+    recorder.close()
+    monitor.close()
+
+
+def test_monitor_without_pump_reports_unknown(tmp_path):
+    monitor = PumpMonitor(tmp_path / "missing", tmp_path / "missing-events")
+    assert monitor.status() == {"state": "unknown"}
+    assert monitor.events() == []
+
+
+def test_aeration_window_covers_run_and_settle_time(tmp_path):
+    now = [1000.0]
+    clock = lambda: now[0]  # noqa: E731
+    recorder = PumpRecorder(tmp_path / "pump", clock=clock)
+    monitor = PumpMonitor(tmp_path / "pump", clock=clock)
+    gate = AerationGate(monitor, policy="tag", settle_sec=30)
+    reading = {"ph": 7.0, "turbidity_sensor_v": 2.5}
+    assert gate.split(reading) == (reading, reading)
+
+    recorder.update(100, "on")
+    assert gate.split(reading) == ({"ph": 7.0}, reading)
+    now[0] = 1020.0
+    recorder.update(0, "off")
+    now[0] = 1049.0
+    assert gate.active()
+    now[0] = 1050.0
+    assert not gate.active()
+    assert gate.status() == {"policy": "tag", "active": False,
+                             "excluded": {"turbidity_sensor_v": 1}}
+
+    recorder.update(100, "on")
+    gate.configure("skip", 30)
+    assert gate.skipping()
+    assert gate.split(reading) == ({"ph": 7.0}, {"ph": 7.0})
+    gate.configure("off", 30)
+    assert gate.split(reading) == (reading, reading)
+    recorder.close()
+    monitor.close()
@@ -0,0 +1,103 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PROJECT_SRC = REPO_ROOT / "greenscale-edge" / "greenscale-edge"
+
+if str(PROJECT_SRC) not in sys.path:
+    sys.path.insert(0, str(PROJECT_SRC))
+
+from scheduler import Scheduler  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_deadlines_do_not_drift_with_task_duration(clock):
+    """Work time must not stretch the period: deadlines stay on the grid."""
+    scheduler = Scheduler(clock)
+    runs = []
+
+    def slow_task():
+        runs.append(clock.now)
+        clock.now += 0.3  # the task itself takes 300 ms
+
+    scheduler.add("adc", 1.0, slow_task)
+    for _ in range(5):
+        clock.now += scheduler.time_until_next()
+        scheduler.run_pending()
+
+    assert runs == pytest.approx([100.0, 101.0, 102.0, 103.0, 104.0])
+    assert scheduler.tasks["adc"].overruns == 0
+
+
+def test_independent_intervals_per_source(clock):
+    """Each task should fire on its own cadence."""
+    scheduler = Scheduler(clock)
+    counts = {"adc": 0, "temperature": 0, "camera": 0}
+    for name, interval in (("adc", 1), ("temperature", 10), ("camera", 60)):
+        scheduler.add(name, interval,
+                      lambda name=name: counts.__setitem__(name, counts[name] + 1))
+
+    end = clock.now + 60
+    while clock.now < end:
+        clock.now += scheduler.time_until_next()
+        if clock.now >= end:
+            break
+        scheduler.run_pending()
+
+    assert counts == {"adc": 60, "temperature": 6, "camera": 1}
+
+
+def test_overrun_skips_missed_slots_and_is_counted(clock):
+    """A task that outlasts its period keeps phase and reports the overrun."""
+    scheduler = Scheduler(clock)
+
+    def stuck():
+        clock.now += 2.5
+
+    task = scheduler.add("camera", 1.0, stuck)
+    scheduler.run_pending()
+
+    assert task.overruns == 1
+    assert task.next_due == pytest.approx(103.0)
+
+
+def test_task_errors_are_contained(clock):
+    """A failing task should not stop the others or lose its schedule."""
+    scheduler = Scheduler(clock)
+    ran = []
+
+    def broken():
+        raise RuntimeError("sensor unplugged")
+
+    scheduler.add("temperature", 1.0, broken)
+    scheduler.add("publish", 1.0, lambda: ran.append(True))
+    scheduler.run_pending()
+
+    assert ran == [True]
+    assert scheduler.tasks["temperature"].errors == 1
+    assert scheduler.tasks["temperature"].next_due == pytest.approx(101.0)
+
+
+def test_set_interval_applies_immediately(clock):
+    """Shortening an interval should not wait out the old period."""
+    scheduler = Scheduler(clock)
+    scheduler.add("publish", 60.0, lambda: None)
+    scheduler.run_pending()
+    clock.now += 5
+
+    scheduler.set_interval("publish", 2.0)
+    assert scheduler.time_until_next() == 0.0
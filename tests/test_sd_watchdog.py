@@ -0,0 +1,96 @@
+import os
+import socket
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PROJECT_SRC = REPO_ROOT / "greenscale-edge" / "greenscale-edge"
+
+if str(PROJECT_SRC) not in sys.path:
+    sys.path.insert(0, str(PROJECT_SRC))
+
+from sd_watchdog import (  # noqa: E402
+    Deadlines, StageTimeout, SystemdWatchdog, sd_notify, watchdog_interval)
+
+
+@pytest.fixture
+def notify_socket(tmp_path):
+    path = tmp_path / "notify.sock"
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.bind(str(path))
+    sock.settimeout(1)
+    yield str(path), sock
+    sock.close()
+
+
+def test_sd_notify_sends_datagram(notify_socket):
+    path, sock = notify_socket
+    assert sd_notify("READY=1", env={"NOTIFY_SOCKET": path})
+    assert sock.recv(256) == b"READY=1"
+    assert sd_notify("READY=1", env={}) is False
+
+
+def test_watchdog_interval_is_half_of_watchdog_sec():
+    env = {"WATCHDOG_USEC": "30000000", "WATCHDOG_PID": str(os.getpid())}
+    assert watchdog_interval(env) == 15.0
+    assert watchdog_interval({"WATCHDOG_USEC": "30000000",
+                              "WATCHDOG_PID": "1"}) is None
+    assert watchdog_interval({}) is None
+
+
+def test_deadline_abandons_hung_stage_until_it_returns():
+    """A hung read raises once, blocks new calls, then recovers."""
+    release = threading.Event()
+    deadlines = Deadlines({"temperature": 0.05})
+
+    with pytest.raises(StageTimeout, match="deadline"):
+        deadlines.call("temperature", release.wait)
+    with pytest.raises(StageTimeout, match="still hung"):
+        deadlines.call("temperature", lambda: 1)
+    assert "temperature" in deadlines.stuck()
+
+    release.set()
+    threading.Event().wait(0.05)
+    assert deadlines.stuck() == {}
+    assert deadlines.call("temperature", lambda: 21.5) == 21.5
+
+
+def test_deadline_passes_results_errors_and_inline_stages():
+    deadlines = Deadlines({"adc": 1})
+    assert deadlines.call("adc", lambda x: x * 2, 4) == 8
+    with pytest.raises(ValueError):
+        deadlines.call("adc", lambda: int("x"))
+    caller = threading.current_thread()
+    assert deadlines.call("camera", threading.current_thread) is caller
+
+
+def test_watchdog_pings_only_while_no_stage_is_stuck(notify_socket):
+    path, sock = notify_socket
+    now = [100.0]
+    deadlines = Deadlines({"camera": 0.01}, clock=lambda: now[0])
+    env = {"NOTIFY_SOCKET": path, "WATCHDOG_USEC": "10000000"}
+    watchdog = SystemdWatchdog(deadlines, max_hang=60, clock=lambda: now[0],
+                               env=env)
+
+    assert watchdog.alive()
+    assert sock.recv(256) == b"WATCHDOG=1"
+    now[0] += 1
+    assert watchdog.alive() is False  # rate-limited to interval / 2
+
+    release = threading.Event()
+    with pytest.raises(StageTimeout):
+        deadlines.call("camera", release.wait)
+    now[0] += 61
+    assert watchdog.alive() is False  # stuck past max_hang: let systemd act
+    release.set()
+
+
+def test_max_hang_defaults_to_a_multiple_of_the_longest_timeout():
+    deadlines = Deadlines({"ph": 2, "camera": 20, "temperature": None})
+    assert SystemdWatchdog(deadlines, env={}).hang_limit() == 60
+    assert SystemdWatchdog(deadlines, max_hang=45, env={}).hang_limit() == 45
+    deadlines.timeouts = {}
+    assert SystemdWatchdog(deadlines, env={}).hang_limit() == 60.0
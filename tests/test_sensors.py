@@ -1,7 +1,6 @@
 import importlib
 import sys
 import types
-from datetime import datetime
 from pathlib import Path
 
 import pytest
@@ -39,7 +38,6 @@ def add_project_to_path(monkeypatch):
         "value": 22.5,
         "units": "degC",
         "status": "ok",
-        "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
     }
 
     ph_module = types.ModuleType("sensors.ph_sensor")
@@ -48,7 +46,6 @@ def add_project_to_path(monkeypatch):
         "value": 7.0,
         "units": "pH",
         "status": "ok",
-        "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
     }
 
     do_module = types.ModuleType("sensors.do_sensor")
@@ -59,7 +56,6 @@ def add_project_to_path(monkeypatch):
         "status": "ok",
         "temperature_c": 20.0,
         "raw_mv": 1500,
-        "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
     }
 
     turbidity_module = types.ModuleType("sensors.turbidity_sensor")
@@ -68,7 +64,6 @@ def add_project_to_path(monkeypatch):
         "value": 3.0,
         "units": "NTU",
         "status": "ok",
-        "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
     }
 
     monkeypatch.setitem(sys.modules, "sensors", sensors_pkg)
@@ -100,7 +95,7 @@ def test_read_output_structure(module_name: str, monkeypatch: pytest.MonkeyPatch
     reading = module.read()
 
     # Validate required keys
-    expected_keys = {"sensor", "value", "units", "status", "timestamp"}
+    expected_keys = {"sensor", "value", "units", "status"}
     assert isinstance(reading, dict)
     assert expected_keys.issubset(
         reading.keys()), f"{module_name} missing required keys"
@@ -110,13 +105,8 @@ def test_read_output_structure(module_name: str, monkeypatch: pytest.MonkeyPatch
     assert isinstance(reading["value"], (int, float))
     assert isinstance(reading["units"], str)
     assert isinstance(reading["status"], str)
-    assert isinstance(reading["timestamp"], str)
-
-    # Validate timestamp format (ISO 8601)
-    try:
-        datetime.strptime(reading["timestamp"], "%Y-%m-%dT%H:%M:%SZ")
-    except ValueError:
-        pytest.fail(f"{module_name} timestamp not in ISO 8601 format")
+    # The agent stamps the payload; readings carry no timestamp of their own.
+    assert "timestamp" not in reading
 
 
 @pytest.mark.parametrize("module_name", SENSOR_MODULES)
@@ -0,0 +1,117 @@
+import math
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PROJECT_SRC = REPO_ROOT / "greenscale-edge" / "greenscale-edge"
+
+if str(PROJECT_SRC) not in sys.path:
+    sys.path.insert(0, str(PROJECT_SRC))
+
+from telemetry.store import (  # noqa: E402
+    DAY_MS, HOUR_MS, MINUTE_MS, HistoryStore, pick_resolution)
+
+T0 = 1_700_000_000_000 - 1_700_000_000_000 % HOUR_MS  # an hour boundary
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(tmp_path / "history.db")
+    yield store
+    store.close()
+
+
+def test_rollups_are_maintained_incrementally(store):
+    """Minute and hour buckets should match the raw samples they cover."""
+    for i in range(120):  # two minutes at one sample per second
+        store.record({"ph": 7.0 + (i % 2) * 0.2, "avg_color_hex": "#000"},
+                     ts_ms=T0 + i * 1000)
+        if i % 30 == 29:
+            store.flush()  # rollups must merge across flushes
+
+    raw = store.query("ph", T0, T0 + HOUR_MS, resolution="raw")
+    assert len(raw) == 120
+    assert raw[0] == {"ts": T0, "value": 7.0}
+
+    minutes = store.query("ph", T0, T0 + HOUR_MS, resolution="1m")
+    assert [m["ts"] for m in minutes] == [T0, T0 + MINUTE_MS]
+    assert minutes[0]["count"] == 60
+    assert minutes[0]["min"] == 7.0
+    assert minutes[0]["max"] == pytest.approx(7.2)
+    assert minutes[0]["mean"] == pytest.approx(7.1)
+    # Sample std, the same definition the publish windows use.
+    assert minutes[0]["std"] == pytest.approx(0.1 * math.sqrt(60 / 59))
+    assert minutes[1]["last"] == pytest.approx(7.2)
+
+    hours = store.query("ph", T0, T0 + HOUR_MS, resolution="1h")
+    assert len(hours) == 1 and hours[0]["count"] == 120
+    assert store.metrics() == ["ph"]  # strings are not stored
+
+
+def test_repeated_timestamps_are_not_counted_twice(store):
+    """Rewriting a (metric, ts) should leave rollups matching the raw rows."""
+    store.record({"ph": 7.0}, ts_ms=T0)
+    store.record({"ph": 8.0}, ts_ms=T0 + 1000)
+    store.flush()
+    store.record({"ph": 7.0}, ts_ms=T0)  # same value again
+    store.record({"ph": 6.0}, ts_ms=T0 + 1000)  # corrected value
+    store.record({"ph": 6.5}, ts_ms=T0 + 2000)
+    store.record({"ph": 6.6}, ts_ms=T0 + 2000)  # repeated within a flush
+    store.flush()
+
+    raw = store.query("ph", T0, T0 + HOUR_MS, resolution="raw")
+    assert [r["value"] for r in raw] == [7.0, 6.0, 6.6]
+    for resolution in ("1m", "1h"):
+        (bucket,) = store.query("ph", T0, T0 + HOUR_MS, resolution=resolution)
+        assert bucket["count"] == 3
+        assert bucket["mean"] == pytest.approx((7.0 + 6.0 + 6.6) / 3)
+        assert bucket["min"] == 6.0 and bucket["max"] == 7.0
+        assert bucket["last"] == pytest.approx(6.6)
+
+
+def test_range_reads_are_bounded_and_paginated(store):
+    for i in range(10):
+        store.record({"do_mg_per_l": float(i)}, ts_ms=T0 + i * 1000)
+    store.flush()
+
+    rows = list(store.iter_range("do_mg_per_l", T0 + 2000, T0 + 5000))
+    assert [r["value"] for r in rows] == [2.0, 3.0, 4.0]
+
+    page = list(store.iter_range("do_mg_per_l", T0, T0 + 10_000, limit=4))
+    rest = list(store.iter_range("do_mg_per_l", T0, T0 + 10_000,
+                                 after_ms=page[-1]["ts"]))
+    assert [r["value"] for r in page + rest] == [float(i) for i in range(10)]
+    assert list(store.iter_range("missing", T0, T0 + 1000)) == []
+    assert store.latest("do_mg_per_l")["value"] == 9.0
+
+
+def test_prune_applies_tier_retention(tmp_path):
+    store = HistoryStore(tmp_path / "h.db", raw_days=1, rollup_days=30)
+    store.record({"ph": 7.0}, ts_ms=T0)
+    store.flush()
+    store.prune(now=T0 + 2 * DAY_MS)
+
+    assert store.query("ph", T0, T0 + DAY_MS, resolution="raw") == []
+    assert len(store.query("ph", T0, T0 + DAY_MS, resolution="1m")) == 1
+    store.prune(now=T0 + 31 * DAY_MS)
+    assert store.query("ph", T0, T0 + DAY_MS, resolution="1h") == []
+    store.close()
+
+
+def test_history_survives_reopen(tmp_path):
+    path = tmp_path / "h.db"
+    store = HistoryStore(path)
+    store.record({"ph": 6.8}, ts_ms=T0)
+    store.close()  # close flushes pending samples
+
+    reopened = HistoryStore(path)
+    assert reopened.latest("ph") == {"ts": T0, "value": 6.8}
+    reopened.close()
+
+
+def test_pick_resolution():
+    assert pick_resolution(T0, T0 + HOUR_MS / 4) == "raw"
+    assert pick_resolution(T0, T0 + DAY_MS) == "1m"
+    assert pick_resolution(T0, T0 + 30 * DAY_MS) == "1h"
@@ -0,0 +1,115 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PROJECT_SRC = REPO_ROOT / "greenscale-edge" / "greenscale-edge"
+
+if str(PROJECT_SRC) not in sys.path:
+    sys.path.insert(0, str(PROJECT_SRC))
+
+from network import wifi_manager  # noqa: E402
+
+
+def fake_monitor(*lines, delay=0.05):
+    """A DeviceMonitor fed by a child printing nmcli-style lines."""
+    script = ("import sys, time\n"
+              f"for line in {list(lines)!r}:\n"
+              f"    time.sleep({delay}); print(line, flush=True)\n"
+              "time.sleep(5)\n")
+    monitor = wifi_manager.DeviceMonitor("wlan0", [sys.executable, "-c", script])
+    assert monitor.start()
+    return monitor
+
+
+def test_parse_state_only_for_our_interface():
+    assert wifi_manager.parse_state("wlan0: connecting (prepare)\n") == \
+        "connecting (prepare)"
+    assert wifi_manager.parse_state("eth0: connected", "wlan0") is None
+    assert wifi_manager.parse_state("NetworkManager is running") is None
+
+
+def test_connection_is_seen_as_soon_as_it_happens():
+    monitor = fake_monitor("wlan0: deactivating", "wlan0: connecting (prepare)",
+                           "eth0: disconnected", "wlan0: connected")
+    started = time.monotonic()
+    assert wifi_manager.wait_for_connection(monitor, 10)
+    assert time.monotonic() - started < 2
+    monitor.stop()
+
+
+def test_failed_activation_moves_on_without_waiting_out_the_timeout():
+    monitor = fake_monitor("wlan0: disconnected", "wlan0: connecting (need-auth)",
+                           "wlan0: disconnected")
+    started = time.monotonic()
+    assert not wifi_manager.wait_for_connection(monitor, 10)
+    assert time.monotonic() - started < 2
+    monitor.stop()
+
+
+def test_exited_monitor_falls_back_to_polling(monkeypatch):
+    monitor = wifi_manager.DeviceMonitor(
+        "wlan0", [sys.executable, "-c", "print('wlan0: connecting (config)')"])
+    assert monitor.start()
+    monkeypatch.setattr(wifi_manager, "wifi_connected", lambda: True)
+    assert wifi_manager.wait_for_connection(monitor, 5)
+
+
+def test_activate_profile_gives_up_when_nmcli_refuses(monkeypatch):
+    calls = []
+
+    def run(args, check=False):
+        calls.append(args)
+        return subprocess.CompletedProcess(args, 10)
+
+    monkeypatch.setattr(wifi_manager.subprocess, "run", run)
+    assert not wifi_manager.activate_profile("Missing")
+    assert calls == [["nmcli", "--wait", "0", "connection", "up", "Missing"]]
+
+
+def test_split_terse_unescapes_colons():
+    assert wifi_manager.split_terse(r"Cafe\:Guest:72") == ["Cafe:Guest", "72"]
+    assert wifi_manager.split_terse(r"back\\slash:yes") == ["back\\slash", "yes"]
+
+
+def test_scan_is_cached_and_keeps_best_signal(monkeypatch):
+    calls = []
+
+    def run(args, **kwargs):
+        calls.append(args)
+        return subprocess.CompletedProcess(
+            args, 0, stdout="Home:40\nHome:81\n:60\nOffice\\:2:55\n", stderr="")
+
+    monkeypatch.setattr(wifi_manager.subprocess, "run", run)
+    monkeypatch.setattr(wifi_manager, "_scan_cache", {"at": None, "networks": None})
+    assert wifi_manager.scan_networks() == {"Home": 81, "Office:2": 55}
+    assert wifi_manager.scan_networks() == {"Home": 81, "Office:2": 55}
+    assert len(calls) == 1
+    wifi_manager.scan_networks(max_age=0)
+    assert len(calls) == 2
+
+
+def test_profiles_are_ranked_by_signal_and_out_of_range_skipped():
+    profiles = [("home", "Home", False), ("far", "Far", False),
+                ("office", "Office", False), ("hidden", "Lab", True),
+                ("odd", None, False)]
+    networks = {"Home": 40, "Office": 85, "Neighbour": 90}
+    assert wifi_manager.rank_profiles(profiles, networks) == [
+        "office", "home", "hidden", "odd"]
+
+
+def test_failed_scan_falls_back_to_saved_order(monkeypatch):
+    monkeypatch.setattr(wifi_manager, "scan_networks", lambda: None)
+    assert wifi_manager.choose_profiles(["b", "a"]) == ["b", "a"]
+
+
+def test_every_wait_after_the_monitor_exits_polls(monkeypatch):
+    monitor = wifi_manager.DeviceMonitor("wlan0", [sys.executable, "-c", "pass"])
+    assert monitor.start()
+    monitor.proc.wait()
+    monkeypatch.setattr(wifi_manager, "wifi_connected", lambda: True)
+    for _ in range(2):
+        started = time.monotonic()
+        assert wifi_manager.wait_for_connection(monitor, 2)
+        assert time.monotonic() - started < 1